@@ -16,33 +16,49 @@
 
 import math
 import os
-import random
-import re
 import sys
 
-try:
-    import cairocffi as cairo
-except ImportError:
-    try:
-        import cairo
-    except ImportError:
-        print('This program requires cairo')
-        sys.exit(1)
-
 from maze.quad import Maze
 from maze.tri import TriMaze
 from maze.hex import HexMaze
 from maze.randomized_prim import initialize
+from maze.randomizer import block_randomizer
+
+from .terminal import page_maze, print_maze
+
 
-from .terminal import print_maze
-from .image import make_image
+#: The image file types supported, mapped to the functions creating a cairo
+#: surface and writing it to the file; cairo is not imported until a surface
+#: is created
+SURFACE_TYPES = {
+    'pdf': (
+        lambda f, w, h: _cairo().PDFSurface(f, w, h),
+        lambda f, surface: None),
+    'png': (
+        lambda f, w, h: _cairo().ImageSurface(_cairo().FORMAT_ARGB32, w, h),
+        lambda f, surface: surface.write_to_png(f)),
+    'ps': (
+        lambda f, w, h: _cairo().PSSurface(f, w, h),
+        lambda f, surface: None),
+    'svg': (
+        lambda f, w, h: _cairo().SVGSurface(f, w, h),
+        lambda f, surface: None)}
 
 
 def main():
     import argparse
+    import re
+
+    # Run the maze server if requested
+    if sys.argv[1:2] == ['serve']:
+        from .server import main as serve
+        serve(sys.argv[2:])
+        return
 
     parser = argparse.ArgumentParser(
-        description = 'A tool to generate mazes')
+        description = 'A tool to generate mazes',
+        epilog = 'Run "amaze serve --help" for a description of the HTTP '
+            'server.')
 
     def maze_size(s):
         result = int(s)
@@ -89,6 +105,16 @@ def main():
         nargs = 2,
         default = (5, 4),
         help = 'The size of each room in characters when printing the maze.')
+    parser.add_argument('--print-viewport', type = int, nargs = 4,
+        metavar = ('X', 'Y', 'WIDTH', 'HEIGHT'),
+        default = None,
+        help = 'The rooms to print. If this is not specified, the entire maze '
+            'is printed.')
+    parser.add_argument('--print-pager',
+        action = 'store_true',
+        default = False,
+        help = 'Whether to display the maze in an interactive pager instead of '
+            'printing it.')
 
     def image_room_size(s):
         result = int(s)
@@ -102,39 +128,30 @@ def main():
         default = (30, 30),
         help = 'The size of the rooms in the maze image.')
 
-    surface_types = {
-        'pdf': (
-            lambda f, w, h: cairo.PDFSurface(f, w, h),
-            lambda f, surface: None),
-        'png': (
-            lambda f, w, h: cairo.ImageSurface(cairo.FORMAT_ARGB32, w, h),
-            lambda f, surface: surface.write_to_png(f)),
-        'ps': (
-            lambda f, w, h: cairo.PSSurface(f, w, h),
-            lambda f, surface: None),
-        'svg': (
-            lambda f, w, h: cairo.SVGSurface(f, w, h),
-            lambda f, surface: None)}
-    def surface(s):
+    def image_output(s):
         try:
             ext = s.rsplit(os.path.extsep, 1)[1]
-            return (
-                lambda w, h: surface_types[ext][0](s, w, h),
-                lambda surface: surface_types[ext][1](s, surface))
-        except KeyError as e:
-            argparse.ArgumentTypeError(
-                '"%s" is not a valid file extension' % e.args[0])
         except IndexError:
-            argparse.ArgumentTypeError(
+            raise argparse.ArgumentTypeError(
                 'The image file must have a valid extension')
-    class default:
-        def write(*args, **kwargs):
-            pass
-    parser.add_argument('--image-output', type = surface,
+        if not ext in SURFACE_TYPES:
+            raise argparse.ArgumentTypeError(
+                '"%s" is not a valid file extension' % ext)
+        try:
+            s.format(index = 0)
+        except (IndexError, KeyError, ValueError):
+            raise argparse.ArgumentTypeError(
+                '"%s" is not a valid file name template' % s)
+        return s
+    parser.add_argument('--image-output', type = image_output,
         metavar = 'FILENAME',
-        required = True,
-        help = ('The name of the image file to create. Valid types are %s.') % (
-            ', '.join(surface_types.keys())))
+        default = None,
+        help = ('The name of the image file to create. Valid types are %s. '
+            'When generating more than one maze, this must contain {index}, '
+            'which is replaced by the index of the maze. If this is not '
+            'specified, the maze is only printed. PNG images of mazes with '
+            'four walls per room do not require cairo.') % (
+                ', '.join(SURFACE_TYPES.keys())))
 
     def color(allow_rgba):
         def rgb(s):
@@ -231,18 +248,229 @@ def main():
         help = 'Whether the path should be painted as a smooth curve instead '
             'of a sharp line.')
 
+    def positive(s):
+        result = int(s)
+        if result < 1:
+            raise argparse.ArgumentTypeError(
+                'The value must be greater than 0')
+        else:
+            return result
+    parser.add_argument('--count', type = positive,
+        default = 1,
+        help = 'The number of mazes to generate. When more than one maze is '
+            'generated, the mazes are not printed.')
+    parser.add_argument('--jobs', type = positive,
+        default = 1,
+        help = 'The number of processes used to generate and render mazes.')
+    parser.add_argument('--seed', type = int,
+        default = None,
+        help = 'The seed used to generate the first maze; every following maze '
+            'uses the next integer. If this is not specified, a random seed '
+            'is used for every maze.')
+
+    parser.add_argument('--cache-dir',
+        metavar = 'DIRECTORY',
+        default = None,
+        help = 'A directory in which to cache generated mazes and images. '
+            'Mazes are only cached when a seed is specified.')
+    parser.add_argument('--cache-size', type = positive,
+        metavar = 'BYTES',
+        default = None,
+        help = 'The maximum total size of the files in the cache directory. '
+            'If this is not specified, 1 GiB is used.')
+
     namespace = parser.parse_args()
 
-    # Create and initialise the maze
-    maze = maze_classes[namespace.walls](*namespace.maze_size)
-    initialize(maze, lambda max: random.randint(0, max - 1))
+    maze_class = maze_classes[namespace.walls]
+    print_options = dict(
+        (name.split('_', 1)[1], value)
+            for name, value in vars(namespace).items()
+            if name.startswith('print_'))
+    image_options = dict(
+        (name.split('_', 1)[1], value)
+            for name, value in vars(namespace).items()
+            if name.startswith('image_'))
+    output = image_options.pop('output')
+    if output is None and namespace.count > 1:
+        parser.error('An image file name is required when generating more '
+            'than one maze')
+    filenames = [output and output.format(index = index)
+        for index in range(namespace.count)]
+    if len(set(filenames)) < len(filenames):
+        parser.error('The image file name must contain {index} when '
+            'generating more than one maze')
+    if not output is None and not _is_raster(maze_class, output):
+        try:
+            _cairo()
+        except ImportError:
+            print('This program requires cairo for this kind of image')
+            sys.exit(1)
+
+    cache = None
+    if not namespace.cache_dir is None:
+        from maze.cache import Cache, MAX_SIZE
+        cache = Cache(namespace.cache_dir, namespace.cache_size or MAX_SIZE)
+
+    tasks = [
+        (
+            maze_class, namespace.maze_size,
+            None if namespace.seed is None else namespace.seed + index,
+            filename, image_options, cache)
+        for index, filename in enumerate(filenames)]
+
+    if namespace.count == 1:
+        # Create and initialise the maze, and print it before rendering
+        maze_class, maze_size, seed = tasks[0][:3]
+        maze, solution = make_maze(maze_class, maze_size, seed, cache)
+        if print_options.pop('pager'):
+            page_maze(maze, solution, **print_options)
+        else:
+            print_maze(maze, solution, **print_options)
+        if not output is None:
+            _make_task(tasks[0], (maze, solution))
+
+    elif namespace.jobs == 1:
+        for task in tasks:
+            _make_task(task)
+
+    else:
+        # Let the worker processes generate and render the mazes; they keep
+        # their imports and state between mazes
+        import multiprocessing
+        pool = multiprocessing.Pool(namespace.jobs)
+        try:
+            for _ in pool.imap_unordered(_make_task, tasks):
+                pass
+        finally:
+            pool.close()
+            pool.join()
+
+
+def make_maze(maze_class, maze_size, seed = None, cache = None):
+    """Creates and initialises a maze and finds its solution.
+
+    :param maze_class: The maze class.
+
+    :param maze_size: The size of the maze.
+    :type maze_size: (int, int)
+
+    :param int seed: The seed passed to
+        :func:`maze.randomizer.block_randomizer`. If this is ``None``, a random
+        seed is used.
+
+    :param maze.cache.Cache cache: A cache from which to read the maze, and to
+        which to write it if it is not cached. This is ignored if *seed* is
+        ``None`` or cannot be stored in the cache, like negative seeds.
+
+    :return: the tuple ``(maze, solution)``
+    """
+    replay = None if cache is None or seed is None \
+        else _replay(maze_class, maze_size, seed)
+    if replay is None:
+        maze = maze_class(*maze_size)
+        initialize(maze, block_randomizer(seed))
+    else:
+        maze = cache.maze(replay)
     solution = list(maze.walk_path((0, 0), (maze.width - 1, maze.height - 1)))
 
-    print_maze(maze, solution, **dict(
-            (name.split('_', 1)[1], value)
-                for name, value in vars(namespace).items()
-                if name.startswith('print_')))
-    make_image(maze, solution, **dict(
-            (name.split('_', 1)[1], value)
-                for name, value in vars(namespace).items()
-                if name.startswith('image_')))
+    return maze, solution
+
+
+def _cairo():
+    """Imports cairo.
+
+    :return: the cairo module
+
+    :raises ImportError: if neither cairocffi nor pycairo is installed
+    """
+    from .image import cairo, require_cairo
+    require_cairo()
+    return cairo
+
+
+def _output(filename):
+    """Returns the functions creating and writing a cairo surface for an image
+    file, as expected by :func:`amaze.image.make_image`.
+
+    :param str filename: The name of the image file. Its extension must be one
+        of :attr:`SURFACE_TYPES`.
+
+    :return: the tuple ``(image_create, image_write)``
+    """
+    create, write = SURFACE_TYPES[filename.rsplit(os.path.extsep, 1)[1]]
+    return (
+        lambda w, h: create(filename, w, h),
+        lambda surface: write(filename, surface))
+
+
+def _is_raster(maze_class, filename):
+    """Returns whether an image file is rendered by
+    :func:`amaze.raster.make_raster_png`, which does not require cairo.
+
+    :param maze_class: The maze class.
+
+    :param str filename: The name of the image file. Its extension must be one
+        of :attr:`SURFACE_TYPES`.
+
+    :return: whether the maze has square rooms and the image is a PNG image
+    """
+    return filename.rsplit(os.path.extsep, 1)[1] == 'png' \
+        and issubclass(maze_class, Maze)
+
+
+def _replay(maze_class, maze_size, seed):
+    """Returns the replay descriptor of a maze generated by make_maze, or
+    ``None`` if the maze cannot be described, like for negative seeds"""
+    from maze.replay import Replay
+    try:
+        return Replay(maze_class, maze_size[0], maze_size[1],
+            'randomized_prim', seed)
+    except ValueError:
+        return None
+
+
+def _make_task(task, generated = None):
+    """Generates, solves and renders a single maze.
+
+    This function is run in the worker processes when generating more than one
+    maze.
+
+    If a cache is used and the image is cached, it is copied instead.
+
+    :param task: The task, expressed as
+        ``(maze_class, maze_size, seed, filename, image_options, cache)``.
+
+    :param generated: The maze and its solution, if they have already been
+        generated.
+    :type generated: (maze.BaseMaze, [(int, int)])
+    """
+    maze_class, maze_size, seed, filename, image_options, cache = task
+
+    # Copy the image from the cache if possible
+    key = None
+    suffix = os.path.extsep + filename.rsplit(os.path.extsep, 1)[1]
+    replay = None if cache is None or seed is None \
+        else _replay(maze_class, maze_size, seed)
+    if not replay is None:
+        from maze.cache import make_key
+        key = make_key(replay, **image_options)
+        path = cache.get(key, suffix)
+        if not path is None:
+            import shutil
+            try:
+                shutil.copyfile(path, filename)
+                return
+            except (IOError, OSError):
+                # The file was evicted after it was found; render the image
+                pass
+
+    maze, solution = generated or make_maze(maze_class, maze_size, seed, cache)
+    if _is_raster(maze_class, filename):
+        from .raster import make_raster_png
+        make_raster_png(maze, solution, filename, **image_options)
+    else:
+        from .image import make_image
+        make_image(maze, solution, output = _output(filename), **image_options)
+
+    if not key is None:
+        cache.put_file(key, suffix, filename)
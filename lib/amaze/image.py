@@ -17,10 +17,23 @@
 try:
     import cairocffi as cairo
 except ImportError:
-    import cairo
-import math
+    try:
+        import cairo
+    except ImportError:
+        # Only the functions drawing on a cairo context require cairo
+        cairo = None
 import sys
 
+from maze.geometry import wall_lines
+
+
+def require_cairo():
+    """Makes sure that cairo is available.
+
+    :raises ImportError: if neither cairocffi nor pycairo is installed
+    """
+    if cairo is None:
+        raise ImportError('This function requires cairo')
 
 def calculate_bounds(maze):
     """Calculates the bounds of the walls of a maze.
@@ -28,23 +41,63 @@ def calculate_bounds(maze):
     :param maze.BaseMaze maze: The maze whose bounds to calculate.
 
     :return: the tuple ``(min_x, min_y, max_x, max_y)``
+    :rtype: (float, float, float, float)
+    """
+    return maze.physical_bounds()
+
+def image_size(maze, room_size, wall_width):
+    """Calculates the size of the image of a maze.
+
+    :param maze.BaseMaze maze: The maze.
+
+    :param room_size: The size of a room in the image.
+    :type room_size: (int, int)
+
+    :param int wall_width: The width of the walls.
+
+    :return: the tuple ``(width, height)``
     :rtype: (int, int)
     """
-    class infinity(object):
-        def __cmp__(self, other):
-            if isinstance(other, type(self)): return 0
-            else: return 1
-    max_x, max_y = 0, 0
-    min_x, min_y = infinity(), infinity()
-    for wall in maze.edge_walls:
-        a = wall.span[0]
-        cx, cy = maze.get_center(wall.room_pos)
-        px, py = cx + math.cos(a), cy + math.sin(a)
-        max_x, max_y = max(max_x, px), max(max_y, py)
-        min_x, min_y = min(min_x, px), min(min_y, py)
-    return (min_x, min_y, max_x, max_y)
-
-def draw_walls(maze, ctx, coords):
+    room_width, room_height = room_size
+    min_x, min_y, max_x, max_y = calculate_bounds(maze)
+
+    return (
+        int((max_x - min_x) * room_width) + 2 * wall_width + 1,
+        int((max_y - min_y) * room_height) + 2 * wall_width + 1)
+
+def make_coords(maze, room_size, wall_width, height):
+    """Creates a function converting maze coordinates to image coordinates.
+
+    The coordinates are scaled according to the room dimensions and offset with
+    the minimum coordinates in the respective dimension and then rounded to make
+    the lines sharp when drawing.
+
+    :param maze.BaseMaze maze: The maze.
+
+    :param room_size: The size of a room in the image.
+    :type room_size: (int, int)
+
+    :param int wall_width: The width of the walls.
+
+    :param int height: The height of the image, as returned by
+        :func:`image_size`.
+
+    :return: a callable that transforms its parameters ``(maze_x, maze_y)`` to
+        coordinates in the image
+    """
+    room_width, room_height = room_size
+    min_x, min_y, max_x, max_y = calculate_bounds(maze)
+
+    def coords(x, y):
+        return (
+            wall_width + (
+                round((x - min_x) * room_width)),
+            height - wall_width - (
+                round((y - min_y) * room_height)))
+
+    return coords
+
+def draw_walls(maze, ctx, coords, region = None):
     """Draws the walls of a maze.
 
     :param maze.BaseMaze maze: The maze whose walls to draw.
@@ -53,93 +106,18 @@ def draw_walls(maze, ctx, coords):
 
     :param coords: A callable that transforms its parameters
         ``(maze_x, maze_y)`` to coordinates in the cairo context.
-    """
-    # Note that we have not yet painted any walls for any rooms
-    for room_pos in maze.room_positions:
-        maze[room_pos].painted = set()
-
-    # Initialise the wall queue
-    queue = []
-    def extend_queue():
-        """Finds a room with walls that have not yet been painted and adds them
-        to queue.
-        """
-        for room_pos in maze.room_positions:
-            remaining = [w
-                for w in maze.walls(room_pos)
-                if not int(w) in maze[w.room_pos]
-                    and not int(w) in maze[w.room_pos].painted]
-            if remaining:
-                queue.extend(remaining)
-                break
-    extend_queue()
-
-    # Draw the walls
-    needs_move = True
-    while queue:
-        # Get the last wall from the queue and retrieve all remaining walls in
-        # its corner; we add the back of the walls in order to actually move
-        # along the wall instead of just spinning around the corner
-        wall = queue.pop()
-        walls = [w.back if w.back in maze else w
-            for w in wall.corner_walls
-            if w in maze or w.back in maze]
-        remaining = [w for w in walls
-            if not int(w) in maze[w.room_pos]
-                and not int(w) in maze[w.room_pos].painted
-                and not w == wall]
-
-        # Queue all remaining walls for later use
-        queue.extend(remaining)
-
-        start_angle, end_angle = wall.span
-        offset_x, offset_y = maze.get_center(wall.room_pos)
-
-        def angle_to_coordinate(angle):
-            """Converts an angle from a wall span in the current room to a
-            coordinate.
-
-            :param float angle: The angle to convert.
-
-            :return: the tuple ``(x, y)``
-            :rtype: (int, int)
-            """
-            return coords(
-                offset_x + math.cos(angle),
-                offset_y + math.sin(angle))
-
-        # If we need to move, we move to the end of the span since
-        # maze.Wall.from_corner will yield walls with the start span in the
-        # given corner
-        if needs_move:
-            ctx.move_to(*angle_to_coordinate(end_angle))
-        ctx.line_to(*angle_to_coordinate(start_angle))
-
-        # Mark the current wall as painted, and the wall on the other side as
-        # well as long as this is not a wall along the edge of the maze
-        maze[wall.room_pos].painted.add(int(wall))
-        if not maze.edge(wall):
-            maze[wall.back.room_pos].painted.add(int(wall.back))
-
-        # If we have reached a dead end, we need to stroke the line and start
-        # over with a wall from the queue
-        if not remaining:
-            ctx.stroke()
-            needs_move = True
-        else:
-            needs_move = False
 
-        # If the queue is empty, check if any walls remain
-        if not queue:
-            extend_queue()
-
-    ctx.stroke()
-
-    # Remove the temporary attribute
-    for room_pos in maze.room_positions:
-        del maze[room_pos].painted
+    :param region: The region of rooms whose walls to draw, expressed as
+        ``(x, y, width, height)``. If this is ``None``, all walls are drawn.
+    :type region: (int, int, int, int)
+    """
+    for polyline in wall_lines(maze, region):
+        ctx.move_to(*coords(*polyline[0]))
+        for point in polyline[1:]:
+            ctx.line_to(*coords(*point))
+        ctx.stroke()
 
-def draw_path_smooth(maze, ctx, coords, solution):
+def draw_path_smooth(maze, ctx, coords, solution, first = 0, last = None):
     """Draws the solution path using a smooth *bezier* curve.
 
     :param maze.BaseMaze maze: The maze whose solution to draw.
@@ -151,16 +129,35 @@ def draw_path_smooth(maze, ctx, coords, solution):
 
     :param solution: The solution. This must be a list of all rooms to traverse.
     :type solution: [(int, int)]
+
+    :param int first: The index in *solution* of the first room whose part of
+        the path to draw. The part of a room starts where the path enters it.
+
+    :param int last: The index in *solution* of the last room whose part of the
+        path to draw. If this is ``None``, the path is drawn to the end.
+
+    The parts of the path drawn are identical to the corresponding parts of the
+    entire path.
     """
-    room_positions = ((solution[i - 1], solution[i], solution[i + 1])
-        for i in range(1, len(solution) - 1))
-    ctx.move_to(*coords(*maze.get_center(solution[0])))
-    for (previous_pos, current_pos, next_pos) in room_positions:
+    if last is None:
+        last = len(solution) - 1
+    first = max(1, first)
+    centers = [coords(*maze.get_center(room_pos))
+        for room_pos in solution[first - 1:last + 2]]
+
+    # Start in the first room, or where the path enters the room first
+    if first == 1 or len(solution) < 2:
+        ctx.move_to(*centers[0])
+    else:
+        ctx.move_to(
+            0.5 * (centers[0][0] + centers[1][0]),
+            0.5 * (centers[0][1] + centers[1][1]))
+
+    for i in range(first, min(last, len(solution) - 2) + 1):
         # Draw a bezier curve from the wall to the previous room to the wall
         # to the next room
-        previous_center = coords(*maze.get_center(previous_pos))
-        current_center = coords(*maze.get_center(current_pos))
-        next_center = coords(*maze.get_center(next_pos))
+        previous_center, current_center, next_center = \
+            centers[i - first:i - first + 3]
         d = 0.3
         ctx.curve_to(
             d * previous_center[0] + (1.0 - d) * current_center[0],
@@ -169,7 +166,10 @@ def draw_path_smooth(maze, ctx, coords, solution):
             d * next_center[1] + (1.0 - d) * current_center[1],
             0.5 * (current_center[0] + next_center[0]),
             0.5 * (current_center[1] + next_center[1]))
-    ctx.line_to(*coords(*maze.get_center(solution[-1])))
+
+    # Draw the final line to the centre of the last room
+    if last >= len(solution) - 1:
+        ctx.line_to(*centers[-1])
     ctx.stroke()
 
 def draw_path(maze, ctx, coords, solution):
@@ -196,15 +196,11 @@ def draw_path(maze, ctx, coords, solution):
 
 def make_image(maze, solution, room_size, output, background_color, wall_color,
         path_color, wall_width, path_width, path_smooth):
-    room_width, room_height = room_size
     image_create, image_write = output
-
-    # Calculate the actual size of the image
-    min_x, min_y, max_x, max_y = calculate_bounds(maze)
+    require_cairo()
 
     # Create the cairo surface and context
-    width = int((max_x - min_x) * room_width) + 2 * wall_width + 1
-    height = int((max_y - min_y) * room_height) + 2 * wall_width + 1
+    width, height = image_size(maze, room_size, wall_width)
     surface = image_create(width, height)
     ctx = cairo.Context(surface)
 
@@ -216,23 +212,7 @@ def make_image(maze, solution, room_size, output, background_color, wall_color,
     ctx.set_source_rgba(*background_color)
     ctx.paint()
 
-    def coords(x, y):
-        """
-        Converts coordinates from maze coordinates to context coordinates.
-
-        The coordinates are scaled according to the room dimesions and offset
-        with the minimum coordinates in the respective dimension and then
-        rounded to make the lines sharp when drawing.
-
-        @param x, y
-            The maze coordinates to convert.
-        @return coordinates to use for drawing
-        """
-        return (
-            wall_width + (
-                round((x - min_x) * room_width)),
-            height - wall_width - (
-                round((y - min_y) * room_height)))
+    coords = make_coords(maze, room_size, wall_width, height)
 
     # Draw the walls
     ctx.set_source_rgba(*wall_color)
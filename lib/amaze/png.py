@@ -0,0 +1,189 @@
+# coding=utf-8
+# pymaze
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+import struct
+import sys
+import zlib
+
+
+class PNGWriter(object):
+    """A writer of PNG images that streams rows to a file.
+
+    Rows are compressed as they are written, so the entire image never has to
+    be kept in memory.
+
+    :param f: The file object to which to write. It must be opened in binary
+        mode.
+
+    :param int width: The width of the image.
+
+    :param int height: The height of the image.
+
+    :param bool alpha: Whether rows contain an alpha channel. If this is
+        ``True``, every pixel is four bytes, *RGBA*, and otherwise three bytes,
+        *RGB*.
+
+    :param int level: The zlib compression level.
+
+    :param palette: The colours of a palette image as *RGBA* tuples of
+        integers. If this is specified, every pixel is a single byte index into
+        the palette, and *alpha* is ignored.
+    :type palette: [(int, int, int, int)]
+    """
+    #: The size of the IDAT chunks written
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self, f, width, height, alpha = True, level = 6,
+            palette = None):
+        self._f = f
+        self._width = width
+        self._height = height
+        if not palette is None:
+            self._row_size = width
+            color_type = 3
+        else:
+            self._row_size = width * (4 if alpha else 3)
+            color_type = 6 if alpha else 2
+        self._rows = 0
+        self._compressor = zlib.compressobj(level)
+        self._buffer = []
+        self._buffered = 0
+
+        f.write(b'\x89PNG\r\n\x1a\n')
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB',
+            width, height,
+            8,
+            color_type,
+            0, 0, 0))
+        if not palette is None:
+            self._chunk(b'PLTE', bytes(bytearray(
+                c for color in palette for c in color[:3])))
+            self._chunk(b'tRNS', bytes(bytearray(
+                color[3] for color in palette)))
+
+    def write_row(self, row):
+        """Writes a single row.
+
+        :param bytes row: The pixel data.
+
+        :raises ValueError: if the row has the wrong size, or if all rows have
+            already been written
+        """
+        if len(row) != self._row_size:
+            raise ValueError('Invalid row size: %d' % len(row))
+        if self._rows >= self._height:
+            raise ValueError('Too many rows')
+        self._rows += 1
+
+        # Every row is prefixed with the filter type; we use no filter
+        self._compress(b'\0')
+        self._compress(row)
+
+    def write_rows(self, rows):
+        """Writes a number of rows.
+
+        :param rows: The rows to write.
+        :type rows: [bytes]
+        """
+        for row in rows:
+            self.write_row(row)
+
+    def close(self):
+        """Finishes the image.
+
+        The underlying file object is not closed.
+
+        :raises ValueError: if not all rows have been written
+        """
+        if self._rows != self._height:
+            raise ValueError('Only %d of %d rows were written' % (
+                self._rows, self._height))
+        self._buffer.append(self._compressor.flush())
+        self._flush()
+        self._chunk(b'IEND', b'')
+
+    def _compress(self, data):
+        """Compresses data and writes an IDAT chunk if enough data is
+        buffered"""
+        compressed = self._compressor.compress(data)
+        if compressed:
+            self._buffer.append(compressed)
+            self._buffered += len(compressed)
+            if self._buffered >= self.CHUNK_SIZE:
+                self._flush()
+
+    def _flush(self):
+        """Writes all buffered compressed data as an IDAT chunk"""
+        data = b''.join(self._buffer)
+        if data:
+            self._chunk(b'IDAT', data)
+        self._buffer = []
+        self._buffered = 0
+
+    def _chunk(self, kind, data):
+        """Writes a PNG chunk"""
+        self._f.write(struct.pack('>I', len(data)))
+        self._f.write(kind)
+        self._f.write(data)
+        self._f.write(struct.pack('>I',
+            zlib.crc32(kind + data) & 0xFFFFFFFF))
+
+
+def from_argb32(data, width, height, stride):
+    """Converts pixel data in the cairo format *ARGB32* to *RGBA* rows.
+
+    *ARGB32* pixels are native endian 32 bit integers with premultiplied alpha.
+
+    :param bytes data: The pixel data.
+
+    :param int width: The width of the image.
+
+    :param int height: The height of the image.
+
+    :param int stride: The number of bytes per row in *data*.
+
+    :return: the rows as *RGBA* data
+    :rtype: [bytes]
+    """
+    if sys.byteorder == 'little':
+        b, g, r, a = 0, 1, 2, 3
+    else:
+        a, r, g, b = 0, 1, 2, 3
+
+    result = []
+    for y in range(height):
+        source = bytes(data[y * stride:y * stride + 4 * width])
+        row = bytearray(4 * width)
+        row[0::4] = source[r::4]
+        row[1::4] = source[g::4]
+        row[2::4] = source[b::4]
+        row[3::4] = source[a::4]
+
+        # Pixels that are not opaque must be unpremultiplied
+        if bytes(row[3::4]).count(b'\xff') != width:
+            for i in range(3, 4 * width, 4):
+                alpha = row[i]
+                if alpha == 0xFF:
+                    continue
+                elif alpha == 0:
+                    row[i - 3:i] = b'\0\0\0'
+                else:
+                    for j in range(i - 3, i):
+                        row[j] = min(0xFF,
+                            (row[j] * 0xFF + alpha // 2) // alpha)
+        result.append(bytes(row))
+
+    return result
@@ -0,0 +1,235 @@
+# coding=utf-8
+# pymaze
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import io
+import math
+import os
+import re
+import threading
+
+from .png import PNGWriter
+from .tiled import TileRenderer
+
+
+class TilePyramid(object):
+    """A slippy map tile pyramid of the image of a maze.
+
+    Tiles are addressed as ``(zoom, x, y)``. At the maximum zoom level, the
+    tiles cover the image at full size, and for every lower level the image is
+    scaled down by half, so that the entire image fits in the single tile
+    ``(0, 0, 0)``.
+
+    Tiles are rendered when they are first requested, and only the rooms
+    intersecting a tile are drawn, so the entire maze is never rendered unless
+    all tiles are requested. The most recently used tiles are cached.
+
+    :param maze.BaseMaze maze: The maze to render.
+
+    :param solution: The solution. This must be a list of all rooms to traverse.
+    :type solution: [(int, int)]
+
+    :param int tile_size: The width and height of the tiles.
+
+    :param int cache_size: The maximum number of encoded tiles to keep in the
+        cache.
+
+    See :func:`amaze.image.make_image` for a description of the other
+    parameters.
+    """
+    #: The default width and height of tiles
+    TILE_SIZE = 256
+
+    #: The default number of tiles to cache
+    CACHE_SIZE = 256
+
+    def __init__(self, maze, solution, room_size, background_color, wall_color,
+            path_color, wall_width, path_width, path_smooth,
+            tile_size = TILE_SIZE, cache_size = CACHE_SIZE):
+        self._renderer = TileRenderer(maze, solution, room_size,
+            background_color, wall_color, path_color, wall_width, path_width,
+            path_smooth)
+        self._tile_size = tile_size
+        self._cache_size = cache_size
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+        # Find the zoom level at which the image fits in a single tile
+        size = max(self._renderer.size)
+        self._max_zoom = 0
+        while size > tile_size << self._max_zoom:
+            self._max_zoom += 1
+
+    @property
+    def tile_size(self):
+        """The width and height of the tiles"""
+        return self._tile_size
+
+    @property
+    def max_zoom(self):
+        """The zoom level at which the image is rendered at full size"""
+        return self._max_zoom
+
+    def scale(self, zoom):
+        """Returns the scale of the image at a zoom level.
+
+        :param int zoom: The zoom level.
+
+        :return: the scale
+        :rtype: float
+        """
+        return 2.0 ** (zoom - self._max_zoom)
+
+    def tile_count(self, zoom):
+        """Returns the number of tiles at a zoom level.
+
+        :param int zoom: The zoom level.
+
+        :return: the tuple ``(columns, rows)``
+        :rtype: (int, int)
+
+        :raises IndexError: if *zoom* is not a valid zoom level
+        """
+        if zoom < 0 or zoom > self._max_zoom:
+            raise IndexError(zoom)
+        scale = self.scale(zoom)
+        return tuple(
+            int(math.ceil(math.ceil(d * scale) / self._tile_size))
+            for d in self._renderer.size)
+
+    def tile(self, zoom, x, y):
+        """Returns a single tile as a PNG image.
+
+        :param int zoom: The zoom level.
+
+        :param int x: The column of the tile.
+
+        :param int y: The row of the tile; ``0`` is the top row.
+
+        :return: the encoded PNG image
+        :rtype: bytes
+
+        :raises IndexError: if the tile does not exist
+        """
+        columns, rows = self.tile_count(zoom)
+        if x < 0 or x >= columns or y < 0 or y >= rows:
+            raise IndexError((zoom, x, y))
+
+        key = (zoom, x, y)
+        with self._lock:
+            try:
+                result = self._cache.pop(key)
+                self._cache[key] = result
+                return result
+            except KeyError:
+                pass
+
+        result = self._render(zoom, x, y)
+
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last = False)
+
+        return result
+
+    def tiles(self, zooms = None):
+        """Generates the addresses of all tiles.
+
+        :param zooms: The zoom levels to include. If this is ``None``, all
+            levels are included.
+        :type zooms: [int]
+
+        :return: a generator yielding ``(zoom, x, y)``
+        """
+        for zoom in range(self._max_zoom + 1) if zooms is None else zooms:
+            columns, rows = self.tile_count(zoom)
+            for x in range(columns):
+                for y in range(rows):
+                    yield (zoom, x, y)
+
+    def write(self, directory, zooms = None):
+        """Writes tiles to a directory as ``zoom/x/y.png``.
+
+        Tiles are written one at a time and are not added to the cache.
+
+        :param str directory: The root directory of the pyramid.
+
+        :param zooms: The zoom levels to write. If this is ``None``, all levels
+            are written.
+        :type zooms: [int]
+        """
+        for zoom, x, y in self.tiles(zooms):
+            path = os.path.join(directory, str(zoom), str(x))
+            if not os.path.isdir(path):
+                os.makedirs(path)
+            with open(os.path.join(path, '%d.png' % y), 'wb') as f:
+                f.write(self._render(zoom, x, y))
+
+    def _render(self, zoom, x, y):
+        """Renders and encodes a single tile"""
+        size = self._tile_size
+        rows = self._renderer.render(
+            (x * size, y * size, size, size),
+            self.scale(zoom))
+
+        f = io.BytesIO()
+        writer = PNGWriter(f, size, size)
+        writer.write_rows(rows)
+        writer.close()
+        return f.getvalue()
+
+
+def serve(pyramid, address = ('localhost', 8000)):
+    """Serves the tiles of a pyramid over HTTP until interrupted.
+
+    Tiles are available as ``/zoom/x/y.png``.
+
+    :param TilePyramid pyramid: The pyramid to serve.
+
+    :param address: The address on which to listen.
+    :type address: (str, int)
+    """
+    try:
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+    except ImportError:
+        from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            m = re.match(r'^/(\d+)/(\d+)/(\d+)\.png$', self.path)
+            try:
+                if m is None:
+                    raise IndexError(self.path)
+                data = pyramid.tile(*(int(g) for g in m.groups()))
+            except IndexError:
+                self.send_error(404)
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/png')
+            self.send_header('Content-Length', str(len(data)))
+            self.send_header('Cache-Control', 'max-age=86400')
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = HTTPServer(address, Handler)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
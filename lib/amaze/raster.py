@@ -0,0 +1,210 @@
+# coding=utf-8
+# pymaze
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+from maze.geometry import wall_runs
+
+from .image import image_size, make_coords
+from .png import PNGWriter
+
+
+# The pixel values of the canvas; they are indices into the palette
+_BACKGROUND, _WALL, _PATH, _PATH_ON_WALL = range(4)
+
+# The translation table used to paint walls; walls are painted before the path
+_WALL_TABLE = bytes(bytearray([_WALL] * 256))
+
+# The translation table used to paint the path; it keeps track of whether the
+# path is painted on top of a wall
+_PATH_TABLE = bytes(bytearray(
+    [_PATH, _PATH_ON_WALL, _PATH, _PATH_ON_WALL] + list(range(4, 256))))
+
+
+class _Canvas(object):
+    """A canvas of single byte pixels stored in a bytearray.
+
+    :param int width: The width of the canvas.
+
+    :param int height: The height of the canvas.
+    """
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self._data = bytearray(width * height)
+
+    def fill(self, x0, y0, x1, y1, table):
+        """Translates all pixels of a rectangle.
+
+        The rectangle is clipped to the canvas.
+
+        :param int x0: The left edge of the rectangle.
+
+        :param int y0: The top edge of the rectangle.
+
+        :param int x1: The right edge of the rectangle, exclusive.
+
+        :param int y1: The bottom edge of the rectangle, exclusive.
+
+        :param bytes table: The translation table to apply.
+        """
+        x0, x1 = max(0, x0), min(self.width, x1)
+        y0, y1 = max(0, y0), min(self.height, y1)
+        if x0 >= x1 or y0 >= y1:
+            return
+        data = self._data
+        width = self.width
+
+        # Use one slice per line along the longest dimension of the rectangle
+        if x1 - x0 < y1 - y0:
+            for x in range(x0, x1):
+                s = slice(y0 * width + x, y1 * width + x, width)
+                data[s] = data[s].translate(table)
+        else:
+            for y in range(y0, y1):
+                s = slice(y * width + x0, y * width + x1)
+                data[s] = data[s].translate(table)
+
+    def rows(self):
+        """Generates the rows of the canvas.
+
+        :return: a generator yielding the pixel data of every row
+        """
+        for y in range(self.height):
+            yield bytes(self._data[y * self.width:(y + 1) * self.width])
+
+
+class _NumpyCanvas(_Canvas):
+    """A canvas of single byte pixels stored in a NumPy array.
+
+    :param int width: The width of the canvas.
+
+    :param int height: The height of the canvas.
+    """
+    def __init__(self, width, height):
+        import numpy
+        self._numpy = numpy
+        self.width = width
+        self.height = height
+        self._data = numpy.zeros((height, width), numpy.uint8)
+
+    def fill(self, x0, y0, x1, y1, table):
+        region = self._data[max(0, y0):y1, max(0, x0):x1]
+        region[...] = self._numpy.frombuffer(table, self._numpy.uint8)[region]
+
+    def rows(self):
+        for row in self._data:
+            yield row.tobytes()
+
+
+def _color(color):
+    """Converts a colour with components in the range ``[0.0, 1.0]`` to an
+    *RGBA* tuple of integers"""
+    color = tuple(color)
+    if len(color) == 3:
+        color += (1.0,)
+    return tuple(int(round(255 * c)) for c in color)
+
+
+def _over(top, bottom):
+    """Composites the *RGBA* colour top over bottom"""
+    top_alpha, bottom_alpha = top[3] / 255.0, bottom[3] / 255.0
+    alpha = top_alpha + bottom_alpha * (1.0 - top_alpha)
+    if alpha == 0.0:
+        return (0, 0, 0, 0)
+    return tuple(
+        int(round((t * top_alpha + b * bottom_alpha * (1.0 - top_alpha))
+            / alpha))
+        for t, b in zip(top[:3], bottom[:3])) + (int(round(255 * alpha)),)
+
+
+def make_raster_png(maze, solution, f, room_size, background_color,
+        wall_color, path_color, wall_width, path_width, path_smooth = False,
+        use_numpy = None):
+    """Renders a maze with square rooms as a PNG image without cairo.
+
+    Every maximal run of walls and every segment of the path is painted as a
+    rectangle using slice assignments, and the image is written as a palette
+    PNG.
+
+    Since line caps are square, corners differ slightly from the image created
+    by :func:`amaze.image.make_image`, and the path is always drawn using
+    straight lines; *path_smooth* is ignored.
+
+    :param maze.quad.Maze maze: The maze to render.
+
+    :param solution: The solution. This must be a list of all rooms to traverse.
+    :type solution: [(int, int)]
+
+    :param f: The file name or binary file object to which to write the image.
+
+    :param bool use_numpy: Whether to paint on a NumPy array instead of a
+        bytearray. If this is ``None``, NumPy is used if it is available.
+
+    See :func:`amaze.image.make_image` for a description of the other
+    parameters.
+
+    :raises ValueError: if the rooms of the maze are not square
+    """
+    width, height = image_size(maze, room_size, wall_width)
+    coords = make_coords(maze, room_size, wall_width, height)
+
+    if use_numpy is None:
+        try:
+            import numpy
+            use_numpy = True
+        except ImportError:
+            use_numpy = False
+    canvas = (_NumpyCanvas if use_numpy else _Canvas)(width, height)
+
+    def paint(start, end, line_width, table):
+        x0, y0 = (int(c) for c in coords(*start))
+        x1, y1 = (int(c) for c in coords(*end))
+        lo = line_width // 2
+        hi = line_width - lo
+        canvas.fill(
+            min(x0, x1) - lo, min(y0, y1) - lo,
+            max(x0, x1) + hi, max(y0, y1) + hi,
+            table)
+
+    # Paint the walls
+    for start, end in wall_runs(maze):
+        paint(start, end, wall_width, _WALL_TABLE)
+
+    # Paint the path
+    centers = [maze.get_center(room_pos) for room_pos in solution]
+    for start, end in zip(centers, centers[1:]):
+        paint(start, end, path_width, _PATH_TABLE)
+
+    background, wall, path = (_color(c)
+        for c in (background_color, wall_color, path_color))
+    palette = [
+        background,
+        _over(wall, background),
+        _over(path, background),
+        _over(path, _over(wall, background))]
+
+    close = False
+    if not hasattr(f, 'write'):
+        f = open(f, 'wb')
+        close = True
+
+    try:
+        writer = PNGWriter(f, width, height, palette = palette)
+        writer.write_rows(canvas.rows())
+        writer.close()
+
+    finally:
+        if close:
+            f.close()
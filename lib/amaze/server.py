@@ -0,0 +1,362 @@
+# coding=utf-8
+# pymaze
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import io
+import math
+import re
+import threading
+
+try:
+    from urllib.parse import parse_qs, urlparse
+except ImportError:
+    from urlparse import parse_qs, urlparse
+
+from maze.quad import Maze
+from maze.tri import TriMaze
+from maze.hex import HexMaze
+
+
+#: The default number of responses to cache
+CACHE_SIZE = 256
+
+#: The maximum number of rooms in a maze that may be requested
+MAX_ROOMS = 1 << 20
+
+#: The maximum room size that may be requested
+MAX_ROOM_SIZE = 200
+
+#: The maximum number of pixels, as the number of rooms multiplied by the square
+#: of the room size, of an image that may be requested
+MAX_PIXELS = 1 << 24
+
+#: The formats that may be requested, mapped to their content types
+FORMATS = {
+    'bin': 'application/octet-stream',
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+    'txt': 'text/plain; charset=utf-8'}
+
+#: The maze classes that may be requested, mapped to their number of walls
+MAZE_CLASSES = dict((len(mc.Wall.WALLS), mc) for mc in (
+    Maze, TriMaze, HexMaze))
+
+# The query parameters of a request, mapped to their default values; the seed
+# is required, and the parameters following it only affect images
+_PARAMETERS = collections.OrderedDict((
+    ('walls', 4),
+    ('width', 15),
+    ('height', 10),
+    ('seed', None),
+    ('room_size', 30),
+    ('wall_width', 2),
+    ('path_width', 2),
+    ('path_smooth', 0),
+    ('background_color', '000000'),
+    ('wall_color', 'ffffff'),
+    ('path_color', 'cc6633')))
+
+
+def parse_request(path):
+    """Parses the path of a request.
+
+    The path must be on the form ``/maze.<format>?<parameters>``, where
+    *format* is one of :attr:`FORMATS`. The parameters are ``walls``,
+    ``width``, ``height``, ``seed``, ``room_size``, ``wall_width``,
+    ``path_width`` and ``path_smooth``, which are integers, and
+    ``background_color``, ``wall_color`` and ``path_color``, which are on the
+    form ``RRGGBB``. Only ``seed`` is required, and the parameters following
+    it are ignored unless an image format is requested.
+
+    :param str path: The path of the request.
+
+    :return: the request, expressed as the tuple ``(format, walls, width,
+        height, seed, room_size, wall_width, path_width, path_smooth,
+        background_color, wall_color, path_color)``; two paths requesting the
+        same response are parsed to the same tuple
+
+    :raises ValueError: if the path is invalid
+    """
+    url = urlparse(path)
+    m = re.match(r'^/maze\.(\w+)$', url.path)
+    if m is None or not m.group(1) in FORMATS:
+        raise ValueError('Unknown resource: %s' % url.path)
+
+    query = parse_qs(url.query)
+    for name in query:
+        if not name in _PARAMETERS:
+            raise ValueError('Unknown parameter: %s' % name)
+
+    values = []
+    for name, default in _PARAMETERS.items():
+        value = query.get(name, [default])[-1]
+        if value is None:
+            raise ValueError('The parameter %s is required' % name)
+        if isinstance(default, str):
+            if not re.match(r'^[0-9A-Fa-f]{6}$', value):
+                raise ValueError('%s is not a valid colour' % value)
+            values.append(value.lower())
+        else:
+            try:
+                values.append(int(value))
+            except ValueError:
+                raise ValueError('%s is not a valid integer' % value)
+
+    (walls, width, height, seed, room_size, wall_width, path_width,
+        path_smooth) = values[:8]
+    if not walls in MAZE_CLASSES:
+        raise ValueError('Unsupported number of walls: %d' % walls)
+    if width < 1 or height < 1 or width * height > MAX_ROOMS:
+        raise ValueError('Unsupported maze size: %dx%d' % (width, height))
+    if room_size < 1 or room_size > MAX_ROOM_SIZE:
+        raise ValueError('Unsupported room size: %d' % room_size)
+    image = not m.group(1) in ('bin', 'txt')
+    if image and width * height * room_size * room_size > MAX_PIXELS:
+        raise ValueError('Unsupported image size: %dx%d rooms of size %d' % (
+            width, height, room_size))
+    if wall_width < 2 or wall_width & 1 or path_width < 2 or path_width & 1:
+        raise ValueError('Line widths must be even numbers greater than 1')
+    if wall_width > room_size or path_width > room_size:
+        raise ValueError('Line widths must not exceed the room size')
+    values[7] = bool(path_smooth)
+
+    # Ignore the image parameters unless an image is requested, so that
+    # requests differing only in them share a cached response
+    if not image:
+        values[4:] = [
+            bool(default) if name == 'path_smooth' else default
+            for name, default in list(_PARAMETERS.items())[4:]]
+
+    return (m.group(1),) + tuple(values)
+
+
+def render(request):
+    """Generates and renders the maze described by a request.
+
+    This function is run in the worker processes.
+
+    :param request: The request, as returned by :func:`parse_request`.
+
+    :return: the response body
+    :rtype: bytes
+
+    :raises ValueError: if the maze cannot be rendered in the format requested
+    """
+    from . import make_maze
+    (format, walls, width, height, seed, room_size, wall_width, path_width,
+        path_smooth, background_color, wall_color, path_color) = request
+
+    maze, solution = make_maze(MAZE_CLASSES[walls], (width, height), seed)
+
+    if format == 'bin':
+        return maze.to_bytes('zlib')
+
+    elif format == 'txt':
+        from .terminal import print_maze
+        if walls != 4:
+            raise ValueError('Only square mazes can be rendered as text')
+        f = io.StringIO()
+        print_maze(maze, solution, f = f)
+        return f.getvalue().encode('utf-8')
+
+    # Render an image; the room size is interpreted as by the command line
+    # interface
+    options = dict(
+        room_size = (int(0.5 * math.sqrt(2.0) * room_size),) * 2,
+        background_color = _color(background_color),
+        wall_color = _color(wall_color),
+        path_color = _color(path_color),
+        wall_width = wall_width,
+        path_width = path_width,
+        path_smooth = path_smooth)
+    f = io.BytesIO()
+    if format == 'svg':
+        from .svg import make_svg
+        make_svg(maze, solution, f, **options)
+    elif walls == 4:
+        from .raster import make_raster_png
+        make_raster_png(maze, solution, f, **options)
+    else:
+        from .image import make_image
+        from . import _cairo
+        make_image(maze, solution, output = (
+                lambda w, h: _cairo().ImageSurface(
+                    _cairo().FORMAT_ARGB32, w, h),
+                lambda surface: surface.write_to_png(f)),
+            **options)
+    return f.getvalue()
+
+
+def _color(value):
+    """Converts a colour on the form ``RRGGBB`` to the tuple
+    ``(r, g, b, a)``"""
+    return tuple(int(value[i:i + 2], 16) / 255.0 for i in (0, 2, 4)) + (1.0,)
+
+
+class MazeService(object):
+    """A generator and renderer of mazes that caches its responses.
+
+    :param int cache_size: The maximum number of responses to keep in the
+        cache.
+
+    :param int processes: The number of worker processes to use. If this is
+        ``None``, the number of CPUs is used, and if it is ``1``, no worker
+        processes are started and mazes are rendered by the calling thread.
+    """
+    def __init__(self, cache_size = CACHE_SIZE, processes = None):
+        self._cache_size = cache_size
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()
+        if processes == 1:
+            self._pool = None
+        else:
+            import multiprocessing
+            self._pool = multiprocessing.Pool(processes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get(self, request):
+        """Returns the response to a request.
+
+        :param request: The request, as returned by :func:`parse_request`.
+
+        :return: the response body
+        :rtype: bytes
+
+        :raises ValueError: if the maze cannot be rendered in the format
+            requested
+        """
+        with self._lock:
+            try:
+                result = self._cache.pop(request)
+                self._cache[request] = result
+                return result
+            except KeyError:
+                pass
+
+        # Render the response without holding the lock
+        if self._pool is None:
+            result = render(request)
+        else:
+            result = self._pool.apply(render, (request,))
+
+        with self._lock:
+            self._cache[request] = result
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last = False)
+
+        return result
+
+    def close(self):
+        """Stops the worker processes"""
+        if not self._pool is None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+
+def make_server(service, address = ('localhost', 8000)):
+    """Creates an HTTP server answering requests using a service.
+
+    Every request is handled in a separate thread. Mazes are requested as
+    described in :func:`parse_request`.
+
+    :param MazeService service: The service used to respond.
+
+    :param address: The address on which to listen.
+    :type address: (str, int)
+
+    :return: the server; call ``serve_forever`` to start it
+    """
+    try:
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+        from socketserver import ThreadingMixIn
+    except ImportError:
+        from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+        from SocketServer import ThreadingMixIn
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            try:
+                request = parse_request(self.path)
+                data = service.get(request)
+            except ValueError as e:
+                self.send_error(400, str(e))
+                return
+            except ImportError as e:
+                # The renderer for the format requested is not available
+                self.send_error(501, str(e))
+                return
+            except Exception as e:
+                self.log_error('Failed to respond to %s: %r', self.path, e)
+                self.send_error(500)
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', FORMATS[request[0]])
+            self.send_header('Content-Length', str(len(data)))
+            self.send_header('Cache-Control', 'max-age=86400')
+            self.end_headers()
+            self.wfile.write(data)
+
+    class Server(ThreadingMixIn, HTTPServer):
+        daemon_threads = True
+
+    return Server(address, Handler)
+
+
+def main(args = None):
+    """Runs the maze server until interrupted.
+
+    :param args: The command line arguments. If this is ``None``,
+        ``sys.argv[1:]`` is used.
+    :type args: [str]
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog = 'amaze serve',
+        description = ('An HTTP server that generates mazes. Mazes are '
+            'requested as /maze.FORMAT?seed=SEED, where FORMAT is one of '
+            '%s.') % ', '.join(sorted(FORMATS)))
+    parser.add_argument('--address',
+        default = 'localhost',
+        help = 'The address on which to listen.')
+    parser.add_argument('--port', type = int,
+        default = 8000,
+        help = 'The port on which to listen.')
+    parser.add_argument('--cache-size', type = int,
+        default = CACHE_SIZE,
+        help = 'The maximum number of responses to cache.')
+    parser.add_argument('--jobs', type = int,
+        default = None,
+        help = 'The number of processes used to generate and render mazes. If '
+            'this is not specified, the number of CPUs is used.')
+
+    namespace = parser.parse_args(args)
+
+    with MazeService(namespace.cache_size, namespace.jobs) as service:
+        server = make_server(service, (namespace.address, namespace.port))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
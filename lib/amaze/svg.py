@@ -0,0 +1,198 @@
+# coding=utf-8
+# pymaze
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+from maze.geometry import wall_lines
+
+from .image import image_size, make_coords
+
+
+class SVGPathWriter(object):
+    """A writer of SVG path data that streams to a file.
+
+    All commands are relative to the current point, and the data is written in
+    chunks, so the path never has to be kept in memory.
+
+    :param f: The binary file object to which to write.
+
+    :param int chunk_size: The number of bytes to buffer before writing.
+    """
+    #: The default number of bytes to buffer before writing
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self, f, chunk_size = CHUNK_SIZE):
+        self._f = f
+        self._chunk_size = chunk_size
+        self._buffer = []
+        self._buffered = 0
+        self._x = 0
+        self._y = 0
+
+    def move_to(self, x, y):
+        """Starts a new sub-path.
+
+        :param x: The horizontal coordinate.
+
+        :param y: The vertical coordinate.
+        """
+        self._write('m%s' % self._relative(x, y))
+
+    def line_to(self, *points):
+        """Adds straight lines to the current sub-path.
+
+        :param points: The points to which to draw lines, as ``(x, y)``.
+        """
+        if points:
+            self._write('l%s' % ' '.join(
+                self._relative(x, y) for x, y in points))
+
+    def curve_to(self, x1, y1, x2, y2, x3, y3):
+        """Adds a cubic bezier curve to the current sub-path.
+
+        :param x1: The horizontal coordinate of the first control point.
+
+        :param y1: The vertical coordinate of the first control point.
+
+        :param x2: The horizontal coordinate of the second control point.
+
+        :param y2: The vertical coordinate of the second control point.
+
+        :param x3: The horizontal coordinate of the end point.
+
+        :param y3: The vertical coordinate of the end point.
+        """
+        x, y = self._x, self._y
+        self._write('c%s,%s %s,%s %s' % (
+            _number(x1 - x), _number(y1 - y),
+            _number(x2 - x), _number(y2 - y),
+            self._relative(x3, y3)))
+
+    def flush(self):
+        """Writes all buffered data"""
+        if self._buffer:
+            self._f.write(''.join(self._buffer).encode('ascii'))
+        self._buffer = []
+        self._buffered = 0
+
+    def _relative(self, x, y):
+        """Returns the point relative to the current point, and makes it the
+        current point"""
+        result = '%s,%s' % (_number(x - self._x), _number(y - self._y))
+        self._x, self._y = x, y
+        return result
+
+    def _write(self, data):
+        """Buffers data and writes it if enough data is buffered"""
+        self._buffer.append(data)
+        self._buffered += len(data)
+        if self._buffered >= self._chunk_size:
+            self.flush()
+
+
+def _number(value):
+    """Formats a coordinate using as few characters as possible"""
+    if value == int(value):
+        return '%d' % value
+    else:
+        return ('%.2f' % value).rstrip('0').rstrip('.')
+
+
+def _color(name, color):
+    """Returns the SVG attributes for a colour with components in the range
+    ``[0.0, 1.0]``"""
+    result = '%s="rgb(%d,%d,%d)"' % (
+        (name,) + tuple(int(round(255 * c)) for c in color[:3]))
+    if len(color) > 3 and color[3] < 1.0:
+        result += ' %s-opacity="%s"' % (name, _number(round(color[3], 3)))
+    return result
+
+
+def make_svg(maze, solution, f, room_size, background_color, wall_color,
+        path_color, wall_width, path_width, path_smooth):
+    """Renders a maze as an SVG image.
+
+    The walls are written as a single path while they are traced, so the
+    entire image never has to be kept in memory. For mazes with square rooms,
+    every straight run of walls is a single line.
+
+    :param maze.BaseMaze maze: The maze to render.
+
+    :param solution: The solution. This must be a list of all rooms to traverse.
+    :type solution: [(int, int)]
+
+    :param f: The file name or binary file object to which to write the image.
+
+    See :func:`amaze.image.make_image` for a description of the other
+    parameters.
+    """
+    width, height = image_size(maze, room_size, wall_width)
+    coords = make_coords(maze, room_size, wall_width, height)
+
+    close = False
+    if not hasattr(f, 'write'):
+        f = open(f, 'wb')
+        close = True
+
+    try:
+        f.write(((
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<svg xmlns="http://www.w3.org/2000/svg" '
+                'width="%d" height="%d" viewBox="0 0 %d %d">\n'
+            '<rect width="100%%" height="100%%" %s/>\n'
+            '<g fill="none" stroke-linecap="round" '
+                'stroke-linejoin="round">\n') % (
+                    width, height, width, height,
+                    _color('fill', background_color))).encode('ascii'))
+
+        # Write the walls
+        f.write(('<path %s stroke-width="%d" d="' % (
+            _color('stroke', wall_color), wall_width)).encode('ascii'))
+        writer = SVGPathWriter(f)
+        for polyline in wall_lines(maze):
+            writer.move_to(*coords(*polyline[0]))
+            writer.line_to(*[coords(*point) for point in polyline[1:]])
+        writer.flush()
+        f.write(b'"/>\n')
+
+        # Write the path
+        f.write(('<path %s stroke-width="%d" d="' % (
+            _color('stroke', path_color), path_width)).encode('ascii'))
+        writer = SVGPathWriter(f)
+        centers = [coords(*maze.get_center(room_pos))
+            for room_pos in solution]
+        writer.move_to(*centers[0])
+        if path_smooth:
+            # Draw bezier curves like amaze.image.draw_path_smooth
+            d = 0.3
+            for previous_center, current_center, next_center in zip(
+                    centers, centers[1:], centers[2:]):
+                writer.curve_to(
+                    d * previous_center[0] + (1.0 - d) * current_center[0],
+                    d * previous_center[1] + (1.0 - d) * current_center[1],
+                    d * next_center[0] + (1.0 - d) * current_center[0],
+                    d * next_center[1] + (1.0 - d) * current_center[1],
+                    0.5 * (current_center[0] + next_center[0]),
+                    0.5 * (current_center[1] + next_center[1]))
+            writer.line_to(centers[-1])
+        else:
+            writer.line_to(*centers[1:])
+        writer.flush()
+        f.write(b'"/>\n')
+
+        f.write(b'</g>\n</svg>\n')
+
+    finally:
+        if close:
+            f.close()
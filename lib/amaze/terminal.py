@@ -18,7 +18,7 @@ import sys
 
 
 def print_maze(maze, solution, wall_char = '@', path_char = '.',
-        floor_char = ' ', room_size = (5, 4)):
+        floor_char = ' ', room_size = (5, 4), viewport = None, f = None):
     """
     Prints a maze and its solution.
 
@@ -34,71 +34,225 @@ def print_maze(maze, solution, wall_char = '@', path_char = '.',
         floor. The lengths of each of these string must be equal.
     @param room_size
         The size, expressed as (width, height), of a room in characters.
+    @param viewport
+        The rooms to print, expressed as (x, y, width, height). The viewport
+        is clipped to the maze. If this is not specified, the entire maze is
+        printed.
+    @param f
+        The file object to which to write. If this is not specified,
+        sys.stdout is used. All lines for a row of rooms are written at once.
     @return True if the maze could be printed and False otherwise
     """
     if len(maze.Wall.WALLS) != 4:
         print('This maze cannot be printed as it is not square')
         return False
 
-    def output(s):
-        sys.stdout.write(s)
+    if f is None:
+        f = sys.stdout
+
+    left, bottom, width, height = _clip(maze, viewport)
+    if width == 0 or height == 0:
+        # The viewport is outside of the maze, so there is nothing to print
+        return True
+    render = _row_renderer(maze, solution, wall_char, path_char, floor_char,
+        room_size, left, width)
 
     # Iterate over all rows and make sure to start with the last one to maintain
     # the orientation of the maze
-    for y in reversed(range(maze.height)):
-        # Print one line for each height unit of a room
-        for line in range(room_size[1]):
-            # Calculate the vertical offset of the neighbouring room
-            dy = 1 if not line else -1 if line == room_size[1] - 1 else 0
-            for x in range(maze.width):
-                # Print one line of the current room for every room in the
-                # current row
-                if line == 0 or line == room_size[1] - 1:
-                    # This is the first or the last line
-                    output(''.join((
-                        # The left wall
-                        wall_char,
-
-                        # The opening or top/bottom wall
-                        (path_char if \
-                            int(maze.Wall.from_direction((x, y), (0, dy))) \
-                                in maze[x, y] \
-                            and (x, y) in solution \
-                            and (x, y + dy) in solution
-                        else floor_char \
-                            if int(maze.Wall.from_direction((x, y), (0, dy))) \
-                                in maze[x, y]
-                        else wall_char) * (room_size[0] - 2),
-
-                        # The right wall
-                        wall_char)))
-                else:
-                    # This is a line in the middle of a room
-                    output(''.join((
-                        # The left opening or wall
-                        path_char if int(maze.Wall.from_direction(
-                                (x, y), (-1, 0))) in maze[x, y] \
-                            and (x, y) in solution \
-                            and (x - 1, y) in solution
-                        else floor_char if \
-                            int(maze.Wall.from_direction((x, y), (-1, 0))) \
-                                in maze[x, y]
-                        else wall_char,
-
-                        # The center
-                        (path_char if (x, y) in solution \
-                        else floor_char) * (room_size[0] - 2),
-
-                        # The right opening or wall
-                        path_char if int(maze.Wall.from_direction(
-                                (x, y), (1, 0))) in maze[x, y] \
-                            and (x, y) in solution \
-                            and (x + 1, y) in solution
-                        else floor_char if \
-                            int(maze.Wall.from_direction((x, y), (1, 0))) \
-                                in maze[x, y]
-                        else wall_char)))
-            output('\n')
+    for y in reversed(range(bottom, bottom + height)):
+        lines = render(y)
+        lines.append('')
+        f.write('\n'.join(lines))
+
+    return True
+
+
+def page_maze(maze, solution, wall_char = '@', path_char = '.',
+        floor_char = ' ', room_size = (5, 4), viewport = None):
+    """
+    Displays a maze and its solution in an interactive pager.
+
+    The arrow keys scroll one room at a time, page up and page down scroll one
+    screen at a time and q exits. Only rows of rooms that are scrolled into
+    view are rendered, and only lines that have changed are redrawn.
+
+    This function works only for mazes with square rooms and requires curses.
+
+    @param maze, solution, wall_char, path_char, floor_char, room_size
+        See print_maze.
+    @param viewport
+        The rooms to display initially, expressed as (x, y, width, height).
+        The size of the viewport is adapted to the size of the terminal, but
+        its top left corner is kept. If this is not specified, the top left
+        corner of the maze is displayed.
+    @return True if the maze could be displayed and False otherwise
+    """
+    if len(maze.Wall.WALLS) != 4:
+        print('This maze cannot be displayed as it is not square')
+        return False
+
+    import curses
+
+    def run(screen):
+        curses.curs_set(0)
+        x, top = (viewport[0], viewport[1] + viewport[3] - 1) if viewport \
+            else (0, maze.height - 1)
+
+        # The rendered rows of rooms for the current horizontal range, and the
+        # lines currently on the screen
+        rows = {}
+        rows_range = None
+        displayed = []
+
+        while True:
+            lines, columns = screen.getmaxyx()
+            width = max(1, min(maze.width, columns // room_size[0]))
+            height = max(1, min(maze.height, lines // room_size[1]))
+            x = max(0, min(maze.width - width, x))
+            top = max(height - 1, min(maze.height - 1, top))
+
+            # Rows are cached as long as the horizontal range is unchanged
+            if rows_range != (x, width):
+                rows_range = (x, width)
+                render = _row_renderer(maze, solution, wall_char, path_char,
+                    floor_char, room_size, x, width)
+                rows = {}
+            for y in list(rows.keys()):
+                if y > top or y <= top - height:
+                    del rows[y]
+
+            screen_lines = []
+            for y in range(top, top - height, -1):
+                if not y in rows:
+                    rows[y] = render(y)
+                screen_lines.extend(rows[y])
+            screen_lines = screen_lines[:lines - 1]
+
+            # Only redraw the lines that have changed
+            for i, line in enumerate(screen_lines):
+                if i >= len(displayed) or displayed[i] != line:
+                    screen.addstr(i, 0, line[:columns - 1])
+                    screen.clrtoeol()
+            for i in range(len(screen_lines), len(displayed)):
+                screen.move(i, 0)
+                screen.clrtoeol()
+            displayed = screen_lines
+            screen.addstr(lines - 1, 0, (' (%d, %d) %dx%d' % (
+                x, top, maze.width, maze.height))[:columns - 1])
+            screen.clrtoeol()
+            screen.refresh()
+
+            key = screen.getch()
+            if key in (ord('q'), 27):
+                break
+            elif key in (curses.KEY_LEFT, ord('h')):
+                x -= 1
+            elif key in (curses.KEY_RIGHT, ord('l')):
+                x += 1
+            elif key in (curses.KEY_UP, ord('k')):
+                top += 1
+            elif key in (curses.KEY_DOWN, ord('j')):
+                top -= 1
+            elif key == curses.KEY_PPAGE:
+                top += height
+            elif key == curses.KEY_NPAGE:
+                top -= height
+            elif key == curses.KEY_RESIZE:
+                displayed = []
+                screen.clear()
+
+    curses.wrapper(run)
 
     return True
 
+
+def _clip(maze, viewport):
+    """
+    Clips a viewport to a maze.
+
+    @param maze
+        The maze.
+    @param viewport
+        The viewport, expressed as (x, y, width, height), or None.
+    @return the tuple (x, y, width, height) clipped to the maze
+    """
+    if viewport is None:
+        return (0, 0, maze.width, maze.height)
+
+    left = min(maze.width, max(0, viewport[0]))
+    bottom = min(maze.height, max(0, viewport[1]))
+    right = min(maze.width, max(left, viewport[0] + viewport[2]))
+    top = min(maze.height, max(bottom, viewport[1] + viewport[3]))
+    return (left, bottom, right - left, top - bottom)
+
+
+def _row_renderer(maze, solution, wall_char, path_char, floor_char, room_size,
+        left, width):
+    """
+    Creates a function rendering the lines of text for a row of rooms of a maze
+    with square rooms.
+
+    @param maze, solution, wall_char, path_char, floor_char, room_size
+        See print_maze.
+    @param left, width
+        The horizontal range of rooms to render.
+    @return a function taking the vertical coordinate of a row of rooms and
+        returning a list of room_size[1] lines
+    """
+    # The solution is checked for every room, so use a set
+    path = set(solution)
+
+    # The walls are the same for all rooms, so we look them up only once
+    left_wall, up, right_wall, down = (
+        int(maze.Wall.from_direction((0, 0), direction))
+        for direction in ((-1, 0), (0, 1), (1, 0), (0, -1)))
+
+    # The parts of the lines making up the rooms
+    inner = room_size[0] - 2
+    wall_inner = wall_char * inner
+    path_inner = path_char * inner
+    floor_inner = floor_char * inner
+
+    xs = range(left, left + width)
+
+    def render(y):
+        rooms = maze.rooms[y]
+
+        # Whether the rooms in this row and the rooms to the left and right of
+        # them are part of the solution
+        in_path = [(x, y) in path for x in range(left - 1, left + width + 1)] \
+            if path else [False] * (width + 2)
+
+        def horizontal(wall, dy):
+            """Returns a first or last line"""
+            in_other = [(x, y + dy) in path for x in xs] if path \
+                else [False] * width
+            return ''.join(
+                wall_char + (
+                    (path_inner if in_path[i + 1] and in_other[i]
+                    else floor_inner) if wall in rooms[x].doors
+                    else wall_inner) + wall_char
+                for i, x in enumerate(xs))
+
+        # Print one line of the current room for every room in the current row
+        middle = ''.join(
+            (
+                # The left opening or wall
+                (path_char if in_path[i + 1] and in_path[i]
+                else floor_char) if left_wall in rooms[x].doors
+                else wall_char) + (
+
+                # The center
+                path_inner if in_path[i + 1] else floor_inner) + (
+
+                # The right opening or wall
+                (path_char if in_path[i + 1] and in_path[i + 2]
+                else floor_char) if right_wall in rooms[x].doors
+                else wall_char)
+            for i, x in enumerate(xs))
+
+        return [horizontal(up, 1)] \
+            + [middle] * (room_size[1] - 2) \
+            + [horizontal(down, -1)]
+
+    return render
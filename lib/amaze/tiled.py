@@ -0,0 +1,317 @@
+# coding=utf-8
+# pymaze
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+import bisect
+
+from .png import PNGWriter, from_argb32
+
+
+#: The default width and height of tiles
+TILE_SIZE = 1024
+
+
+# The renderer of a worker process; this is set by _initialize_worker
+_renderer = None
+
+
+def make_tiled_png(maze, solution, f, room_size, background_color, wall_color,
+        path_color, wall_width, path_width, path_smooth, tile_size = TILE_SIZE,
+        processes = None):
+    """Renders a maze as a PNG image one tile at a time.
+
+    The image is split into square tiles, and only the rooms intersecting a
+    tile are drawn onto it. Tiles are rendered by a pool of worker processes a
+    row band at a time, and every band is then compressed and written to the
+    PNG file, so the entire image never has to be kept in memory.
+
+    The image is drawn like the one created by :func:`amaze.image.make_image`,
+    but since lines crossing the border of a tile are drawn separately onto
+    every tile, antialiased pixels along tile borders may differ slightly.
+
+    :param maze.BaseMaze maze: The maze to render.
+
+    :param solution: The solution. This must be a list of all rooms to traverse.
+    :type solution: [(int, int)]
+
+    :param f: The file name or binary file object to which to write the image.
+
+    :param int tile_size: The width and height of the tiles.
+
+    :param int processes: The number of worker processes to use. If this is
+        ``None``, the number of CPUs is used, and if it is ``1``, tiles are
+        rendered in the calling process.
+
+    See :func:`amaze.image.make_image` for a description of the other
+    parameters.
+    """
+    from .image import image_size
+    width, height = image_size(maze, room_size, wall_width)
+
+    args = (maze, solution, room_size, background_color, wall_color,
+        path_color, wall_width, path_width, path_smooth)
+
+    if processes == 1:
+        _initialize_worker(*args)
+        render_band = lambda tiles: [_render_tile(tile) for tile in tiles]
+        pool = None
+    else:
+        import multiprocessing
+        pool = multiprocessing.Pool(processes, _initialize_worker, args)
+        render_band = lambda tiles: pool.map(_render_tile, tiles)
+
+    close = False
+    if not hasattr(f, 'write'):
+        f = open(f, 'wb')
+        close = True
+
+    try:
+        writer = PNGWriter(f, width, height)
+        for top in range(0, height, tile_size):
+            tile_height = min(tile_size, height - top)
+            tiles = render_band([
+                (left, top, min(tile_size, width - left), tile_height)
+                for left in range(0, width, tile_size)])
+
+            for y in range(tile_height):
+                writer.write_row(b''.join(tile[y] for tile in tiles))
+        writer.close()
+
+    finally:
+        if close:
+            f.close()
+        if not pool is None:
+            pool.close()
+            pool.join()
+
+
+def path_runs(path_rows, region):
+    """Finds the parts of a solution that pass through a region.
+
+    :param path_rows: The solution indexed by row, as returned by
+        :func:`index_path`.
+
+    :param region: The region of rooms, expressed as ``(x, y, width, height)``.
+    :type region: (int, int, int, int)
+
+    :return: a list of the tuple ``(first_index, last_index)`` for all parts of
+        the solution inside the region
+    :rtype: [(int, int)]
+    """
+    left, bottom, width, height = region
+    indices = []
+    for y in range(bottom, bottom + height):
+        row = path_rows.get(y)
+        if row is None:
+            continue
+        xs, row_indices = row
+        indices.extend(row_indices[
+            bisect.bisect_left(xs, left):bisect.bisect_left(xs, left + width)])
+    indices.sort()
+
+    result = []
+    for i in indices:
+        if result and result[-1][1] == i - 1:
+            result[-1][1] = i
+        else:
+            result.append([i, i])
+
+    return [tuple(r) for r in result]
+
+
+def index_path(solution):
+    """Indexes a solution by row.
+
+    :param solution: The solution. This must be a list of all rooms to traverse.
+    :type solution: [(int, int)]
+
+    :return: a mapping from row to the tuple ``(xs, indices)``, where *xs* is
+        the sorted list of horizontal coordinates of all rooms of the solution
+        in the row, and *indices* their indices in the solution
+    """
+    rows = {}
+    for i, (x, y) in enumerate(solution):
+        rows.setdefault(y, []).append((x, i))
+
+    return dict(
+        (y, ([x for x, i in row], [i for x, i in row]))
+        for y, row in ((y, sorted(row)) for y, row in rows.items()))
+
+
+class TileRenderer(object):
+    """A renderer of rectangular parts of the image of a maze.
+
+    Only the rooms that may intersect a tile are drawn onto it.
+
+    :param maze.BaseMaze maze: The maze to render.
+
+    :param solution: The solution. This must be a list of all rooms to traverse.
+    :type solution: [(int, int)]
+
+    See :func:`amaze.image.make_image` for a description of the other
+    parameters.
+    """
+    def __init__(self, maze, solution, room_size, background_color, wall_color,
+            path_color, wall_width, path_width, path_smooth):
+        from .image import image_size, make_coords
+        self.maze = maze
+        self.solution = solution
+        self.room_size = room_size
+        self.background_color = background_color
+        self.wall_color = wall_color
+        self.path_color = path_color
+        self.wall_width = wall_width
+        self.path_width = path_width
+        self.path_smooth = path_smooth
+
+        #: The size of the full image
+        self.size = image_size(maze, room_size, wall_width)
+
+        self._bounds = maze.physical_bounds()
+        self._coords = make_coords(maze, room_size, wall_width, self.size[1])
+        self._path_rows = index_path(solution)
+
+    def region(self, tile, scale = 1.0):
+        """Calculates the region of rooms that may be visible in a tile.
+
+        :param tile: The tile, expressed as ``(left, top, width, height)`` in
+            image coordinates.
+        :type tile: (int, int, int, int)
+
+        :param float scale: The scale of the image in which *tile* is
+            expressed.
+
+        :return: the region of rooms, expressed as ``(x, y, width, height)``
+        :rtype: (int, int, int, int)
+        """
+        room_width, room_height = self.room_size
+        min_x, min_y = self._bounds[:2]
+        left, top, width, height = (float(v) / scale for v in tile)
+
+        # Lines extend half their width outside of the rooms, and coordinates
+        # are rounded to whole pixels
+        margin = 0.5 * max(self.wall_width, self.path_width) + 1
+        left, top = left - margin, top - margin
+        right, bottom = left + width + 2 * margin, top + height + 2 * margin
+
+        # Convert the tile to physical coordinates; the image y axis is
+        # inverted
+        offset = self.size[1] - self.wall_width
+        return self.maze.room_range((
+            min_x + (left - self.wall_width) / room_width,
+            min_y + (offset - bottom) / room_height,
+            min_x + (right - self.wall_width) / room_width,
+            min_y + (offset - top) / room_height))
+
+    def path_parts(self, region):
+        """Finds the parts of the solution to draw onto a region.
+
+        Every part includes one room on either side of a run of rooms inside
+        the region, so that the path continues across the border of the region,
+        and overlapping parts are joined, so that no part of the path is drawn
+        twice.
+
+        :param region: The region of rooms, expressed as
+            ``(x, y, width, height)``.
+        :type region: (int, int, int, int)
+
+        :return: a list of the tuple ``(first_index, last_index)`` for all
+            parts
+        :rtype: [(int, int)]
+        """
+        result = []
+        for first, last in path_runs(self._path_rows, region):
+            first = max(0, first - 1)
+            last = min(len(self.solution) - 1, last + 1)
+            if result and first <= result[-1][1] + 1:
+                result[-1][1] = last
+            else:
+                result.append([first, last])
+
+        return [tuple(r) for r in result]
+
+    def render(self, tile, scale = 1.0):
+        """Renders a single tile.
+
+        :param tile: The tile, expressed as ``(left, top, width, height)`` in
+            image coordinates.
+        :type tile: (int, int, int, int)
+
+        :param float scale: The scale of the image in which *tile* is
+            expressed.
+
+        :return: the rows of the tile as *RGBA* data
+        :rtype: [bytes]
+        """
+        from .image import cairo, draw_path, draw_path_smooth, draw_walls, \
+            require_cairo
+        require_cairo()
+        left, top, width, height = tile
+
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+        ctx = cairo.Context(surface)
+        ctx.translate(-left, -top)
+        ctx.scale(scale, scale)
+
+        # Make line caps and line joins round
+        ctx.set_line_cap(cairo.LINE_CAP_ROUND)
+        ctx.set_line_join(cairo.LINE_JOIN_ROUND)
+
+        # Clear the background
+        ctx.set_source_rgba(*self.background_color)
+        ctx.paint()
+
+        # Draw the walls of the rooms in the tile
+        region = self.region(tile, scale)
+        ctx.set_source_rgba(*self.wall_color)
+        ctx.set_line_width(self.wall_width)
+        draw_walls(self.maze, ctx, self._coords, region)
+
+        # Draw the parts of the path passing through the tile
+        ctx.set_source_rgba(*self.path_color)
+        ctx.set_line_width(self.path_width)
+        for first, last in self.path_parts(region):
+            if self.path_smooth:
+                draw_path_smooth(self.maze, ctx, self._coords, self.solution,
+                    first, last)
+            else:
+                draw_path(self.maze, ctx, self._coords,
+                    self.solution[first:last + 1])
+
+        surface.flush()
+        return from_argb32(surface.get_data(), width, height,
+            surface.get_stride())
+
+
+def _initialize_worker(*args):
+    """Initialises a worker process.
+
+    The arguments are passed to :class:`TileRenderer`.
+    """
+    global _renderer
+    _renderer = TileRenderer(*args)
+
+
+def _render_tile(tile):
+    """Renders a single tile in a worker process.
+
+    :param tile: The tile, expressed as ``(left, top, width, height)`` in image
+        coordinates.
+    :type tile: (int, int, int, int)
+
+    :return: the rows of the tile as *RGBA* data
+    :rtype: [bytes]
+    """
+    return _renderer.render(tile)
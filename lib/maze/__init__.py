@@ -15,12 +15,29 @@
 # this program. If not, see <http://www.gnu.org/licenses/>.
 
 import bisect
+import importlib
 import math
+import struct
 import sys
 
 from . import _info
 
 
+#: The magic bytes starting a maze serialised with :meth:`BaseMaze.to_bytes`
+MAGIC = b'MAZE'
+
+#: The version of the format written by :meth:`BaseMaze.to_bytes`
+FORMAT_VERSION = 1
+
+#: The compression methods supported by :meth:`BaseMaze.to_bytes`; the index
+#: of a method is stored in the header
+COMPRESSIONS = (None, 'zlib', 'lzma')
+
+# The header of a serialised maze: magic, version, compression, width, height
+# and the length of the class name following the header
+_HEADER = struct.Struct('>4sBBIIH')
+
+
 class BaseWall(object):
     """A reference to the wall of a room.
 
@@ -47,6 +64,13 @@ class BaseWall(object):
       * from_room_pos will create all walls for a room.
       * from_corner will create all walls that meet in a corner.
 
+    The physical layout of a room depends on its parity.
+      * parity returns the parity of a room. Rooms with the same parity have
+        the same wall spans and directions.
+      * CORNERS is a precomputed table of the offsets from the centre of a room
+        to the start corner of every wall, indexed by parity and wall index.
+        The end corner of a wall is the start corner of the next wall.
+
     :param room_pos: The position of the room in which this wall is.
     :type room_pos: (int, int)
 
@@ -79,6 +103,20 @@ class BaseWall(object):
         return self.NAMES[self.wall] + '@' + str(self.room_pos)
     __repr__ = __str__
 
+    @classmethod
+    def parity(self, room_pos):
+        """Returns the parity of a room.
+
+        Rooms with the same parity have the same layout.
+
+        :param room_pos: The position of the room.
+        :type room_pos: (int, int)
+
+        :return: an index into :attr:`CORNERS`
+        :rtype: int
+        """
+        return 0
+
     @classmethod
     def from_direction(self, room_pos, direction):
         """Creates a new wall from a direction.
@@ -149,6 +187,38 @@ class BaseWall(object):
         """
         return self._get_opposite_index()
 
+    @classmethod
+    def _get_backs(self, room_pos):
+        """Returns the offsets to the rooms behind all walls of a room, and the
+        indices of the walls on the other side.
+
+        The layout of a room depends only on whether its coordinates are odd or
+        even, so the result is calculated once for every such combination and
+        then cached in the wall class.
+
+        :param room_pos: The position of the room.
+        :type room_pos: (int, int)
+
+        :return: a list indexed by wall index containing the tuple
+            ``(dx, dy, back_index)``
+        :rtype: [(int, int, int)]
+        """
+        key = (room_pos[0] & 1, room_pos[1] & 1)
+        if not '_backs' in self.__dict__:
+            self._backs = {}
+        try:
+            return self._backs[key]
+        except KeyError:
+            backs = []
+            for wall in self.from_room_pos(key):
+                back = wall.back
+                backs.append((
+                    back.room_pos[0] - key[0],
+                    back.room_pos[1] - key[1],
+                    back.wall))
+            self._backs[key] = backs
+            return backs
+
     def _get_opposite(self):
         """Returns the opposite wall.
 
@@ -455,6 +525,96 @@ class BaseMaze(object):
         if to_pos in self:
             self[to_pos][other_wall] = has_door
 
+    def set_doors(self, doors, has_door = True):
+        """Adds or removes a number of doors at once.
+
+        This has the same effect as calling :meth:`set_door` for every door, but
+        no intermediate wall objects are created, which makes it suitable for
+        algorithms that generate all doors of a large maze.
+
+        :param doors: The doors to modify. This must be an iterable of the tuple
+            ``(room_pos, wall_index)``.
+        :type doors: [((int, int), int)]
+
+        :param bool has_door: True to add the doors and False to remove them.
+
+        :raises IndexError: if a room lies outside of the maze
+        """
+        get_backs = self.__class__.Wall._get_backs
+        rooms = self.rooms
+        width, height = self.width, self.height
+
+        for (x, y), wall_index in doors:
+            if x < 0 or x >= width or y < 0 or y >= height:
+                raise IndexError()
+            dx, dy, back_index = get_backs((x, y))[wall_index]
+            to_x, to_y = x + dx, y + dy
+            to_room = rooms[to_y][to_x] \
+                if to_x >= 0 and to_x < width and to_y >= 0 and to_y < height \
+                else None
+
+            if has_door:
+                rooms[y][x].add_door(wall_index)
+                if not to_room is None:
+                    to_room.add_door(back_index)
+            else:
+                rooms[y][x].remove_door(wall_index)
+                if not to_room is None:
+                    to_room.remove_door(back_index)
+
+    def centers(self):
+        """Returns the physical coordinates of the centres of all rooms.
+
+        This is equivalent to calling :meth:`get_center` for every room, but
+        the coordinates are calculated a row or column at a time.
+
+        :return: the tuple ``(xs, ys)``, where both items are arrays of floats
+            indexed by ``y * width + x``
+        :rtype: (array.array, array.array)
+        """
+        raise NotImplementedError()
+
+    def physical_bounds(self):
+        """Returns the physical bounds of the maze.
+
+        The bounds are calculated from the dimensions of the maze in constant
+        time, and cover all corners of all rooms.
+
+        :return: the tuple ``(min_x, min_y, max_x, max_y)``
+        :rtype: (float, float, float, float)
+        """
+        raise NotImplementedError()
+
+    def room_range(self, bounds):
+        """Returns the region of rooms that may intersect a rectangle.
+
+        This is the inverse of :meth:`get_center`: since all corners of a room
+        lie on a circle with radius 1.0 centred on the room, every room whose
+        centre is within 1.0 of the rectangle is included.
+
+        :param bounds: The rectangle in physical coordinates, expressed as
+            ``(min_x, min_y, max_x, max_y)``.
+        :type bounds: (float, float, float, float)
+
+        :return: the region of rooms, expressed as ``(x, y, width, height)``;
+            the region is clipped to the maze, so *width* and *height* are ``0``
+            if the rectangle does not intersect the maze
+        :rtype: (int, int, int, int)
+        """
+        raise NotImplementedError()
+
+    def _clip_range(self, x0, y0, x1, y1):
+        """Clips an inclusive range of room coordinates to the maze.
+
+        :return: the region of rooms, expressed as ``(x, y, width, height)``
+        :rtype: (int, int, int, int)
+        """
+        x0 = min(self.width, max(0, int(math.ceil(x0))))
+        y0 = min(self.height, max(0, int(math.ceil(y0))))
+        x1 = min(self.width, max(x0, int(math.floor(x1)) + 1))
+        y1 = min(self.height, max(y0, int(math.floor(y1)) + 1))
+        return (x0, y0, x1 - x0, y1 - y0)
+
     def get_center(self, room_pos):
         """Returns the physical coordinates of the centre of a room.
 
@@ -705,3 +865,324 @@ class BaseMaze(object):
                         bisect.insort(open_set, (f, next))
 
         raise ValueError()
+
+    def __reduce_ex__(self, protocol):
+        """Pickles this maze as its door mask and its other attributes.
+
+        Since the maze is restored using :meth:`from_mask`, an unpickled maze,
+        like a maze copied with :func:`copy.copy` or :func:`copy.deepcopy`, is
+        always backed by a buffer: rooms are views of the buffer, so custom room
+        classes, attributes set on rooms and the identity of rooms are not
+        preserved.
+        """
+        # Pickle the doors as a single buffer; with protocol 5 it may be
+        # transferred out-of-band without copying
+        import pickle
+        mask = self.door_mask()
+        if protocol >= 5 and hasattr(pickle, 'PickleBuffer'):
+            mask = pickle.PickleBuffer(mask)
+        else:
+            mask = bytes(mask)
+        state = dict((name, value) for name, value in self.__dict__.items()
+            if not name in ('rooms', 'width', 'height'))
+        return (
+            _restore,
+            (self.__class__, self.width, self.height, mask),
+            state or None)
+
+    def door_mask(self):
+        """Returns the doors of all rooms as a buffer with one byte per room.
+
+        Bit *n* of the byte at index ``y * width + x`` is set if wall *n* of
+        the room ``(x, y)`` has a door.
+
+        If this maze is backed by a buffer, as created by :meth:`from_mask`,
+        that buffer is returned; otherwise a new bytearray is created.
+
+        :return: the buffer
+        """
+        from .mask import MaskRows
+        if isinstance(self.rooms, MaskRows):
+            return self.rooms.mask
+
+        result = bytearray(self.width * self.height)
+        i = 0
+        for row in self.rooms:
+            for room in row:
+                result[i] = sum(1 << wall_index for wall_index in room.doors)
+                i += 1
+        return result
+
+    @classmethod
+    def from_mask(self, width, height, mask):
+        """Creates a maze backed by a buffer of doors.
+
+        The buffer is not copied: changes to the maze are written to the buffer
+        and changes to the buffer are visible in the maze. If the buffer is
+        read-only, so is the maze.
+
+        :param int width: The width of the maze.
+
+        :param int height: The height of the maze.
+
+        :param mask: The buffer, as returned by :meth:`door_mask`. This must
+            support indexing by integer, like a bytearray or a memoryview of
+            unsigned bytes.
+
+        :return: a new maze
+        :rtype: BaseMaze
+
+        :raises ValueError: if the buffer is too small
+        """
+        from .mask import MaskRows
+        maze = self.__new__(self)
+        maze.rooms = MaskRows(mask, width, height)
+        maze.width = width
+        maze.height = height
+        return maze
+
+    def to_bytes(self, compression = None):
+        """Serialises this maze.
+
+        The result starts with a versioned header containing the class of the
+        maze and its dimensions, followed by one bit for every wall: only one
+        side of every wall between two rooms is stored, since the other side is
+        always the same.
+
+        :param str compression: The compression to apply to the door bits; one
+            of :attr:`COMPRESSIONS`.
+
+        :return: the serialised maze
+        :rtype: bytes
+
+        :raises ValueError: if *compression* is not supported
+        """
+        if not compression in COMPRESSIONS:
+            raise ValueError('Unsupported compression: %s' % compression)
+
+        name = ('%s.%s' % (
+            self.__class__.__module__, self.__class__.__name__)).encode('ascii')
+        header = _HEADER.pack(MAGIC, FORMAT_VERSION,
+            COMPRESSIONS.index(compression), self.width, self.height,
+            len(name)) + name
+
+        data = bytearray()
+        current = 0
+        count = 0
+        width, height = self.width, self.height
+        owned = self._owned_walls()
+        for y, row in enumerate(self.rooms):
+            for x, room in enumerate(row):
+                doors = room.doors
+                for wall_index, dx, dy, _, store in owned[(x & 1, y & 1)]:
+                    # Walls owned by the room on the other side are stored
+                    # there, unless it is outside of the maze
+                    if not store and 0 <= x + dx < width \
+                            and 0 <= y + dy < height:
+                        continue
+                    current = (current << 1) | (wall_index in doors)
+                    count += 1
+                    if count == 8:
+                        data.append(current)
+                        current = 0
+                        count = 0
+        if count:
+            data.append(current << (8 - count))
+
+        return header + _compress(compression, bytes(data))
+
+    @classmethod
+    def from_bytes(self, data):
+        """Deserialises a maze serialised with :meth:`to_bytes`.
+
+        The maze class is read from the data. It must be a subclass of the class
+        on which this method is called, and if it is not defined in this
+        package, its module must already be imported.
+
+        :param bytes data: The serialised maze.
+
+        :return: a new maze
+        :rtype: BaseMaze
+
+        :raises ValueError: if the data is invalid or uses an unsupported
+            version or compression, or if the maze class is not a subclass
+        """
+        try:
+            magic, version, compression, width, height, name_length = \
+                _HEADER.unpack_from(data)
+        except struct.error:
+            raise ValueError('Truncated maze data')
+        if magic != MAGIC:
+            raise ValueError('Invalid maze data')
+        if version != FORMAT_VERSION:
+            raise ValueError('Unsupported maze data version: %d' % version)
+        if compression >= len(COMPRESSIONS):
+            raise ValueError('Unsupported compression: %d' % compression)
+
+        # Find the maze class
+        name = bytes(data[_HEADER.size:_HEADER.size + name_length]).decode(
+            'ascii')
+        maze_class = _find_class(name)
+        if not isinstance(maze_class, type) or not issubclass(maze_class, self):
+            raise ValueError('%s is not a subclass of %s' % (
+                name, self.__name__))
+
+        bits = bytearray(_decompress(COMPRESSIONS[compression],
+            bytes(data[_HEADER.size + name_length:])))
+
+        # Make sure that the data matches the size of the maze before creating
+        # it
+        expected = (maze_class._bit_count(width, height) + 7) // 8
+        if len(bits) < expected:
+            raise ValueError('Truncated maze data')
+        elif len(bits) > expected:
+            raise ValueError('Invalid maze data')
+
+        maze = maze_class(width, height)
+        rooms = maze.rooms
+        owned = maze._owned_walls()
+        i = 0
+        for y in range(height):
+            for x in range(width):
+                for wall_index, dx, dy, back_index, store in owned[
+                        (x & 1, y & 1)]:
+                    bx, by = x + dx, y + dy
+                    inside = 0 <= bx < width and 0 <= by < height
+                    if not store and inside:
+                        continue
+                    if bits[i >> 3] & (0x80 >> (i & 7)):
+                        rooms[y][x].add_door(wall_index)
+                        if inside:
+                            rooms[by][bx].add_door(back_index)
+                    i += 1
+
+        return maze
+
+    @classmethod
+    def _bit_count(self, width, height):
+        """Returns the number of walls stored by :meth:`to_bytes` for a maze.
+
+        Every wall between two rooms is stored once, and every wall on the edge
+        of the maze is stored by the room inside of it.
+
+        :param int width: The width of the maze.
+
+        :param int height: The height of the maze.
+
+        :return: the number of walls
+        :rtype: int
+        """
+        if width < 1 or height < 1:
+            return 0
+
+        def kinds(size):
+            """Returns the tuple ``(parity, first, last, count)`` for the kinds
+            of coordinates along a dimension"""
+            if size == 1:
+                return [(0, True, True, 1)]
+            inner = size - 2
+            return [
+                (0, True, False, 1),
+                ((size - 1) & 1, False, True, 1),
+                (1, False, False, (inner + 1) // 2),
+                (0, False, False, inner // 2)]
+
+        # Only rooms on the edge of the maze have neighbours outside of it,
+        # and the neighbours are adjacent
+        edge_walls = 0
+        for x, left, right, columns in kinds(width):
+            for y, bottom, top, rows in kinds(height):
+                edge_walls += columns * rows * sum(
+                    1
+                    for dx, dy, back_index in self.Wall._get_backs((x, y))
+                    if (dx < 0 and left) or (dx > 0 and right)
+                        or (dy < 0 and bottom) or (dy > 0 and top))
+
+        # Walls between two rooms are counted from both sides
+        return (width * height * len(self.Wall.WALLS) + edge_walls) // 2
+
+    @classmethod
+    def _owned_walls(self):
+        """Returns the walls stored for a room by :meth:`to_bytes`.
+
+        :return: a mapping from ``(x & 1, y & 1)`` to a list of the tuple
+            ``(wall_index, dx, dy, back_index, store)``, where *store* is
+            whether the wall is stored even if the room on the other side is
+            inside of the maze; this is the case when that room comes later in
+            row order
+        """
+        return dict(
+            (key, [
+                (wall_index, dx, dy, back_index, (dy, dx) > (0, 0))
+                for wall_index, (dx, dy, back_index) in enumerate(
+                    self.Wall._get_backs(key))])
+            for key in ((0, 0), (1, 0), (0, 1), (1, 1)))
+
+
+def _restore(maze_class, width, height, mask):
+    """Restores a maze pickled by :meth:`BaseMaze.__reduce_ex__`.
+
+    A writable buffer, such as an out-of-band buffer, is used as it is, and a
+    read-only buffer is copied.
+    """
+    view = memoryview(mask)
+    if view.readonly:
+        mask = bytearray(view)
+    elif not isinstance(mask, bytearray):
+        mask = view.cast('B') if view.format != 'B' else view
+    return maze_class.from_mask(width, height, mask)
+
+
+def _find_class(name):
+    """Finds a class by its fully qualified name.
+
+    Modules in this package are imported if necessary; other modules must
+    already be imported.
+
+    :param str name: The name of the class, including its module.
+
+    :return: the class
+
+    :raises ValueError: if the class cannot be found
+    """
+    try:
+        module_name, class_name = name.rsplit('.', 1)
+        if module_name.split('.')[0] == __name__:
+            module = importlib.import_module(module_name)
+        else:
+            module = sys.modules[module_name]
+        return getattr(module, class_name)
+    except (AttributeError, ImportError, KeyError, ValueError):
+        raise ValueError('Unknown maze class: %s' % name)
+
+
+def _compress(compression, data):
+    """Compresses data using one of :attr:`COMPRESSIONS`"""
+    if compression == 'zlib':
+        import zlib
+        return zlib.compress(data, 9)
+    elif compression == 'lzma':
+        import lzma
+        return lzma.compress(data)
+    else:
+        return data
+
+
+def _decompress(compression, data):
+    """Decompresses data compressed by :func:`_compress`
+
+    :raises ValueError: if the data is invalid
+    """
+    try:
+        if compression == 'zlib':
+            import zlib
+            return zlib.decompress(data)
+        elif compression == 'lzma':
+            import lzma
+            return lzma.decompress(data)
+        else:
+            return data
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError('Invalid compressed maze data: %s' % str(e))
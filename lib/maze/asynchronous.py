@@ -0,0 +1,54 @@
+# coding=utf-8
+# pymaze
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+
+
+async def initialize(initialize_steps, maze, randomizer, *args,
+        progress = None, **kwargs):
+    """Initialises a maze without blocking the event loop.
+
+    The initialisation is performed by a generator function such as
+    :func:`maze.randomized_prim.initialize_steps`, and control is returned to
+    the event loop every time it yields. This function requires Python 3.5 or
+    later.
+
+    The initialisation is cancelled by cancelling the task running this
+    coroutine; the maze is then left partially initialised.
+
+    :param initialize_steps: The generator function performing the
+        initialisation. It is called with *maze*, *randomizer* and any other
+        arguments passed.
+
+    :param maze.BaseMaze maze: The maze to initialise.
+
+    :param randomizer: The source of randomness.
+
+    :param progress: A callback called with the tuple
+        ``(rooms_visited, room_count)`` every time the generator yields.
+
+    :return: the maze
+    """
+    generator = initialize_steps(maze, randomizer, *args, **kwargs)
+    try:
+        for rooms_visited, room_count in generator:
+            if not progress is None:
+                progress(rooms_visited, room_count)
+            await asyncio.sleep(0)
+    finally:
+        generator.close()
+
+    return maze
@@ -0,0 +1,98 @@
+# coding=utf-8
+# pymaze
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+def dead_ends(maze):
+    """Returns all dead ends of a maze.
+
+    A dead end is a room with exactly one door.
+
+    :param maze.BaseMaze maze: The maze to inspect.
+
+    :return: the positions of all dead ends, ordered by row
+    :rtype: [(int, int)]
+    """
+    return [(x, y)
+        for y, row in enumerate(maze.rooms)
+        for x, room in enumerate(row)
+        if len(room.doors) == 1]
+
+
+def braid(maze, randomizer, ratio = 1.0):
+    """Removes dead ends from a maze by opening doors in them.
+
+    All dead ends are found in a single pass over the maze. A random selection
+    of them are then opened to a neighbouring room; if a neighbour is also a
+    dead end, it is preferred, since that removes two dead ends with one door.
+
+    A dead end whose only neighbour inside of the maze is the room to which it
+    already leads cannot be removed.
+
+    :param maze.BaseMaze maze: The maze to braid. This is typically a maze just
+        initialised by a generator.
+
+    :param randomizer: The function used as a source of randomness. It will be
+        called with an argument describing the maximum value to return. It may
+        return any integers between ``0`` and the non-inclusive maximum value.
+
+    :param float ratio: The ratio of dead ends to remove. ``1.0`` attempts to
+        remove all dead ends, and ``0.0`` leaves the maze unchanged.
+
+    :return: the number of doors opened
+    :rtype: int
+
+    :raises ValueError: if ratio is not in the range ``[0.0, 1.0]``
+    """
+    if ratio < 0.0 or ratio > 1.0:
+        raise ValueError('Invalid braid ratio: %s' % str(ratio))
+
+    get_backs = maze.__class__.Wall._get_backs
+    rooms = maze.rooms
+    width, height = maze.width, maze.height
+
+    # Select the dead ends to remove by shuffling all of them and then removing
+    # the first ones
+    candidates = dead_ends(maze)
+    count = int(round(ratio * len(candidates)))
+    for i in range(min(count, len(candidates) - 1)):
+        j = i + randomizer(len(candidates) - i)
+        candidates[i], candidates[j] = candidates[j], candidates[i]
+
+    opened = 0
+    for x, y in candidates[:count]:
+        # The dead end may have been removed by a previous door
+        room = rooms[y][x]
+        if len(room.doors) != 1:
+            continue
+
+        # Find all closed walls leading to rooms inside the maze, and
+        # separate the dead ends
+        walls, dead_end_walls = [], []
+        for wall_index, (dx, dy, _) in enumerate(get_backs((x, y))):
+            nx, ny = x + dx, y + dy
+            if wall_index in room.doors \
+                    or nx < 0 or nx >= width or ny < 0 or ny >= height:
+                continue
+            walls.append(wall_index)
+            if len(rooms[ny][nx].doors) == 1:
+                dead_end_walls.append(wall_index)
+
+        walls = dead_end_walls or walls
+        if walls:
+            maze.set_doors((((x, y), walls[randomizer(len(walls))]),))
+            opened += 1
+
+    return opened
@@ -0,0 +1,242 @@
+# coding=utf-8
+# pymaze
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+import errno
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from . import BaseMaze
+
+
+#: The default maximum total size in bytes of the files in a cache
+MAX_SIZE = 1 << 30
+
+#: The suffix of cached mazes
+MAZE_SUFFIX = '.maze'
+
+
+def make_key(replay, **options):
+    """Creates a cache key for a maze and the options used to render it.
+
+    :param maze.replay.Replay replay: The descriptor of the maze. Since it
+        contains the versions of the generator and the random number generator,
+        a maze generated differently will have a different key.
+
+    :param options: Any options affecting the cached file, such as rendering
+        options. The values must be serialisable as *JSON*.
+
+    :return: the key
+    :rtype: str
+    """
+    h = hashlib.sha256(replay.to_bytes())
+    h.update(json.dumps(options, sort_keys = True,
+        separators = (',', ':')).encode('utf-8'))
+    return h.hexdigest()
+
+
+class Cache(object):
+    """A content addressed cache of files in a directory.
+
+    Files are stored under a key, as returned by :func:`make_key`, and a
+    suffix. When the total size of the files exceeds the maximum size, the least
+    recently used files are removed.
+
+    Several processes may use the same directory; files are written atomically,
+    but since every process keeps its own estimate of the total size, the
+    maximum size may be exceeded temporarily.
+
+    :param str directory: The cache directory. It is created if it does not
+        exist.
+
+    :param int max_size: The maximum total size in bytes of the files in the
+        cache.
+    """
+    def __init__(self, directory, max_size = MAX_SIZE):
+        self._directory = directory
+        self._max_size = max_size
+        self._size = None
+        try:
+            os.makedirs(directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+    @property
+    def directory(self):
+        """The cache directory"""
+        return self._directory
+
+    def path(self, key, suffix):
+        """Returns the path of a cached file, whether it exists or not.
+
+        :param str key: The key of the file.
+
+        :param str suffix: The suffix of the file.
+
+        :return: the path
+        :rtype: str
+        """
+        return os.path.join(self._directory, key + suffix)
+
+    def get(self, key, suffix):
+        """Returns the path of a cached file and marks it as recently used.
+
+        :param str key: The key of the file.
+
+        :param str suffix: The suffix of the file.
+
+        :return: the path, or ``None`` if the file is not cached
+        :rtype: str
+        """
+        path = self.path(key, suffix)
+        try:
+            os.utime(path, None)
+            return path
+        except OSError:
+            return None
+
+    def put(self, key, suffix, data):
+        """Stores data in the cache.
+
+        :param str key: The key of the file.
+
+        :param str suffix: The suffix of the file.
+
+        :param bytes data: The data to store.
+
+        :return: the path of the cached file
+        :rtype: str
+        """
+        return self._store(key, suffix, lambda f: f.write(data))
+
+    def put_file(self, key, suffix, source):
+        """Copies a file to the cache.
+
+        :param str key: The key of the file.
+
+        :param str suffix: The suffix of the file.
+
+        :param str source: The path of the file to copy.
+
+        :return: the path of the cached file
+        :rtype: str
+        """
+        def write(f):
+            with open(source, 'rb') as s:
+                shutil.copyfileobj(s, f)
+        return self._store(key, suffix, write)
+
+    def maze(self, replay):
+        """Returns a maze from the cache, generating and storing it if it is
+        not cached.
+
+        :param maze.replay.Replay replay: The descriptor of the maze.
+
+        :return: the maze
+        :rtype: maze.BaseMaze
+        """
+        key = make_key(replay)
+        path = self.get(key, MAZE_SUFFIX)
+        if not path is None:
+            try:
+                with open(path, 'rb') as f:
+                    return BaseMaze.from_bytes(f.read())
+            except (IOError, OSError, ValueError):
+                # The file was removed or is corrupt; generate the maze again
+                pass
+
+        maze = replay.generate()
+        self.put(key, MAZE_SUFFIX, maze.to_bytes('zlib'))
+        return maze
+
+    def evict(self, keep = None):
+        """Removes the least recently used files until the total size of the
+        files does not exceed the maximum size.
+
+        :param str keep: The path of a file that must not be removed, even if
+            the maximum size is still exceeded.
+        """
+        entries = []
+        for name in os.listdir(self._directory):
+            # Ignore files being written
+            if name.startswith('.'):
+                continue
+            path = os.path.join(self._directory, name)
+            if path == keep:
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+
+        size = sum(entry[1] for entry in entries)
+        if not keep is None:
+            try:
+                size += os.path.getsize(keep)
+            except OSError:
+                pass
+        for mtime, file_size, path in sorted(entries):
+            if size <= self._max_size:
+                break
+            try:
+                os.remove(path)
+                size -= file_size
+            except OSError:
+                pass
+        self._size = size
+
+    def _store(self, key, suffix, write):
+        """Writes a file to the cache atomically and evicts files if necessary.
+
+        :param str key: The key of the file.
+
+        :param str suffix: The suffix of the file.
+
+        :param write: A function writing the data to a file object.
+
+        :return: the path of the cached file
+        """
+        fd, temporary = tempfile.mkstemp(dir = self._directory,
+            prefix = '.', suffix = '.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            size = os.path.getsize(temporary)
+            path = self.path(key, suffix)
+
+            # A file being replaced no longer counts towards the total size
+            try:
+                size -= os.path.getsize(path)
+            except OSError:
+                pass
+
+            getattr(os, 'replace', os.rename)(temporary, path)
+        except Exception:
+            os.remove(temporary)
+            raise
+
+        if self._size is None:
+            self.evict(path)
+        else:
+            self._size += size
+            if self._size > self._max_size:
+                self.evict(path)
+
+        return path
@@ -0,0 +1,211 @@
+# coding=utf-8
+# pymaze
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+import mmap
+import os
+import struct
+
+from . import BaseMaze, COMPRESSIONS
+
+
+#: The magic bytes starting a container file
+MAGIC = b'MZPK'
+
+#: The version of the format written by :class:`MazeWriter`
+FORMAT_VERSION = 2
+
+# The header of a container file: magic, version, the number of mazes and the
+# offset of the index; the index offset is 0 until the first index is written
+_HEADER = struct.Struct('>4sB3xQQ')
+
+# An entry in the index: the offset and size of a maze; since mazes appended
+# to a file are written after the previous index, mazes are not necessarily
+# adjacent
+_ENTRY = struct.Struct('>QQ')
+
+
+class MazeReader(object):
+    """A reader of container files written by :class:`MazeWriter`.
+
+    The file is memory mapped, and mazes are read by index without reading the
+    rest of the file. This class supports indexing and iteration like a list of
+    mazes, and may be used as a context manager.
+
+    :param str path: The path of the file.
+
+    :param maze_class: The class of the mazes. The mazes read must be
+        instances of a subclass of this class.
+
+    :raises ValueError: if the file is not a valid container file
+    """
+    def __init__(self, path, maze_class = BaseMaze):
+        self._maze_class = maze_class
+        with open(path, 'rb') as f:
+            try:
+                self._mmap = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+            except ValueError:
+                raise ValueError('Invalid container file')
+
+        try:
+            try:
+                magic, version, self._count, self._index = \
+                    _HEADER.unpack_from(self._mmap)
+            except struct.error:
+                raise ValueError('Truncated container file')
+            if magic != MAGIC:
+                raise ValueError('Invalid container file')
+            if version != FORMAT_VERSION:
+                raise ValueError(
+                    'Unsupported container file version: %d' % version)
+            if self._index == 0:
+                raise ValueError('The container file was not closed')
+            if self._index + self._count * _ENTRY.size > len(self._mmap):
+                raise ValueError('Truncated container file')
+        except ValueError:
+            self._mmap.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._count
+        if index < 0 or index >= self._count:
+            raise IndexError(index)
+        offset, size = self._entry(index)
+        return self._maze_class.from_bytes(self._mmap[offset:offset + size])
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield self[index]
+
+    def close(self):
+        """Closes the file"""
+        self._mmap.close()
+
+    def _entry(self, index):
+        """Returns the tuple ``(offset, size)`` of a maze read from the
+        index"""
+        return _ENTRY.unpack_from(self._mmap, self._index + index * _ENTRY.size)
+
+
+class MazeWriter(object):
+    """A writer of container files holding any number of mazes.
+
+    Every maze is stored as serialised by :meth:`maze.BaseMaze.to_bytes`, and
+    an index of their offsets is stored after the last maze.
+
+    If the file already exists, mazes are appended to it after its index, and
+    a new index is written after them. The header is updated to refer to the
+    new index last, so until :meth:`close` has completed, or if writing is
+    interrupted, the file still contains the mazes it contained before. Every
+    time mazes are appended, the space of the previous index is lost.
+
+    This class may be used as a context manager. A new file is not valid until
+    :meth:`close` has been called.
+
+    :param str path: The path of the file.
+
+    :param str compression: The compression to apply to every maze; one of
+        :attr:`maze.COMPRESSIONS`.
+
+    :raises ValueError: if the file exists but is not a valid container file,
+        or if *compression* is not supported
+    """
+    def __init__(self, path, compression = None):
+        if not compression in COMPRESSIONS:
+            raise ValueError('Unsupported compression: %s' % compression)
+        self._compression = compression
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            # Read the existing index; the new mazes are written after it, and
+            # anything following it was left by an interrupted writer
+            with MazeReader(path) as reader:
+                self._entries = [reader._entry(i) for i in range(len(reader))]
+                position = reader._index + len(reader) * _ENTRY.size
+            self._f = open(path, 'r+b')
+        else:
+            # Mark the file as being written until the index is written
+            self._entries = []
+            self._f = open(path, 'w+b')
+            self._f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, 0, 0))
+            position = _HEADER.size
+
+        self._f.seek(position)
+        self._f.truncate()
+        self._position = position
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def append(self, maze):
+        """Appends a maze to the file.
+
+        :param maze.BaseMaze maze: The maze to append.
+
+        :return: the index of the maze in the file
+        :rtype: int
+        """
+        data = maze.to_bytes(self._compression)
+        self._f.write(data)
+        self._entries.append((self._position, len(data)))
+        self._position += len(data)
+        return len(self._entries) - 1
+
+    def extend(self, mazes):
+        """Appends several mazes to the file.
+
+        :param mazes: The mazes to append.
+        """
+        for maze in mazes:
+            self.append(maze)
+
+    def close(self):
+        """Writes the index and closes the file.
+
+        Calling this method more than once has no effect.
+        """
+        if self._f is None:
+            return
+
+        try:
+            self._f.write(b''.join(
+                _ENTRY.pack(offset, size) for offset, size in self._entries))
+            self._f.flush()
+            os.fsync(self._f.fileno())
+
+            # Refer to the new index only once it has been written
+            self._f.seek(0)
+            self._f.write(_HEADER.pack(MAGIC, FORMAT_VERSION,
+                len(self._entries), self._position))
+            self._f.flush()
+            os.fsync(self._f.fileno())
+        finally:
+            self._f.close()
+            self._f = None
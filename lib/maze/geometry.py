@@ -0,0 +1,264 @@
+# coding=utf-8
+# pymaze
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+from .quad import QuadWall
+
+
+# The cached corner tables for every wall class
+_CORNERS = {}
+
+
+def _get_corners(wall_class, room_pos):
+    """Returns the walls meeting in the start corner of every wall of a room.
+
+    Like :meth:`maze.BaseWall._get_backs`, the result depends only on whether
+    the room coordinates are odd or even, so it is cached.
+
+    :param wall_class: The wall class of the maze.
+
+    :param room_pos: The position of the room.
+    :type room_pos: (int, int)
+
+    :return: a list indexed by wall index containing the tuple
+        ``(start, end, walls)``, where *start* and *end* are the offsets from
+        the centre of the room to the corners of the span of the wall, as found
+        in :attr:`maze.BaseWall.CORNERS`, and *walls* is a list of the tuple
+        ``(dx, dy, wall_index)``; these are the walls, in counter-clockwise
+        order and excluding the wall itself, that have their *end* span in the
+        start corner of the wall
+    :rtype: [((float, float), (float, float), [(int, int, int)])]
+    """
+    key = (room_pos[0] & 1, room_pos[1] & 1)
+    try:
+        return _CORNERS[wall_class][key]
+    except KeyError:
+        offsets = wall_class.CORNERS[wall_class.parity(key)]
+        corners = []
+        for wall_index in wall_class.WALLS:
+
+            # The back of a wall in the corner has its end span in the corner
+            walls = [(
+                    back.room_pos[0] - key[0],
+                    back.room_pos[1] - key[1],
+                    back.wall)
+                for back in (
+                    wall.back
+                    for wall in wall_class.from_corner(key, wall_index))][1:]
+
+            corners.append((
+                offsets[wall_index],
+                offsets[(wall_index + 1) % len(offsets)],
+                walls))
+        _CORNERS.setdefault(wall_class, {})[key] = corners
+        return corners
+
+
+def wall_polylines(maze, region = None):
+    """Generates the polylines making up the walls of a maze.
+
+    The walls are traversed once: every wall without a door is included in
+    exactly one polyline, and the maze is not modified.
+
+    :param maze.BaseMaze maze: The maze whose walls to trace.
+
+    :param region: The region of rooms whose walls to trace, expressed as
+        ``(x, y, width, height)``. The region is treated as a maze of its own,
+        so walls between a room inside and a room outside of the region are
+        traced as edge walls. If this is ``None``, the entire maze is traced.
+    :type region: (int, int, int, int)
+
+    :return: a generator yielding lists of physical coordinates, as returned by
+        :meth:`maze.BaseMaze.get_center`
+    """
+    wall_class = maze.__class__.Wall
+    get_backs = wall_class._get_backs
+    rooms = maze.rooms
+    wall_count = len(wall_class.WALLS)
+
+    if region is None:
+        left, bottom, width, height = 0, 0, maze.width, maze.height
+        xs, ys = maze.centers()
+    else:
+        left = max(0, region[0])
+        bottom = max(0, region[1])
+        width = max(0, min(maze.width, region[0] + region[2]) - left)
+        height = max(0, min(maze.height, region[1] + region[3]) - bottom)
+        xs, ys = None, None
+    right, top = left + width, bottom + height
+
+    # The walls already traced; this is indexed by room index relative to the
+    # region and wall index
+    visited = bytearray(width * height * wall_count)
+
+    def inside(x, y):
+        return x >= left and x < right and y >= bottom and y < top
+
+    def index(x, y, wall_index):
+        """Returns the index of a wall in visited, or -1 if the room is outside
+        of the region"""
+        return ((y - bottom) * width + x - left) * wall_count + wall_index \
+            if inside(x, y) else -1
+
+    def center(x, y):
+        """Returns the centre of a room, which may be outside of the maze"""
+        if not xs is None and inside(x, y):
+            i = y * width + x
+            return (xs[i], ys[i])
+        else:
+            return maze.get_center((x, y))
+
+    def trace(x, y, wall_index):
+        """Traces the walls from the end span of a wall, and returns the
+        polyline"""
+        center_x, center_y = center(x, y)
+        start, end, walls = _get_corners(wall_class, (x, y))[wall_index]
+        polyline = [(center_x + end[0], center_y + end[1])]
+
+        while True:
+            # Mark the wall and its back as traced
+            dx, dy, back_index = get_backs((x, y))[wall_index]
+            for i in (
+                    index(x, y, wall_index),
+                    index(x + dx, y + dy, back_index)):
+                if i >= 0:
+                    visited[i] = 1
+            polyline.append((center_x + start[0], center_y + start[1]))
+
+            # Continue with the first remaining wall in the corner
+            for dx, dy, next_index in walls:
+                nx, ny = x + dx, y + dy
+                if inside(nx, ny):
+                    if not next_index in rooms[ny][nx].doors \
+                            and not visited[index(nx, ny, next_index)]:
+                        break
+                else:
+                    bdx, bdy, back_index = get_backs((nx, ny))[next_index]
+                    bx, by = nx + bdx, ny + bdy
+                    if inside(bx, by) \
+                            and not back_index in rooms[by][bx].doors \
+                            and not visited[index(bx, by, back_index)]:
+                        break
+            else:
+                return polyline
+
+            x, y, wall_index = nx, ny, next_index
+            center_x, center_y = center(x, y)
+            start, end, walls = _get_corners(wall_class, (x, y))[wall_index]
+
+    for y in range(bottom, top):
+        row = rooms[y]
+        for x in range(left, right):
+            room = row[x]
+            for wall_index in range(wall_count):
+                if not wall_index in room.doors \
+                        and not visited[index(x, y, wall_index)]:
+                    yield trace(x, y, wall_index)
+
+
+def wall_runs(maze, region = None):
+    """Generates the maximal straight runs of walls of a maze with square rooms.
+
+    Every horizontal and vertical grid line is scanned once, and every run of
+    adjacent walls without doors along a line is yielded as a single segment.
+
+    :param maze.quad.Maze maze: The maze whose walls to scan.
+
+    :param region: The region of rooms whose walls to scan, expressed as
+        ``(x, y, width, height)``. As for :func:`wall_polylines`, the region is
+        treated as a maze of its own. If this is ``None``, the entire maze is
+        scanned.
+    :type region: (int, int, int, int)
+
+    :return: a generator yielding the tuple ``(start, end)`` of physical
+        coordinates, as returned by :meth:`maze.BaseMaze.get_center`, for every
+        run; horizontal runs are yielded first
+    :raises ValueError: if the rooms of the maze are not square
+    """
+    if not issubclass(maze.__class__.Wall, QuadWall):
+        raise ValueError('Wall runs require a maze with square rooms')
+
+    m = QuadWall.MULTIPLICATOR
+    rooms = maze.rooms
+
+    if region is None:
+        left, bottom, right, top = 0, 0, maze.width, maze.height
+    else:
+        left = max(0, region[0])
+        bottom = max(0, region[1])
+        right = max(left, min(maze.width, region[0] + region[2]))
+        top = max(bottom, min(maze.height, region[1] + region[3]))
+    if left == right or bottom == top:
+        return
+
+    def runs(closed, offset):
+        """Yields the tuple ``(start, end)`` for every run of true values"""
+        start = None
+        for i, c in enumerate(closed, offset):
+            if c:
+                if start is None:
+                    start = i
+            elif not start is None:
+                yield (start, i)
+                start = None
+        if not start is None:
+            yield (start, offset + len(closed))
+
+    # Scan the horizontal lines; the line y is below the row y, and the top
+    # line is above the last row
+    for y in range(bottom, top + 1):
+        if y < top:
+            closed = [not QuadWall.DOWN in room.doors
+                for room in rooms[y][left:right]]
+        else:
+            closed = [not QuadWall.UP in room.doors
+                for room in rooms[y - 1][left:right]]
+        for start, end in runs(closed, left):
+            yield ((start * m, y * m), (end * m, y * m))
+
+    # Scan the vertical lines; the line x is to the left of the column x, and
+    # the last line is to the right of the last column
+    for x in range(left, right + 1):
+        if x < right:
+            closed = [not QuadWall.LEFT in row[x].doors
+                for row in rooms[bottom:top]]
+        else:
+            closed = [not QuadWall.RIGHT in row[x - 1].doors
+                for row in rooms[bottom:top]]
+        for start, end in runs(closed, bottom):
+            yield ((x * m, start * m), (x * m, end * m))
+
+
+def wall_lines(maze, region = None):
+    """Generates the polylines making up the walls of a maze using as few
+    points as possible.
+
+    For mazes with square rooms, every maximal straight run of walls is a
+    polyline with two points, as generated by :func:`wall_runs`; otherwise the
+    polylines generated by :func:`wall_polylines` are used.
+
+    :param maze.BaseMaze maze: The maze whose walls to trace.
+
+    :param region: The region of rooms whose walls to trace, expressed as
+        ``(x, y, width, height)``. If this is ``None``, the entire maze is
+        traced.
+    :type region: (int, int, int, int)
+
+    :return: a generator yielding lists of physical coordinates
+    """
+    if issubclass(maze.__class__.Wall, QuadWall):
+        return (list(run) for run in wall_runs(maze, region))
+    else:
+        return wall_polylines(maze, region)
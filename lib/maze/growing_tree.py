@@ -0,0 +1,197 @@
+# coding=utf-8
+# pymaze
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+#: The version of the maze generated by this module for a given sequence of
+#: random numbers; it is incremented whenever the maze generated changes
+VERSION = 1
+
+#: Always select the most recently added room; this makes the algorithm behave
+#: like a recursive backtracker and generates mazes with long corridors
+NEWEST = 'newest'
+
+#: Always select the least recently added room
+OLDEST = 'oldest'
+
+#: Select a random room; this makes the algorithm behave like the randomised
+#: Prim algorithm and generates mazes with many short dead ends
+RANDOM = 'random'
+
+#: The default number of steps between progress updates
+STEPS = 1000
+
+
+def mixed(**weights):
+    """Creates a selection policy that picks one of the simple policies at
+    random for every step.
+
+    Example: ``mixed(newest = 3, random = 1)`` will select the newest room three
+    times out of four, and a random room otherwise.
+
+    :param weights: The relative weights of the policies :attr:`NEWEST`,
+        :attr:`OLDEST` and :attr:`RANDOM`, passed by name.
+
+    :return: a selection policy
+    :rtype: [(str, int)]
+
+    :raises ValueError: if an unknown policy is passed, or if no weight is
+        greater than ``0``
+    """
+    result = []
+    total = 0
+    for policy in (NEWEST, OLDEST, RANDOM):
+        weight = int(weights.pop(policy, 0))
+        if weight > 0:
+            total += weight
+            result.append((policy, total))
+
+    if weights:
+        raise ValueError('Unknown policies: %s' % ', '.join(weights))
+    if not result:
+        raise ValueError('No policy has a weight greater than 0')
+
+    return result
+
+
+def initialize(maze, randomizer, policy = NEWEST):
+    """A function that initialises a maze with the growing tree algorithm.
+
+    See `here <http://www.astrolog.org/labyrnth/algrithm.htm>`_.
+
+    The algorithm keeps a set of active rooms. For every step, a room is
+    selected from the set according to *policy*, and a door is opened to a
+    random unvisited neighbour, which is added to the set. Rooms without
+    unvisited neighbours are removed from the set.
+
+    The active set is a list with a moving head, so adding rooms and removing
+    the newest, the oldest or a random room are all constant time operations. A
+    random room is removed by moving the newest room to its place, so when
+    :attr:`RANDOM` is mixed with another policy, the age order of the active
+    rooms is only approximate.
+
+    :param maze.BaseMaze maze: The maze to initialise.
+
+    :param randomizer: The function used as a source of randomness. It will be
+        called with an argument describing the maximum value to return. It may
+        return any integers between ``0`` and the non-inclusive maximum value.
+        See :func:`maze.randomizer.block_randomizer` for an efficient source.
+
+    :param policy: The policy used to select the next room from the active set.
+        This is one of :attr:`NEWEST`, :attr:`OLDEST` and :attr:`RANDOM`, or a
+        value returned by :func:`mixed`.
+
+    :raises ValueError: if policy is invalid
+    """
+    for progress in initialize_steps(maze, randomizer, policy,
+            2 * maze.width * maze.height):
+        pass
+
+
+def initialize_steps(maze, randomizer, policy = NEWEST, steps = STEPS):
+    """Initialises a maze with the growing tree algorithm, yielding control
+    regularly.
+
+    This is a generator that performs at most *steps* steps of the algorithm
+    between yielding progress updates. To cancel the initialisation, simply
+    stop iterating, or call ``close()``; the maze is then left partially
+    initialised.
+
+    See :func:`initialize` for a description of the parameters, and
+    :func:`maze.asynchronous.initialize` for use with :mod:`asyncio`.
+
+    :param int steps: The maximum number of steps to perform between progress
+        updates.
+
+    :return: a generator yielding the tuple ``(rooms_visited, room_count)``
+
+    :raises ValueError: if policy is invalid
+    """
+    if policy in (NEWEST, OLDEST, RANDOM):
+        select = lambda: policy
+    else:
+        try:
+            policies = list(policy)
+            total = policies[-1][1]
+        except (IndexError, TypeError):
+            raise ValueError('Invalid policy: %s' % str(policy))
+        def select():
+            value = randomizer(total)
+            for p, limit in policies:
+                if value < limit:
+                    return p
+
+    get_backs = maze.__class__.Wall._get_backs
+    width, height = maze.width, maze.height
+    visited = bytearray(width * height)
+
+    # Start with a random room
+    start_x, start_y = randomizer(width), randomizer(height)
+    visited[start_y * width + start_x] = 1
+    active = [(start_x, start_y)]
+    head = 0
+    room_count = width * height
+    visited_count = 1
+
+    step = 0
+    while head < len(active):
+        # Yield control regularly
+        step += 1
+        if step == steps:
+            step = 0
+            yield (visited_count, room_count)
+
+        # Select a room from the active set
+        p = select()
+        if p == NEWEST:
+            index = len(active) - 1
+        elif p == OLDEST:
+            index = head
+        else:
+            index = head + randomizer(len(active) - head)
+        x, y = active[index]
+
+        # Find all unvisited neighbours
+        candidates = []
+        for wall_index, (dx, dy, _) in enumerate(get_backs((x, y))):
+            nx, ny = x + dx, y + dy
+            if nx >= 0 and nx < width and ny >= 0 and ny < height \
+                    and not visited[ny * width + nx]:
+                candidates.append((wall_index, nx, ny))
+
+        if candidates:
+            # Open a door to a random neighbour and make it active
+            wall_index, nx, ny = candidates[randomizer(len(candidates))] \
+                if len(candidates) > 1 else candidates[0]
+            maze.set_doors((((x, y), wall_index),))
+            visited[ny * width + nx] = 1
+            visited_count += 1
+            active.append((nx, ny))
+
+        elif index == head:
+            # Remove the oldest room by moving the head, and compact the list
+            # once half of it is unused
+            head += 1
+            if head > 1024 and head * 2 > len(active):
+                del active[:head]
+                head = 0
+
+        else:
+            # Remove any other room by replacing it with the newest room
+            last = active.pop()
+            if index < len(active):
+                active[index] = last
+
+    yield (visited_count, room_count)
@@ -14,6 +14,7 @@
 # You should have received a copy of the GNU General Public License along with
 # this program. If not, see <http://www.gnu.org/licenses/>.
 
+import array
 import math
 
 from . import BaseWall, BaseMaze
@@ -66,6 +67,18 @@ class HexWall(BaseMaze.Wall):
         NAMES.append(name.lower())
         WALLS.append(i)
 
+    # The offsets from the centre of a room to the start corner of every wall,
+    # indexed by parity and wall index; the span of a wall does not depend on
+    # the parity
+    CORNERS = [[(math.cos(a), math.sin(a)) for a in _ANGLES]] * 2
+
+    @classmethod
+    def parity(self, room_pos):
+        """
+        @see Maze.Wall.parity
+        """
+        return room_pos[1] & 1
+
     @classmethod
     def from_direction(self, room_pos, direction):
         """
@@ -102,3 +115,38 @@ class HexMaze(BaseMaze):
             (room_pos[0] + (1.0 if room_pos[1] % 2 == 1 else 0.5))
                 * self.Wall.HORIZONTAL_MULTIPLICATOR,
             (room_pos[1] + 0.5) * self.Wall.VERTICAL_MULTIPLICATOR)
+
+    def centers(self):
+        hm = self.Wall.HORIZONTAL_MULTIPLICATOR
+        vm = self.Wall.VERTICAL_MULTIPLICATOR
+        rows = [
+            array.array('d', [(x + 0.5) * hm for x in range(self.width)]),
+            array.array('d', [(x + 1.0) * hm for x in range(self.width)])]
+        xs, ys = array.array('d'), array.array('d')
+        for y in range(self.height):
+            xs.extend(rows[y & 1])
+            ys.extend(array.array('d', [(y + 0.5) * vm]) * self.width)
+        return (xs, ys)
+
+    def physical_bounds(self):
+        # Odd rows are moved half a room to the right, and the corners of a
+        # room are on a circle with radius 1.0 with the top and bottom corners
+        # straight above and below the centre
+        return (
+            0.0,
+            0.5 * self.Wall.VERTICAL_MULTIPLICATOR - 1.0,
+            (self.width + (0.5 if self.height > 1 else 0.0))
+                * self.Wall.HORIZONTAL_MULTIPLICATOR,
+            (self.height - 0.5) * self.Wall.VERTICAL_MULTIPLICATOR + 1.0)
+
+    def room_range(self, bounds):
+        hm = self.Wall.HORIZONTAL_MULTIPLICATOR
+        vm = self.Wall.VERTICAL_MULTIPLICATOR
+
+        # Rooms on odd rows are moved half a room to the right, so the range
+        # must cover both even and odd rows
+        return self._clip_range(
+            (bounds[0] - 1.0) / hm - 1.0,
+            (bounds[1] - 1.0) / vm - 0.5,
+            (bounds[2] + 1.0) / hm - 0.5,
+            (bounds[3] + 1.0) / vm - 0.5)
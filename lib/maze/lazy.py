@@ -0,0 +1,280 @@
+# coding=utf-8
+# pymaze
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import mmap
+import struct
+import threading
+
+from . import BaseMaze, COMPRESSIONS, _compress, _decompress, _find_class
+from .mask import MaskRow
+
+
+#: The magic bytes starting a file written by :func:`write`
+MAGIC = b'MZRW'
+
+#: The version of the format written by :func:`write`
+FORMAT_VERSION = 1
+
+#: The default number of rows stored in every chunk
+ROWS = 64
+
+#: The default number of decoded chunks kept in memory
+CACHE_SIZE = 16
+
+# The header of a file: magic, version, compression, width, height, the number
+# of rows per chunk and the length of the class name following the header; the
+# class name is followed by the offsets of all chunks and the offset of the end
+# of the last chunk
+_HEADER = struct.Struct('>4sBBIIIH')
+
+# An entry in the chunk offset table
+_OFFSET = struct.Struct('>Q')
+
+
+def write(maze, f, rows = ROWS, compression = 'zlib'):
+    """Writes a maze in a format that allows loading rows on demand.
+
+    The doors are stored as in :meth:`maze.BaseMaze.door_mask`, split into
+    chunks of *rows* rows that are compressed separately.
+
+    :param maze.BaseMaze maze: The maze to write.
+
+    :param f: The file name or binary file object to which to write.
+
+    :param int rows: The number of rows in every chunk.
+
+    :param str compression: The compression to apply to every chunk; one of
+        :attr:`maze.COMPRESSIONS`.
+
+    :raises ValueError: if *compression* is not supported or *rows* is not
+        positive
+    """
+    if not compression in COMPRESSIONS:
+        raise ValueError('Unsupported compression: %s' % compression)
+    if rows < 1:
+        raise ValueError('Invalid number of rows per chunk: %d' % rows)
+
+    name = ('%s.%s' % (
+        maze.__class__.__module__, maze.__class__.__name__)).encode('ascii')
+    mask = maze.door_mask()
+    chunks = [
+        _compress(compression, bytes(mask[
+            y * maze.width:min(y + rows, maze.height) * maze.width]))
+        for y in range(0, maze.height, rows)]
+
+    # Calculate the offsets of the chunks from the size of the header
+    offsets = []
+    offset = _HEADER.size + len(name) + (len(chunks) + 1) * _OFFSET.size
+    for chunk in chunks:
+        offsets.append(offset)
+        offset += len(chunk)
+    offsets.append(offset)
+
+    close = False
+    if not hasattr(f, 'write'):
+        f = open(f, 'wb')
+        close = True
+
+    try:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION,
+            COMPRESSIONS.index(compression), maze.width, maze.height, rows,
+            len(name)) + name)
+        f.write(b''.join(_OFFSET.pack(offset) for offset in offsets))
+        for chunk in chunks:
+            f.write(chunk)
+
+    finally:
+        if close:
+            f.close()
+
+
+def load(path, maze_class = BaseMaze, cache_size = CACHE_SIZE):
+    """Loads a maze written by :func:`write` without reading its rooms.
+
+    The file is memory mapped, and a chunk of rows is decoded only when one of
+    its rooms is accessed. The most recently used chunks are kept in memory.
+
+    The maze returned is read-only. The file remains mapped until
+    ``maze.rooms.close()`` is called, or the block of ``with maze.rooms:`` is
+    left; until then, it cannot be replaced or removed on some platforms, like
+    *Windows*.
+
+    :param str path: The path of the file.
+
+    :param maze_class: The class of the maze. The maze read must be an instance
+        of a subclass of this class.
+
+    :param int cache_size: The maximum number of decoded chunks to keep in
+        memory.
+
+    :return: a maze
+    :rtype: maze.BaseMaze
+
+    :raises ValueError: if the file is invalid or uses an unsupported version
+        or compression, or if the maze class is not a subclass
+    """
+    with open(path, 'rb') as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+        except ValueError:
+            raise ValueError('Invalid maze data')
+
+    try:
+        try:
+            magic, version, compression, width, height, rows, name_length = \
+                _HEADER.unpack_from(data)
+        except struct.error:
+            raise ValueError('Truncated maze data')
+        if magic != MAGIC:
+            raise ValueError('Invalid maze data')
+        if version != FORMAT_VERSION:
+            raise ValueError('Unsupported maze data version: %d' % version)
+        if compression >= len(COMPRESSIONS):
+            raise ValueError('Unsupported compression: %d' % compression)
+        if rows < 1:
+            raise ValueError('Invalid maze data')
+
+        # Find the maze class
+        name = data[_HEADER.size:_HEADER.size + name_length].decode('ascii')
+        cls = _find_class(name)
+        if not isinstance(cls, type) or not issubclass(cls, maze_class):
+            raise ValueError('%s is not a subclass of %s' % (
+                name, maze_class.__name__))
+
+        # Read the chunk offset table
+        count = (height + rows - 1) // rows
+        start = _HEADER.size + name_length
+        try:
+            offsets = [
+                _OFFSET.unpack_from(data, start + i * _OFFSET.size)[0]
+                for i in range(count + 1)]
+        except struct.error:
+            raise ValueError('Truncated maze data')
+        if offsets[-1] > len(data):
+            raise ValueError('Truncated maze data')
+    except ValueError:
+        data.close()
+        raise
+
+    maze = cls.__new__(cls)
+    maze.rooms = LazyRows(data, offsets, COMPRESSIONS[compression],
+        width, height, rows, cache_size)
+    maze.width = width
+    maze.height = height
+    return maze
+
+
+class LazyRows(object):
+    """The rows of rooms of a maze that are decoded when first accessed.
+
+    This class supports indexing, slicing and iteration like a list of rows.
+
+    :param data: The buffer containing the compressed chunks.
+
+    :param offsets: The offsets of all chunks in *data*, followed by the offset
+        of the end of the last chunk.
+    :type offsets: [int]
+
+    :param str compression: The compression of the chunks.
+
+    :param int width: The width of the maze.
+
+    :param int height: The height of the maze.
+
+    :param int rows: The number of rows in every chunk.
+
+    :param int cache_size: The maximum number of decoded chunks to keep in
+        memory.
+
+    When used as a context manager, the buffer is closed when the block is
+    left.
+    """
+    def __init__(self, data, offsets, compression, width, height, rows,
+            cache_size):
+        self._data = data
+        self._offsets = offsets
+        self._compression = compression
+        self._width = width
+        self._height = height
+        self._rows = rows
+        self._cache_size = max(1, cache_size)
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self._height
+
+    def __getitem__(self, y):
+        if isinstance(y, slice):
+            return [self[i] for i in range(*y.indices(self._height))]
+        if y < 0:
+            y += self._height
+        if y < 0 or y >= self._height:
+            raise IndexError(y)
+        index, row = divmod(y, self._rows)
+        return MaskRow(self._chunk(index), row * self._width, self._width)
+
+    def __iter__(self):
+        for y in range(self._height):
+            yield self[y]
+
+    def close(self):
+        """Closes the buffer and discards the decoded chunks.
+
+        Accessing rows that are not already referenced raises
+        :class:`ValueError` once this method has been called. Calling this
+        method more than once has no effect.
+        """
+        with self._lock:
+            if self._data is None:
+                return
+            self._data.close()
+            self._data = None
+            self._cache.clear()
+
+    def _chunk(self, index):
+        """Returns a decoded chunk of rows.
+
+        :param int index: The index of the chunk.
+
+        :return: the doors of the rooms in the chunk
+
+        :raises ValueError: if the chunk is invalid, or if the buffer is
+            closed
+        """
+        with self._lock:
+            try:
+                result = self._cache.pop(index)
+            except KeyError:
+                if self._data is None:
+                    raise ValueError('The maze data is closed')
+                result = _decompress(self._compression,
+                    self._data[self._offsets[index]:self._offsets[index + 1]])
+                expected = self._width * (
+                    min(self._rows, self._height - index * self._rows))
+                if len(result) != expected:
+                    raise ValueError('Truncated maze data')
+                while len(self._cache) >= self._cache_size:
+                    self._cache.popitem(last = False)
+            self._cache[index] = result
+            return result
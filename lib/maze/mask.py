@@ -0,0 +1,157 @@
+# coding=utf-8
+# pymaze
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+try:
+    from collections.abc import Set
+except ImportError:
+    from collections import Set
+
+from . import Room
+
+
+class DoorMask(Set):
+    """A set of wall indices backed by a single byte in a buffer.
+
+    Bit *n* of the byte is set if wall *n* has a door. This class supports the
+    operations of :class:`set` used by :class:`maze.Room`.
+
+    :param mask: The buffer.
+
+    :param int index: The index of the byte in the buffer.
+    """
+    __slots__ = (
+        '_mask',
+        '_index')
+
+    def __init__(self, mask, index):
+        self._mask = mask
+        self._index = index
+
+    def __contains__(self, wall_index):
+        try:
+            return bool((self._mask[self._index] >> wall_index) & 1)
+        except (TypeError, ValueError):
+            return False
+
+    def __iter__(self):
+        value = self._mask[self._index]
+        return (i for i in range(8) if (value >> i) & 1)
+
+    def __len__(self):
+        return bin(self._mask[self._index]).count('1')
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__, str(list(self)))
+
+    def add(self, wall_index):
+        """Adds a wall index to this set.
+
+        :param int wall_index: The wall index to add.
+        """
+        self._mask[self._index] |= 1 << wall_index
+
+    def discard(self, wall_index):
+        """Removes a wall index from this set if it is present.
+
+        :param int wall_index: The wall index to remove.
+        """
+        self._mask[self._index] &= ~(1 << wall_index) & 0xFF
+
+
+class MaskRoom(Room):
+    """A room whose doors are stored in a byte of a buffer.
+
+    :param mask: The buffer.
+
+    :param int index: The index of the byte in the buffer.
+    """
+    def __init__(self, mask, index):
+        self.doors = DoorMask(mask, index)
+
+
+class MaskRow(object):
+    """A row of rooms stored in a buffer with one byte per room.
+
+    This class supports indexing, slicing and iteration like a list of rooms.
+
+    :param mask: The buffer.
+
+    :param int offset: The index in the buffer of the first room.
+
+    :param int width: The number of rooms in the row.
+    """
+    def __init__(self, mask, offset, width):
+        self._mask = mask
+        self._offset = offset
+        self._width = width
+
+    def __len__(self):
+        return self._width
+
+    def __getitem__(self, x):
+        if isinstance(x, slice):
+            return [self[i] for i in range(*x.indices(self._width))]
+        if x < 0:
+            x += self._width
+        if x < 0 or x >= self._width:
+            raise IndexError(x)
+        return MaskRoom(self._mask, self._offset + x)
+
+    def __iter__(self):
+        for x in range(self._width):
+            yield MaskRoom(self._mask, self._offset + x)
+
+
+class MaskRows(object):
+    """The rows of rooms of a maze stored in a buffer with one byte per room.
+
+    The rooms are stored in row order, so the room ``(x, y)`` is stored at
+    index ``y * width + x``. This class supports indexing, slicing and
+    iteration like a list of rows.
+
+    :param mask: The buffer. Its length must be at least ``width * height``.
+
+    :param int width: The width of the maze.
+
+    :param int height: The height of the maze.
+
+    :raises ValueError: if the buffer is too small
+    """
+    def __init__(self, mask, width, height):
+        if len(mask) < width * height:
+            raise ValueError('The mask is too small for a %dx%d maze' % (
+                width, height))
+        self._width = width
+        self._height = height
+
+        #: The buffer containing the doors
+        self.mask = mask
+
+    def __len__(self):
+        return self._height
+
+    def __getitem__(self, y):
+        if isinstance(y, slice):
+            return [self[i] for i in range(*y.indices(self._height))]
+        if y < 0:
+            y += self._height
+        if y < 0 or y >= self._height:
+            raise IndexError(y)
+        return MaskRow(self.mask, y * self._width, self._width)
+
+    def __iter__(self):
+        for y in range(self._height):
+            yield MaskRow(self.mask, y * self._width, self._width)
@@ -14,6 +14,7 @@
 # You should have received a copy of the GNU General Public License along with
 # this program. If not, see <http://www.gnu.org/licenses/>.
 
+import array
 import math
 
 from . import BaseWall, BaseMaze
@@ -57,6 +58,10 @@ class QuadWall(BaseWall):
         NAMES.append(name.lower())
         WALLS.append(i)
 
+    # The offsets from the centre of a room to the start corner of every wall,
+    # indexed by parity and wall index
+    CORNERS = [[(math.cos(a), math.sin(a)) for a in _ANGLES]]
+
 class Maze(BaseMaze):
     """A maze with square rooms.
 
@@ -69,3 +74,27 @@ class Maze(BaseMaze):
         return (
             (room_pos[0] + 0.5) * self.Wall.MULTIPLICATOR,
             (room_pos[1] + 0.5) * self.Wall.MULTIPLICATOR)
+
+    def centers(self):
+        m = self.Wall.MULTIPLICATOR
+        xs = array.array('d', [(x + 0.5) * m for x in range(self.width)]) \
+            * self.height
+        ys = array.array('d')
+        for y in range(self.height):
+            ys.extend(array.array('d', [(y + 0.5) * m]) * self.width)
+        return (xs, ys)
+
+    def physical_bounds(self):
+        return (
+            0.0,
+            0.0,
+            self.width * self.Wall.MULTIPLICATOR,
+            self.height * self.Wall.MULTIPLICATOR)
+
+    def room_range(self, bounds):
+        m = self.Wall.MULTIPLICATOR
+        return self._clip_range(
+            (bounds[0] - 1.0) / m - 0.5,
+            (bounds[1] - 1.0) / m - 0.5,
+            (bounds[2] + 1.0) / m - 0.5,
+            (bounds[3] + 1.0) / m - 0.5)
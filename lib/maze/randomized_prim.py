@@ -15,6 +15,14 @@
 # this program. If not, see <http://www.gnu.org/licenses/>.
 
 
+#: The version of the maze generated by this module for a given sequence of
+#: random numbers; it is incremented whenever the maze generated changes
+VERSION = 1
+
+#: The default number of steps between progress updates
+STEPS = 1000
+
+
 def initialize(maze, randomizer):
     """A function that initialises a maze with the randomised prim algorithm.
 
@@ -25,13 +33,46 @@ def initialize(maze, randomizer):
     :param randomizer: The function used as a source of randomness. It will be
         called with an argument describing the maximum value to return. It may
         return any integers between ``0`` and the non-inclusive maximum value.
+        See :func:`maze.randomizer.block_randomizer` for an efficient source.
     """
+    for progress in initialize_steps(maze, randomizer,
+            maze.width * maze.height):
+        pass
+
+
+def initialize_steps(maze, randomizer, steps = STEPS):
+    """Initialises a maze with the randomised prim algorithm, yielding control
+    regularly.
+
+    This is a generator that performs at most *steps* steps of the algorithm
+    between yielding progress updates. To cancel the initialisation, simply
+    stop iterating, or call ``close()``; the maze is then left partially
+    initialised.
+
+    See :func:`initialize` for a description of the parameters, and
+    :func:`maze.asynchronous.initialize` for use with :mod:`asyncio`.
+
+    :param int steps: The maximum number of steps to perform between progress
+        updates.
+
+    :return: a generator yielding the tuple ``(rooms_visited, room_count)``
+    """
+    room_count = maze.width * maze.height
+
     # Start with a random room and add all its walls except those on the edge
     start_x, start_y = randomizer(maze.width), randomizer(maze.height)
     walls = [wall for wall in maze.walls((start_x, start_y))
         if not maze.edge(wall)]
+    visited = 1
 
+    step = 0
     while walls:
+        # Yield control regularly
+        step += 1
+        if step == steps:
+            step = 0
+            yield (visited, room_count)
+
         # Select a random wall
         index = randomizer(len(walls))
         wall = walls.pop(index)
@@ -43,6 +84,7 @@ def initialize(maze, randomizer):
         if not maze[next_room_pos]:
             # Add a door to the wall
             maze.set_door(wall.room_pos, wall, True)
+            visited += 1
 
             # Add all walls of the new room except those leading to rooms
             # already visited or leading out of the maze
@@ -52,3 +94,5 @@ def initialize(maze, randomizer):
                         walls.append(w)
                 except IndexError:
                     pass
+
+    yield (visited, room_count)
@@ -0,0 +1,136 @@
+# coding=utf-8
+# pymaze
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+import binascii
+import random
+import struct
+
+
+#: The default number of random words drawn at a time
+BLOCK_SIZE = 4096
+
+#: The version of the sequence of numbers returned by :func:`block_randomizer`.
+#:
+#: For a given seed and sequence of calls, the numbers returned are the same in
+#: all releases with the same version, so mazes can be regenerated from their
+#: seeds; any change to the sequence must increment this value.
+PRNG_VERSION = 2
+
+
+def _randomizer(next_block, block_size):
+    """Creates a randomizer function that consumes random 32 bit words drawn in
+    blocks.
+
+    Every call for a range that fits in 32 bits consumes one word, which is
+    scaled to the requested range with a multiplication and a shift. Larger
+    ranges consume as many words as are required to provide 32 bits more than
+    the range.
+
+    :param next_block: A function returning the next block of words. It is
+        called with the number of words to return, and it must return them in
+        reverse order, so that the first word drawn is last.
+
+    :param int block_size: The number of random words to draw at a time.
+
+    :return: a randomizer function
+    """
+    block = []
+    pop = block.pop
+
+    def word():
+        try:
+            return pop()
+        except IndexError:
+            block.extend(next_block(block_size))
+            return pop()
+
+    def large(max):
+        if max < 1:
+            raise ValueError('Empty range for randomizer: %d' % max)
+        count = (max.bit_length() + 63) // 32
+        value = 0
+        for i in range(count):
+            value = (value << 32) | word()
+        return (value * max) >> (32 * count)
+
+    def randomizer(max):
+        if not 0 < max <= 0xFFFFFFFF:
+            return large(max)
+        try:
+            return (pop() * max) >> 32
+        except IndexError:
+            block.extend(next_block(block_size))
+            return (pop() * max) >> 32
+
+    return randomizer
+
+
+def block_randomizer(seed = None, block_size = BLOCK_SIZE):
+    """Creates a source of randomness that draws random numbers in blocks.
+
+    The function returned may be passed as *randomizer* to the maze generators.
+    It is considerably cheaper to call than a function wrapping
+    :func:`random.randint`, since random numbers are drawn from
+    :meth:`random.Random.getrandbits` a block at a time.
+
+    The sequence of numbers returned depends only on *seed* and the ranges
+    requested, and not on *block_size*. For integer seeds, it is stable as
+    described by :attr:`PRNG_VERSION`.
+
+    :param seed: The seed for the underlying random number generator. If this
+        is ``None``, the generator is seeded from the current time or an
+        operating system specific source.
+
+    :param int block_size: The number of random words to draw at a time.
+
+    :return: a randomizer function
+    """
+    rng = random.Random(seed)
+
+    def next_block(size):
+        # getrandbits puts the first word drawn in the least significant bits,
+        # so unpacking the value as big endian yields the words in reverse
+        bits = rng.getrandbits(32 * size)
+        return struct.unpack('>%dI' % size,
+            binascii.unhexlify('%0*x' % (8 * size, bits)))
+
+    return _randomizer(next_block, block_size)
+
+
+def numpy_randomizer(generator = None, seed = None, block_size = BLOCK_SIZE):
+    """Creates a source of randomness that draws random numbers in blocks from
+    a *NumPy* generator.
+
+    :param generator: The *NumPy* generator to use. If this is ``None``, a new
+        default generator seeded with *seed* is created.
+
+    :param seed: The seed used when creating a generator.
+
+    :param int block_size: The number of random words to draw at a time.
+
+    :return: a randomizer function
+
+    :raises ImportError: if *NumPy* is not available
+    """
+    import numpy
+    if generator is None:
+        generator = numpy.random.default_rng(seed)
+
+    def next_block(size):
+        return generator.integers(0, 1 << 32, size = size,
+            dtype = numpy.uint32)[::-1].tolist()
+
+    return _randomizer(next_block, block_size)
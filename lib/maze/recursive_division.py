@@ -0,0 +1,195 @@
+# coding=utf-8
+# pymaze
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+from .randomizer import block_randomizer
+
+
+#: The version of the maze generated by this module for a given sequence of
+#: random numbers; it is incremented whenever the maze generated changes
+VERSION = 1
+
+#: The default number of rooms in a region below which it is no longer divided
+#: by the calling process, but handed to a worker
+THRESHOLD = 64 * 64
+
+#: The maximum seed passed to worker processes
+MAX_SEED = 1 << 30
+
+
+def initialize(maze, randomizer, threshold = THRESHOLD, processes = None):
+    """A function that initialises a maze with the recursive division
+    algorithm.
+
+    See `here <http://en.wikipedia.org/wiki/Maze_generation_algorithm>`_.
+
+    The maze is treated as an open area which is divided into two regions by a
+    wall with a single door. The regions are then divided in turn until they are
+    only one room wide. Since the regions do not share any state, regions
+    smaller than *threshold* are divided by a pool of worker processes, each
+    using a :func:`maze.randomizer.block_randomizer` seeded by *randomizer*;
+    the maze generated thus does not depend on the number of processes used.
+
+    This algorithm requires every room to be adjacent to the rooms immediately
+    above and to the right of it, so it cannot be used with triangular mazes.
+
+    :param maze.BaseMaze maze: The maze to initialise.
+
+    :param randomizer: The function used as a source of randomness. It will be
+        called with an argument describing the maximum value to return. It may
+        return any integers between ``0`` and the non-inclusive maximum value.
+        See :func:`maze.randomizer.block_randomizer` for an efficient source.
+
+    :param int threshold: The number of rooms in a region below which it is
+        handed to a worker process.
+
+    :param int processes: The number of worker processes to use. If this is
+        ``None``, the number of CPUs is used, and if it is ``1``, no worker
+        processes are started.
+
+    :raises ValueError: if the maze does not support this algorithm
+    """
+    towards = _towards(maze.__class__.Wall)
+
+    # Divide the maze until all regions are small enough to be handed to the
+    # workers
+    doors = []
+    regions = _divide(towards, (0, 0, maze.width, maze.height), randomizer,
+        doors, threshold)
+    maze.set_doors(doors)
+
+    # Divide the remaining regions using seeded sources of randomness
+    tasks = [(maze.__class__.Wall, region, randomizer(MAX_SEED))
+        for region in regions]
+    if processes == 1 or len(tasks) < 2:
+        for task in tasks:
+            maze.set_doors(_divide_region(task))
+    else:
+        import multiprocessing
+        pool = multiprocessing.Pool(processes)
+        try:
+            for doors in pool.imap_unordered(_divide_region, tasks):
+                maze.set_doors(doors)
+        finally:
+            pool.close()
+            pool.join()
+
+
+def _towards(wall_class):
+    """Returns the walls leading to the rooms above and to the right of a room.
+
+    :param wall_class: The wall class of the maze.
+
+    :return: a mapping from ``(x & 1, y & 1)`` to the tuple
+        ``(up_wall_index, right_wall_index)``
+    :rtype: {(int, int): (int, int)}
+
+    :raises ValueError: if a room is not adjacent to the rooms above and to the
+        right of it
+    """
+    result = {}
+    for key in ((0, 0), (1, 0), (0, 1), (1, 1)):
+        directions = dict(((dx, dy), wall_index)
+            for wall_index, (dx, dy, _) in enumerate(
+                wall_class._get_backs(key)))
+        try:
+            result[key] = (directions[(0, 1)], directions[(1, 0)])
+        except KeyError:
+            raise ValueError(
+                'Recursive division requires rows and columns of adjacent '
+                'rooms')
+
+    return result
+
+
+def _divide(towards, region, randomizer, doors, threshold = 0):
+    """Divides a region of a maze until all sub-regions are corridors or
+    smaller than a threshold.
+
+    :param towards: The walls leading up and right, as returned by
+        :func:`_towards`.
+
+    :param region: The region to divide, expressed as
+        ``(x, y, width, height)``.
+    :type region: (int, int, int, int)
+
+    :param randomizer: The source of randomness.
+
+    :param list doors: A list to which all doors are appended, as the tuple
+        ``(room_pos, wall_index)``.
+
+    :param int threshold: The number of rooms in a region below which it is not
+        divided.
+
+    :return: the regions that were not divided because they were smaller than
+        the threshold
+    :rtype: [(int, int, int, int)]
+    """
+    remaining = []
+    regions = [region]
+    while regions:
+        x, y, width, height = regions.pop()
+
+        if width * height < threshold and width > 1 and height > 1:
+            remaining.append((x, y, width, height))
+
+        elif width == 1:
+            # This is a vertical corridor
+            for ry in range(y, y + height - 1):
+                doors.append(((x, ry), towards[x & 1, ry & 1][0]))
+
+        elif height == 1:
+            # This is a horizontal corridor
+            for rx in range(x, x + width - 1):
+                doors.append(((rx, y), towards[rx & 1, y & 1][1]))
+
+        elif height > width or (height == width and randomizer(2)):
+            # Divide the region horizontally and open a door in the wall
+            split = randomizer(height - 1) + 1
+            door_x, door_y = x + randomizer(width), y + split - 1
+            doors.append((
+                (door_x, door_y),
+                towards[door_x & 1, door_y & 1][0]))
+            regions.append((x, y, width, split))
+            regions.append((x, y + split, width, height - split))
+
+        else:
+            # Divide the region vertically and open a door in the wall
+            split = randomizer(width - 1) + 1
+            door_x, door_y = x + split - 1, y + randomizer(height)
+            doors.append((
+                (door_x, door_y),
+                towards[door_x & 1, door_y & 1][1]))
+            regions.append((x, y, split, height))
+            regions.append((x + split, y, width - split, height))
+
+    return remaining
+
+
+def _divide_region(task):
+    """Divides a region completely.
+
+    This function is run in the worker processes.
+
+    :param task: The task, expressed as ``(wall_class, region, seed)``.
+
+    :return: all doors in the region
+    :rtype: [((int, int), int)]
+    """
+    wall_class, region, seed = task
+    doors = []
+    _divide(_towards(wall_class), region, block_randomizer(seed), doors)
+
+    return doors
@@ -0,0 +1,228 @@
+# coding=utf-8
+# pymaze
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+import importlib
+import json
+import random
+import struct
+
+from . import _find_class
+from .randomizer import PRNG_VERSION, block_randomizer
+
+
+#: The magic bytes starting a serialised replay descriptor
+MAGIC = b'MZRP'
+
+#: The version of the format written by :meth:`Replay.to_bytes`
+FORMAT_VERSION = 1
+
+#: The generators that can be replayed, mapped to the names of their modules.
+#: Every module must have the function ``initialize(maze, randomizer,
+#: **options)`` and the attribute ``VERSION``
+GENERATORS = {
+    'growing_tree': 'maze.growing_tree',
+    'randomized_prim': 'maze.randomized_prim',
+    'recursive_division': 'maze.recursive_division'}
+
+# The header of a serialised descriptor: magic, format version, PRNG version,
+# generator version, seed, width and height; it is followed by the maze class
+# name, the generator name and the options, all prefixed with their lengths
+_HEADER = struct.Struct('>4sBBHQII')
+
+
+def register(name, module_name):
+    """Registers a generator that can be replayed.
+
+    :param str name: The name of the generator as stored in descriptors.
+
+    :param str module_name: The name of the module containing the generator.
+    """
+    GENERATORS[name] = module_name
+
+
+def generator(name):
+    """Returns the module of a registered generator.
+
+    :param str name: The name of the generator.
+
+    :return: the module
+
+    :raises ValueError: if the generator is not registered
+    """
+    try:
+        return importlib.import_module(GENERATORS[name])
+    except KeyError:
+        raise ValueError('Unknown generator: %s' % name)
+
+
+class Replay(object):
+    """A descriptor from which a maze can be regenerated.
+
+    Instead of the doors of a maze, a descriptor stores the class and size of
+    the maze, the generator used and the seed of the
+    :func:`maze.randomizer.block_randomizer` passed to it. Since the sequence of
+    random numbers is stable for a given :attr:`maze.randomizer.PRNG_VERSION`
+    and the maze generated from a sequence is stable for a given generator
+    version, :meth:`generate` creates an identical maze as long as both
+    versions are unchanged.
+
+    :param maze_class: The maze class.
+
+    :param int width: The width of the maze.
+
+    :param int height: The height of the maze.
+
+    :param str generator_name: The name of the generator, as registered in
+        :attr:`GENERATORS`.
+
+    :param int seed: The seed. This must be a non-negative 64 bit integer. If
+        it is ``None``, a random seed is used.
+
+    :param dict options: Additional keyword arguments passed to the generator.
+        They must be serialisable as *JSON*.
+
+    :param int generator_version: The version of the generator. If this is
+        ``None``, the current version is used.
+
+    :param int prng_version: The version of the random number generator. If
+        this is ``None``, the current version is used.
+
+    :raises ValueError: if the generator is not registered, if the seed is
+        not a non-negative 64 bit integer, if the size does not fit in 32 bits,
+        if the options cannot be serialised as *JSON*, or if the class name,
+        the generator name or the serialised options are longer than 255 bytes
+    """
+    def __init__(self, maze_class, width, height, generator_name, seed = None,
+            options = None, generator_version = None, prng_version = None):
+        self.maze_class = maze_class
+        self.width = width
+        self.height = height
+        self.generator = generator_name
+        self.seed = seed if not seed is None \
+            else random.SystemRandom().getrandbits(64)
+        self.options = dict(options or {})
+        self.generator_version = generator_version if \
+            not generator_version is None \
+            else generator(generator_name).VERSION
+        self.prng_version = prng_version if not prng_version is None \
+            else PRNG_VERSION
+
+        # Make sure that the descriptor can be serialised
+        if not 0 <= self.seed <= 0xFFFFFFFFFFFFFFFF:
+            raise ValueError('Unsupported seed: %d' % self.seed)
+        if not 0 <= width <= 0xFFFFFFFF or not 0 <= height <= 0xFFFFFFFF:
+            raise ValueError('Unsupported maze size: %dx%d' % (width, height))
+        try:
+            fields = self._fields()
+        except TypeError:
+            raise ValueError('The options are not serialisable: %r' % (
+                self.options,))
+        for value in fields:
+            if len(value) > 0xFF:
+                raise ValueError('Too long to be serialised: %s...' % (
+                    value[:32].decode('utf-8', 'replace')))
+
+    def __eq__(self, other):
+        return isinstance(other, Replay) and self.__dict__ == other.__dict__
+
+    def __ne__(self, other):
+        return not self == other
+
+    def generate(self):
+        """Generates the maze described.
+
+        :return: a new maze
+        :rtype: maze.BaseMaze
+
+        :raises ValueError: if the generator is not registered, or if the
+            version of the generator or the random number generator has changed
+            since the descriptor was created
+        """
+        module = generator(self.generator)
+        if module.VERSION != self.generator_version:
+            raise ValueError('%s version %d cannot replay version %d' % (
+                self.generator, module.VERSION, self.generator_version))
+        if PRNG_VERSION != self.prng_version:
+            raise ValueError('PRNG version %d cannot replay version %d' % (
+                PRNG_VERSION, self.prng_version))
+
+        maze = self.maze_class(self.width, self.height)
+        module.initialize(maze, block_randomizer(self.seed), **self.options)
+        return maze
+
+    def to_bytes(self):
+        """Serialises this descriptor.
+
+        :return: the serialised descriptor
+        :rtype: bytes
+        """
+        result = bytearray(_HEADER.pack(MAGIC, FORMAT_VERSION,
+            self.prng_version, self.generator_version, self.seed,
+            self.width, self.height))
+        for data in self._fields():
+            result.append(len(data))
+            result.extend(data)
+
+        return bytes(result)
+
+    def _fields(self):
+        """Returns the encoded maze class name, generator name and options, as
+        stored following the header by :meth:`to_bytes`"""
+        return [value.encode('utf-8') for value in (
+            '%s.%s' % (self.maze_class.__module__, self.maze_class.__name__),
+            self.generator,
+            json.dumps(self.options, sort_keys = True,
+                separators = (',', ':')) if self.options else '')]
+
+    @classmethod
+    def from_bytes(self, data):
+        """Deserialises a descriptor serialised with :meth:`to_bytes`.
+
+        :param bytes data: The serialised descriptor.
+
+        :return: a descriptor
+        :rtype: Replay
+
+        :raises ValueError: if the data is invalid or uses an unsupported
+            version
+        """
+        data = bytearray(data)
+        try:
+            magic, version, prng_version, generator_version, seed, width, \
+                height = _HEADER.unpack_from(bytes(data))
+        except struct.error:
+            raise ValueError('Truncated replay data')
+        if magic != MAGIC:
+            raise ValueError('Invalid replay data')
+        if version != FORMAT_VERSION:
+            raise ValueError('Unsupported replay data version: %d' % version)
+
+        values = []
+        offset = _HEADER.size
+        for i in range(3):
+            if offset >= len(data):
+                raise ValueError('Truncated replay data')
+            length = data[offset]
+            value = data[offset + 1:offset + 1 + length]
+            if len(value) != length:
+                raise ValueError('Truncated replay data')
+            values.append(bytes(value).decode('utf-8'))
+            offset += 1 + length
+        class_name, generator_name, options = values
+
+        return self(_find_class(class_name), width, height, generator_name,
+            seed, json.loads(options) if options else None,
+            generator_version, prng_version)
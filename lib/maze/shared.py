@@ -0,0 +1,191 @@
+# coding=utf-8
+# pymaze
+# Copyright (C) 2012-2014 Moses Palmér
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import struct
+import sys
+
+from . import BaseMaze, _find_class
+
+
+#: The magic bytes starting a shared memory block containing a maze
+MAGIC = b'MZSH'
+
+#: The version of the layout of the shared memory block
+FORMAT_VERSION = 1
+
+# The header of a shared memory block: magic, version, width, height and the
+# length of the class name following the header; the class name is followed by
+# the door mask
+_HEADER = struct.Struct('>4sBIIH')
+
+# Before Python 3.13, attaching to a block registers it with the resource
+# tracker on POSIX, which removes it when the process exits
+_TRACKS_ATTACHED = os.name == 'posix' and sys.version_info < (3, 13)
+
+
+class SharedMaze(object):
+    """A maze stored in a block of shared memory.
+
+    The doors are stored as in :meth:`maze.BaseMaze.door_mask`, preceded by a
+    header describing the maze, so other processes may attach to the block by
+    name alone and use the maze without copying it.
+
+    Instances are created with :meth:`create` and :meth:`attach`; when pickled,
+    for example when passed to a worker process, the receiving process attaches
+    to the same block. This class may be used as a context manager.
+
+    This requires :mod:`multiprocessing.shared_memory`.
+    """
+    def __init__(self, shm, readonly):
+        self._shm = shm
+        self._readonly = readonly
+
+        try:
+            magic, version, width, height, name_length = \
+                _HEADER.unpack_from(shm.buf)
+        except struct.error:
+            raise ValueError('Truncated shared maze')
+        if magic != MAGIC:
+            raise ValueError('Invalid shared maze')
+        if version != FORMAT_VERSION:
+            raise ValueError('Unsupported shared maze version: %d' % version)
+        name = bytes(shm.buf[_HEADER.size:_HEADER.size + name_length]).decode(
+            'ascii')
+        maze_class = _find_class(name)
+        if not isinstance(maze_class, type) \
+                or not issubclass(maze_class, BaseMaze):
+            raise ValueError('%s is not a maze class' % name)
+
+        offset = _HEADER.size + name_length
+        self._view = shm.buf[offset:offset + width * height]
+        if readonly:
+            self._view = self._view.toreadonly()
+
+        #: The maze backed by the shared memory
+        self.maze = maze_class.from_mask(width, height, self._view)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __reduce__(self):
+        return (self.__class__.attach, (self.name, self._readonly))
+
+    @property
+    def name(self):
+        """The name of the shared memory block"""
+        return self._shm.name
+
+    @classmethod
+    def create(self, maze, name = None):
+        """Copies a maze to a new block of shared memory.
+
+        The block remains until :meth:`unlink` is called, even if all
+        processes have closed it.
+
+        :param maze.BaseMaze maze: The maze to copy.
+
+        :param str name: The name of the block. If this is ``None``, a unique
+            name is generated.
+
+        :return: a writable shared maze
+        :rtype: SharedMaze
+        """
+        from multiprocessing import shared_memory
+
+        name_data = ('%s.%s' % (
+            maze.__class__.__module__, maze.__class__.__name__)).encode('ascii')
+        header = _HEADER.pack(MAGIC, FORMAT_VERSION, maze.width, maze.height,
+            len(name_data)) + name_data
+        mask = maze.door_mask()
+
+        shm = shared_memory.SharedMemory(name = name, create = True,
+            size = len(header) + len(mask))
+        try:
+            shm.buf[:len(header)] = header
+            shm.buf[len(header):len(header) + len(mask)] = bytes(mask)
+            return self(shm, False)
+        except Exception:
+            shm.close()
+            shm.unlink()
+            raise
+
+    @classmethod
+    def attach(self, name, readonly = True):
+        """Attaches to a maze in an existing block of shared memory.
+
+        :param str name: The name of the block, as returned by :attr:`name`.
+
+        :param bool readonly: Whether the maze should be read-only. Changes made
+            through a writable maze are immediately visible in all processes.
+
+        :return: a shared maze
+        :rtype: SharedMaze
+
+        :raises ValueError: if the block does not contain a maze
+        """
+        from multiprocessing import shared_memory
+
+        # Do not let the resource tracker remove the block when this process
+        # exits
+        if _TRACKS_ATTACHED:
+            from multiprocessing import resource_tracker
+            shm = shared_memory.SharedMemory(name = name)
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        else:
+            shm = shared_memory.SharedMemory(name = name, track = False)
+        try:
+            return self(shm, readonly)
+        except Exception:
+            shm.close()
+            raise
+
+    def close(self):
+        """Detaches from the shared memory block.
+
+        The maze, and any rooms and door masks retrieved from it, may not be
+        used after this method has been called.
+
+        Calling this method more than once has no effect.
+
+        :raises BufferError: if buffers created from the door mask, such as
+            slices of it, are still referenced; the block remains attached
+            until this method is called again after they have been released
+        """
+        if not self._view is None:
+            self.maze = None
+            self._view.release()
+            self._view = None
+        try:
+            self._shm.close()
+        except BufferError:
+            raise BufferError('Views of the shared maze are still referenced')
+
+    def unlink(self):
+        """Removes the shared memory block.
+
+        Processes already attached to the block may continue to use it.
+        """
+        if _TRACKS_ATTACHED:
+            # Unlinking unregisters the block from the resource tracker, which
+            # may be shared with a process that has already unregistered it
+            # when attaching
+            from multiprocessing import resource_tracker
+            resource_tracker.register(self._shm._name, 'shared_memory')
+        self._shm.unlink()
@@ -14,6 +14,7 @@
 # You should have received a copy of the GNU General Public License along with
 # this program. If not, see <http://www.gnu.org/licenses/>.
 
+import array
 import math
 
 from . import BaseWall, BaseMaze
@@ -70,6 +71,19 @@ class TriWall(BaseMaze.Wall):
         NAMES.append(name.lower())
         WALLS.append(i)
 
+    # The offsets from the centre of a room to the start corner of every wall,
+    # indexed by parity and wall index
+    CORNERS = [
+        [(math.cos(a[0]), math.sin(a[0])) for a in _ANGLES],
+        [(math.cos(a[1]), math.sin(a[1])) for a in _ANGLES]]
+
+    @classmethod
+    def parity(self, room_pos):
+        """
+        @see Maze.Wall.parity
+        """
+        return (room_pos[0] + room_pos[1]) & 1
+
     @classmethod
     def from_direction(self, room_pos, direction):
         """
@@ -151,3 +165,39 @@ class TriMaze(BaseMaze):
             (room_pos[0] + 0.5) * self.Wall.HORIZONTAL_MULTIPLICATOR,
             (room_pos[1] + 0.5) * self.Wall.VERTICAL_MULTIPLICATOR \
                 + sign * self.Wall.OFFSET)
+
+    def centers(self):
+        hm = self.Wall.HORIZONTAL_MULTIPLICATOR
+        vm = self.Wall.VERTICAL_MULTIPLICATOR
+        xs = array.array('d', [(x + 0.5) * hm for x in range(self.width)]) \
+            * self.height
+        ys = array.array('d')
+        for y in range(self.height):
+            center = (y + 0.5) * vm
+            ys.extend(array.array('d', [
+                center + (self.Wall.OFFSET if (x + y) & 1
+                    else -self.Wall.OFFSET)
+                for x in range(self.width)]))
+        return (xs, ys)
+
+    def physical_bounds(self):
+        # The left and right corners of every room extend one horizontal unit
+        # from the centre, and the rows fit together without gaps
+        return (
+            -0.5 * self.Wall.HORIZONTAL_MULTIPLICATOR,
+            0.0,
+            (self.width + 0.5) * self.Wall.HORIZONTAL_MULTIPLICATOR,
+            self.height * self.Wall.VERTICAL_MULTIPLICATOR)
+
+    def room_range(self, bounds):
+        hm = self.Wall.HORIZONTAL_MULTIPLICATOR
+        vm = self.Wall.VERTICAL_MULTIPLICATOR
+        offset = self.Wall.OFFSET
+
+        # The centres of rooms are moved up or down depending on whether x + y
+        # is odd, so the range must cover both
+        return self._clip_range(
+            (bounds[0] - 1.0) / hm - 0.5,
+            (bounds[1] - 1.0 - offset) / vm - 0.5,
+            (bounds[2] + 1.0) / hm - 0.5,
+            (bounds[3] + 1.0 + offset) / vm - 0.5)
@@ -44,6 +44,62 @@ def assert_eq(v1, v2):
             '%s is not %s' % (v1, v2)
 
 
+def import_time(module, repeat = 3):
+    """
+    Measures the time taken to import a module in a new interpreter.
+
+    The cumulative time reported by -X importtime is used, and the shortest
+    time of all runs is returned to reduce the noise.
+
+    @param module
+        The name of the module to import.
+    @param repeat
+        The number of interpreters to start.
+    @return the time in microseconds, or None if the interpreter does not
+        support -X importtime
+    """
+    import os
+    import subprocess
+    import sys
+    if sys.version_info < (3, 7):
+        return None
+
+    times = []
+    for i in range(repeat):
+        process = subprocess.Popen(
+            [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+            env = dict(os.environ, PYTHONPATH = os.pathsep.join(sys.path)),
+            stdout = subprocess.PIPE,
+            stderr = subprocess.PIPE)
+        stdout, stderr = process.communicate()
+        assert_eq(process.returncode, 0)
+        times.append([int(line.split('|')[1])
+            for line in stderr.decode('ascii').splitlines()
+            if line.split('|')[-1].strip() == module][0])
+
+    return min(times)
+
+
+class SkipTest(Exception):
+    """
+    Raised by a test that cannot run in the current environment.
+    """
+    pass
+
+
+def skip(reason):
+    """
+    Skips the current test.
+
+    The test is reported as skipped, but it is not counted as failed.
+
+    @param reason
+        The reason for skipping the test.
+    @raise SkipTest always
+    """
+    raise SkipTest(reason)
+
+
 class Suite(object):
     """
     The test suites to run when test.run is called.
@@ -152,6 +208,10 @@ def test(func):
                 return True
             finally:
                 _indent -= 1
+        except SkipTest as e:
+            printf('Test %s was skipped: %s', test_name, e)
+            inner.skipped = True
+            return True
         except AssertionError as e:
             printf('Test %s did not pass: %s', test_name, e.message)
             inner.message = e.message
@@ -173,6 +233,7 @@ def test(func):
     inner.description = test_description
     inner.suite = suite.name
     inner.message = None
+    inner.skipped = False
     return inner
 
 
@@ -261,8 +322,10 @@ def run():
         _indent += 1
         failures = [test for test in suite.tests if not test()]
         _indent -= 1
-        printf('Test suite %s completed with %d failed test(s).',
-            suite.name, len(failures))
+        printf('Test suite %s completed with %d failed test(s) and %d '
+            'skipped test(s).',
+            suite.name, len(failures),
+            len([test for test in suite.tests if test.skipped]))
         total_failures += failures
 
     return total_failures
@@ -0,0 +1,893 @@
+import os
+import sys
+
+# Prefer in-tree library at ../../lib
+libdir = os.path.abspath(os.path.join(
+    os.path.dirname(__file__),
+    os.path.pardir,
+    os.path.pardir,
+    'lib'))
+sys.path = [libdir] + [sys_path for sys_path in sys.path
+    if not os.path.abspath(sys_path) == libdir]
+
+import subprocess
+
+from tests import *
+
+from amaze.server import MAZE_CLASSES
+
+
+def _run_amaze(args, cwd = None, without_cairo = False):
+    """Runs amaze with command line arguments and returns the tuple
+    ``(returncode, stdout, stderr)``; if *without_cairo* is ``True``, cairo
+    cannot be imported"""
+    process = subprocess.Popen(
+        [sys.executable, '-c', '\n'.join((
+            'import sys',
+            'sys.modules["cairo"] = sys.modules["cairocffi"] = None'
+                if without_cairo else '',
+            'sys.argv = ["amaze"] + %r' % (list(args),),
+            'from amaze import main',
+            'main()'))],
+        cwd = cwd,
+        env = dict(os.environ, PYTHONPATH = os.pathsep.join(
+            os.path.abspath(path) for path in sys.path)),
+        stdout = subprocess.PIPE,
+        stderr = subprocess.PIPE)
+    stdout, stderr = process.communicate()
+    return process.returncode, stdout, stderr
+
+
+@test
+def amaze_help():
+    """Tests that amaze --help is fast and does not import the renderers"""
+    # The maximum time that importing amaze may take, relative to importing
+    # logging from the standard library in a new interpreter; this leaves
+    # generous headroom, but catches heavy imports at module level
+    budget = 2.0
+
+    process = subprocess.Popen(
+        [sys.executable, '-c', '\n'.join((
+            'import sys',
+            'sys.argv = ["amaze", "--help"]',
+            'from amaze import main',
+            'try:',
+            '    main()',
+            'except SystemExit:',
+            '    pass',
+            'print(" ".join(sys.modules))'))],
+        env = dict(os.environ, PYTHONPATH = os.pathsep.join(sys.path)),
+        stdout = subprocess.PIPE,
+        stderr = subprocess.PIPE)
+    stdout, stderr = process.communicate()
+    assert_eq(process.returncode, 0)
+
+    lines = stdout.decode('utf-8').splitlines()
+    assert lines[0].startswith('usage: amaze'), \
+        'The usage was not printed'
+
+    modules = lines[-1].split()
+    for module in ('amaze.image', 'amaze.svg', 'amaze.tiled', 'cairo',
+            'cairocffi', 'multiprocessing', 'numpy', 'PIL'):
+        assert not module in modules, \
+            'amaze --help imported %s' % module
+
+    reference = import_time('logging')
+    if reference is None:
+        skip('-X importtime requires Python 3.7')
+    cumulative = import_time('amaze')
+    assert cumulative < budget * reference, \
+        'Importing amaze took %d us, and importing logging %d us' % (
+            cumulative, reference)
+
+
+@test
+def amaze_print_only():
+    """Tests that amaze only prints the maze when no image file is given"""
+    process = subprocess.Popen(
+        [sys.executable, '-c', '\n'.join((
+            'import sys',
+            'sys.modules["cairo"] = sys.modules["cairocffi"] = None',
+            'sys.argv = ["amaze", "--maze-size", "3", "2", "--seed", "1"]',
+            'from amaze import main',
+            'main()'))],
+        env = dict(os.environ, PYTHONPATH = os.pathsep.join(sys.path)),
+        stdout = subprocess.PIPE,
+        stderr = subprocess.PIPE)
+    stdout, stderr = process.communicate()
+    assert_eq(process.returncode, 0)
+
+    lines = stdout.decode('utf-8').splitlines()
+    assert_eq(len(lines), 2 * 4)
+    assert_eq(lines[0], '@' * (3 * 5))
+
+
+@test
+def amaze_raster_only():
+    """Tests that amaze creates PNG images of square mazes without cairo"""
+    import shutil
+    import tempfile
+
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'maze.png')
+        returncode, stdout, stderr = _run_amaze([
+            '--maze-size', '3', '2', '--seed', '1',
+            '--image-output', path], without_cairo = True)
+        assert_eq(returncode, 0)
+        with open(path, 'rb') as f:
+            assert_eq(f.read(8), b'\x89PNG\r\n\x1a\n')
+
+        # Other images still require cairo
+        returncode, stdout, stderr = _run_amaze([
+            '--maze-size', '3', '2', '--seed', '1', '--walls', '6',
+            '--image-output', os.path.join(directory, 'hex.png')],
+            without_cairo = True)
+        assert_eq(returncode, 1)
+        assert 'requires cairo' in stdout.decode('utf-8'), \
+            'The missing cairo was not reported'
+        assert not os.path.exists(os.path.join(directory, 'hex.png')), \
+            'An image was created without cairo'
+    finally:
+        shutil.rmtree(directory)
+
+
+@test
+def amaze_make_maze_cache():
+    """Tests that make_maze reads and writes mazes to a cache"""
+    import shutil
+    import tempfile
+    from maze.cache import Cache
+    from amaze import make_maze
+
+    directory = tempfile.mkdtemp()
+    try:
+        cache = Cache(directory)
+        expected, expected_solution = make_maze(MAZE_CLASSES[6], (5, 4), 3)
+        for i in range(2):
+            maze, solution = make_maze(MAZE_CLASSES[6], (5, 4), 3, cache)
+            assert_eq(maze.door_mask(), expected.door_mask())
+            assert_eq(solution, expected_solution)
+            assert_eq(len(os.listdir(directory)), 1)
+
+        # Mazes with seeds that cannot be described are not cached
+        expected, expected_solution = make_maze(MAZE_CLASSES[6], (5, 4), -1)
+        maze, solution = make_maze(MAZE_CLASSES[6], (5, 4), -1, cache)
+        assert_eq(maze.door_mask(), expected.door_mask())
+        assert_eq(len(os.listdir(directory)), 1)
+
+        returncode, stdout, stderr = _run_amaze([
+            '--maze-size', '3', '2',
+            '--seed', '-1',
+            '--cache-dir', directory])
+        assert_eq((returncode, stderr), (0, b''))
+        assert_eq(len(stdout.splitlines()), 2 * 4)
+    finally:
+        shutil.rmtree(directory)
+
+
+@test
+def amaze_make_task_evicted():
+    """Tests that an image evicted from the cache after it was found is
+    rendered again"""
+    import shutil
+    import tempfile
+    from maze.cache import Cache
+    from amaze import _make_task
+
+    class EvictingCache(Cache):
+        def get(self, key, suffix):
+            # Pretend that the file was evicted after it was found
+            return self.path(key, suffix)
+
+    directory = tempfile.mkdtemp()
+    try:
+        cache = EvictingCache(os.path.join(directory, 'cache'))
+        filename = os.path.join(directory, 'maze.png')
+        _make_task((MAZE_CLASSES[4], (5, 4), 1, filename, dict(
+                room_size = (20, 20),
+                background_color = (0.0, 0.0, 0.0, 1.0),
+                wall_color = (1.0, 1.0, 1.0, 1.0),
+                path_color = (0.8, 0.4, 0.2, 1.0),
+                wall_width = 2,
+                path_width = 2,
+                path_smooth = False),
+            cache))
+        with open(filename, 'rb') as f:
+            assert f.read().startswith(b'\x89PNG'), \
+                'The image was not rendered'
+    finally:
+        shutil.rmtree(directory)
+
+
+@test
+def amaze_server_parse_request():
+    """Tests that server.parse_request normalises and validates requests"""
+    from amaze.server import parse_request
+
+    assert_eq(
+        parse_request('/maze.svg?seed=1&width=15&walls=4'),
+        parse_request('/maze.svg?width=15&seed=1&wall_color=FFFFFF'))
+    assert parse_request('/maze.svg?seed=1') \
+            != parse_request('/maze.svg?seed=2'), \
+        'Different seeds were parsed to the same request'
+    assert parse_request('/maze.svg?seed=1') \
+            != parse_request('/maze.svg?seed=1&room_size=20'), \
+        'Different image parameters were parsed to the same request'
+
+    # Image parameters are ignored unless an image is requested
+    for format in ('bin', 'txt'):
+        assert_eq(
+            parse_request('/maze.%s?seed=1&room_size=20&path_smooth=1'
+                '&wall_color=123456' % format),
+            parse_request('/maze.%s?seed=1' % format))
+    parse_request('/maze.bin?seed=1&width=1000&height=1000')
+
+    for path in (
+            '/maze.svg',
+            '/maze.gif?seed=1',
+            '/other.svg?seed=1',
+            '/maze.svg?seed=1&walls=5',
+            '/maze.svg?seed=1&width=0',
+            '/maze.svg?seed=1&width=100000&height=100000',
+            '/maze.svg?seed=1&room_size=100000',
+            '/maze.svg?seed=1&width=1000&height=1000',
+            '/maze.png?seed=1&width=200&height=200&room_size=100',
+            '/maze.svg?seed=1&wall_width=3',
+            '/maze.svg?seed=1&room_size=4&path_width=6',
+            '/maze.svg?seed=1&path_color=red',
+            '/maze.svg?seed=a',
+            '/maze.svg?seed=1&unknown=1'):
+        with assert_exception(ValueError):
+            parse_request(path)
+
+
+@test
+def amaze_server_service():
+    """Tests that server.MazeService renders all formats and caches the
+    responses"""
+    from maze import BaseMaze
+    from amaze import make_maze
+    from amaze.server import MazeService, parse_request
+
+    with MazeService(cache_size = 2, processes = 1) as service:
+        bin = service.get(parse_request('/maze.bin?seed=3&width=5&height=4'))
+        maze, solution = make_maze(MAZE_CLASSES[4], (5, 4), 3)
+        assert_eq(BaseMaze.from_bytes(bin).door_mask(), maze.door_mask())
+
+        txt = service.get(parse_request('/maze.txt?seed=3&width=5&height=4'))
+        assert_eq(len(txt.splitlines()), 4 * 4)
+
+        svg = service.get(parse_request('/maze.svg?seed=3&walls=6'))
+        assert svg.startswith(b'<?xml'), \
+            'An SVG image was not returned'
+
+        png = service.get(parse_request('/maze.png?seed=3'))
+        assert png.startswith(b'\x89PNG'), \
+            'A PNG image was not returned'
+
+        assert service.get(parse_request('/maze.png?seed=3')) is png, \
+            'The cached response was not returned'
+        assert_eq(len(service._cache), 2)
+
+        with assert_exception(ValueError):
+            service.get(parse_request('/maze.txt?seed=3&walls=6'))
+
+
+@test
+def amaze_server():
+    """Tests that the HTTP server responds to requests"""
+    import threading
+    try:
+        from urllib.request import urlopen
+        from urllib.error import HTTPError
+    except ImportError:
+        from urllib2 import HTTPError, urlopen
+    from amaze.server import MazeService, make_server
+
+    with MazeService(processes = 2) as service:
+        server = make_server(service, ('localhost', 0))
+        thread = threading.Thread(target = server.serve_forever)
+        thread.start()
+        try:
+            url = 'http://localhost:%d' % server.server_address[1]
+            response = urlopen(url + '/maze.svg?seed=1&width=4&height=3')
+            assert_eq(response.info()['Content-Type'], 'image/svg+xml')
+            assert response.read().startswith(b'<?xml'), \
+                'An SVG image was not returned'
+
+            with assert_exception(HTTPError):
+                urlopen(url + '/maze.svg')
+
+            # Rendering PNG images of hexagonal mazes requires cairo
+            from amaze.image import cairo
+            try:
+                response = urlopen(url + '/maze.png?seed=1&walls=6')
+                assert not cairo is None, \
+                    'An image was rendered without cairo'
+            except HTTPError as e:
+                assert cairo is None, \
+                    'An image was not rendered with cairo'
+                assert_eq(e.code, 501)
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+    # Unexpected errors are reported as internal errors
+    class FailingService(object):
+        def get(self, request):
+            raise RuntimeError('Failed to render %s' % str(request))
+
+    server = make_server(FailingService(), ('localhost', 0))
+    thread = threading.Thread(target = server.serve_forever)
+    thread.start()
+    try:
+        url = 'http://localhost:%d' % server.server_address[1]
+        try:
+            urlopen(url + '/maze.svg?seed=1')
+            assert False, \
+                'An error was not reported'
+        except HTTPError as e:
+            assert_eq(e.code, 500)
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+def _read_png(data):
+    """Reads a PNG image without filters written by amaze.png.PNGWriter, and
+    returns the tuple ``(header, rows)``"""
+    import struct
+    import zlib
+
+    assert data.startswith(b'\x89PNG\r\n\x1a\n'), \
+        'The PNG signature was not written'
+    offset = 8
+    chunks = []
+    while offset < len(data):
+        length, kind = struct.unpack('>I4s', data[offset:offset + 8])
+        chunk = data[offset + 8:offset + 8 + length]
+        assert_eq(
+            struct.unpack('>I', data[offset + 8 + length:offset + 12 + length]),
+            (zlib.crc32(kind + chunk) & 0xFFFFFFFF,))
+        chunks.append((kind, chunk))
+        offset += 12 + length
+    assert_eq(chunks[0][0], b'IHDR')
+    assert_eq(chunks[-1], (b'IEND', b''))
+
+    header = struct.unpack('>IIBBBBB', chunks[0][1])
+    width, height, depth, color_type = header[:4]
+    row_size = width * {2: 3, 3: 1, 6: 4}[color_type]
+    pixels = zlib.decompress(b''.join(
+        chunk for kind, chunk in chunks if kind == b'IDAT'))
+    assert_eq(len(pixels), height * (row_size + 1))
+
+    rows = []
+    for y in range(height):
+        row = pixels[y * (row_size + 1):(y + 1) * (row_size + 1)]
+        assert_eq(row[:1], b'\0')
+        rows.append(row[1:])
+    return header, rows
+
+
+@test
+def amaze_png_writer():
+    """Tests that png.PNGWriter writes all rows and validates them"""
+    import io
+    from amaze.png import PNGWriter
+
+    rows = [bytes(bytearray(range(y, y + 2 * 4))) for y in range(3)]
+    f = io.BytesIO()
+    writer = PNGWriter(f, 2, 3)
+    writer.write_rows(rows)
+    writer.close()
+    assert_eq(_read_png(f.getvalue()), ((2, 3, 8, 6, 0, 0, 0), rows))
+
+    f = io.BytesIO()
+    writer = PNGWriter(f, 2, 1, alpha = False)
+    with assert_exception(ValueError):
+        writer.write_row(b'\0' * 2 * 4)
+    writer.write_row(b'\0' * 2 * 3)
+    with assert_exception(ValueError):
+        writer.write_row(b'\0' * 2 * 3)
+    writer.close()
+    assert_eq(_read_png(f.getvalue()), ((2, 1, 8, 2, 0, 0, 0), [b'\0' * 6]))
+
+    writer = PNGWriter(io.BytesIO(), 2, 2)
+    writer.write_row(b'\0' * 2 * 4)
+    with assert_exception(ValueError):
+        writer.close()
+
+
+@test
+def amaze_tiled_index_path():
+    """Tests that tiled.index_path and tiled.path_runs find the parts of a
+    solution inside a region"""
+    from amaze.tiled import index_path, path_runs
+
+    solution = [(0, 0), (1, 0), (1, 1), (0, 1), (0, 2)]
+    path_rows = index_path(solution)
+    assert_eq(path_rows, {
+        0: ([0, 1], [0, 1]),
+        1: ([0, 1], [3, 2]),
+        2: ([0], [4])})
+
+    assert_eq(path_runs(path_rows, (0, 0, 2, 3)), [(0, 4)])
+    assert_eq(path_runs(path_rows, (0, 0, 1, 2)), [(0, 0), (3, 3)])
+    assert_eq(path_runs(path_rows, (1, 0, 1, 3)), [(1, 2)])
+    assert_eq(path_runs(path_rows, (0, 2, 2, 1)), [(4, 4)])
+    assert_eq(path_runs(path_rows, (2, 0, 2, 3)), [])
+
+
+@test
+def amaze_tiled_path_parts():
+    """Tests that the parts of a smooth path drawn onto tiles are identical to
+    the corresponding parts of the entire path"""
+    from amaze import make_maze
+    from amaze.image import draw_path_smooth
+    from amaze.tiled import TileRenderer
+
+    class Recorder(object):
+        def __init__(self):
+            self.commands = []
+
+        def move_to(self, *args):
+            self.commands.append(('move_to', args))
+
+        def curve_to(self, *args):
+            self.commands.append(('curve_to', args))
+
+        def line_to(self, *args):
+            self.commands.append(('line_to', args))
+
+        def stroke(self):
+            self.commands.append(('stroke', ()))
+
+    def draw(*args):
+        ctx = Recorder()
+        draw_path_smooth(maze, ctx, coords, solution, *args)
+        return ctx.commands
+
+    maze, solution = make_maze(MAZE_CLASSES[6], (6, 5), 1)
+    renderer = TileRenderer(maze, solution, (20, 20), (0, 0, 0, 1),
+        (1, 1, 1, 1), (1, 0, 0, 1), 2, 2, True)
+    coords = renderer._coords
+
+    assert_eq(renderer.path_parts((0, 0, maze.width, maze.height)),
+        [(0, len(solution) - 1)])
+
+    full = draw(0)
+    for region in (
+            (0, 0, 2, 2),
+            (2, 1, 2, 2),
+            (3, 3, 3, 2),
+            (4, 0, 1, 5)):
+        for first, last in renderer.path_parts(region):
+            part = draw(first, last)
+
+            # The part starts where the previous segment ends
+            assert_eq(part[0][1], full[max(1, first) - 1][1][-2:])
+            assert_eq(part[1:-1], full[max(1, first):last + 1])
+
+
+@test
+def amaze_tiled_make_image():
+    """Tests that tiled.make_tiled_png draws the same image as
+    image.make_image"""
+    import io
+    from amaze import make_maze
+    from amaze.image import cairo, make_image
+    from amaze.png import from_argb32
+    from amaze.tiled import make_tiled_png
+    if cairo is None:
+        skip('cairo is not installed')
+
+    for walls, path_smooth in ((4, False), (6, True)):
+        maze, solution = make_maze(MAZE_CLASSES[walls], (7, 5), 2)
+        options = dict(
+            room_size = (21, 21),
+            background_color = (0.0, 0.0, 0.0, 1.0),
+            wall_color = (1.0, 1.0, 1.0, 1.0),
+            path_color = (0.8, 0.4, 0.2, 1.0),
+            wall_width = 2,
+            path_width = 4,
+            path_smooth = path_smooth)
+
+        f = io.BytesIO()
+        make_tiled_png(maze, solution, f, tile_size = 32, processes = 1,
+            **options)
+        header, tiled = _read_png(f.getvalue())
+
+        surfaces = []
+        make_image(maze, solution, output = (
+                lambda w, h: cairo.ImageSurface(cairo.FORMAT_ARGB32, w, h),
+                surfaces.append),
+            **options)
+        surface = surfaces[0]
+        surface.flush()
+        expected = from_argb32(surface.get_data(), surface.get_width(),
+            surface.get_height(), surface.get_stride())
+        assert_eq(header[:2], (surface.get_width(), surface.get_height()))
+
+        # Only antialiased pixels along tile borders may differ
+        total = sum(len(row) for row in expected)
+        different = sum(
+            1
+            for row, expected_row in zip(tiled, expected)
+            for a, b in zip(bytearray(row), bytearray(expected_row))
+            if abs(a - b) > 8)
+        assert different < total // 100, \
+            '%d of %d values differ' % (different, total)
+
+
+@test
+def amaze_tiled_region_raster():
+    """Tests that tiled.TileRenderer.region includes the rooms of every pixel
+    painted by raster.make_raster_png in a tile"""
+    import io
+    from amaze import make_maze
+    from amaze.image import make_coords
+    from amaze.raster import make_raster_png
+    from amaze.tiled import TileRenderer
+
+    maze, solution = make_maze(MAZE_CLASSES[4], (7, 5), 2)
+    options = dict(
+        room_size = (21, 21),
+        background_color = (0.0, 0.0, 0.0, 1.0),
+        wall_color = (1.0, 1.0, 1.0, 1.0),
+        path_color = (0.8, 0.4, 0.2, 1.0),
+        wall_width = 2,
+        path_width = 4,
+        path_smooth = False)
+    renderer = TileRenderer(maze, solution, **options)
+
+    f = io.BytesIO()
+    make_raster_png(maze, solution, f, **options)
+    header, rows = _read_png(f.getvalue())
+    assert_eq(header[:2], renderer.size)
+    rows = [bytearray(row) for row in rows]
+
+    # The pixels that may be painted for every room
+    coords = make_coords(maze, options['room_size'], options['wall_width'],
+        renderer.size[1])
+    half = 0.5 * maze.Wall.MULTIPLICATOR
+    margin = max(options['wall_width'], options['path_width']) // 2 + 1
+    boxes = {}
+    for x in range(maze.width):
+        for y in range(maze.height):
+            cx, cy = maze.get_center((x, y))
+            left, bottom = coords(cx - half, cy - half)
+            right, top = coords(cx + half, cy + half)
+            boxes[(x, y)] = (left - margin, top - margin,
+                right + margin, bottom + margin)
+
+    tile_size = 16
+    for tile_top in range(0, renderer.size[1], tile_size):
+        for tile_left in range(0, renderer.size[0], tile_size):
+            tile = (tile_left, tile_top,
+                min(tile_size, renderer.size[0] - tile_left),
+                min(tile_size, renderer.size[1] - tile_top))
+            rx, ry, rw, rh = renderer.region(tile)
+            visible = [boxes[(x, y)]
+                for x in range(rx, rx + rw)
+                for y in range(ry, ry + rh)]
+
+            for py in range(tile_top, tile_top + tile[3]):
+                for px in range(tile_left, tile_left + tile[2]):
+                    if not rows[py][px]:
+                        continue
+                    assert any(
+                            left <= px <= right and top <= py <= bottom
+                            for left, top, right, bottom in visible), \
+                        'The pixel %s in the tile %s is outside of %s' % (
+                            (px, py), tile, (rx, ry, rw, rh))
+
+
+@test
+def amaze_pyramid_tile_count():
+    """Tests that pyramid.TilePyramid finds the zoom levels and the number of
+    tiles, and rejects tiles outside of the image"""
+    from amaze import make_maze
+    from amaze.image import image_size
+    from amaze.pyramid import TilePyramid
+
+    maze, solution = make_maze(MAZE_CLASSES[4], (20, 7), 1)
+    width, height = image_size(maze, (20, 20), 2)
+    pyramid = TilePyramid(maze, solution, (20, 20), (0, 0, 0, 1),
+        (1, 1, 1, 1), (1, 0, 0, 1), 2, 2, False, tile_size = 64)
+
+    assert 64 << (pyramid.max_zoom - 1) < width <= 64 << pyramid.max_zoom, \
+        'Invalid maximum zoom level %d for the width %d' % (
+            pyramid.max_zoom, width)
+    assert_eq(pyramid.tile_count(0), (1, 1))
+    assert_eq(pyramid.tile_count(pyramid.max_zoom),
+        ((width + 63) // 64, (height + 63) // 64))
+    assert_eq(len(list(pyramid.tiles())), sum(
+        pyramid.tile_count(zoom)[0] * pyramid.tile_count(zoom)[1]
+        for zoom in range(pyramid.max_zoom + 1)))
+
+    columns, rows = pyramid.tile_count(pyramid.max_zoom)
+    for zoom in (-1, pyramid.max_zoom + 1):
+        with assert_exception(IndexError):
+            pyramid.tile_count(zoom)
+    for x, y in ((-1, 0), (0, -1), (columns, 0), (0, rows)):
+        with assert_exception(IndexError):
+            pyramid.tile(pyramid.max_zoom, x, y)
+
+
+@test
+def amaze_pyramid_cache():
+    """Tests that pyramid.TilePyramid caches the most recently used tiles"""
+    from amaze import make_maze
+    from amaze.image import cairo
+    from amaze.pyramid import TilePyramid
+
+    maze, solution = make_maze(MAZE_CLASSES[4], (20, 7), 1)
+    pyramid = TilePyramid(maze, solution, (20, 20), (0, 0, 0, 1),
+        (1, 1, 1, 1), (1, 0, 0, 1), 2, 2, False, tile_size = 64,
+        cache_size = 2)
+
+    # Cached tiles are returned without rendering them
+    pyramid._cache[(0, 0, 0)] = b'first'
+    pyramid._cache[(1, 0, 0)] = b'second'
+    assert_eq(pyramid.tile(0, 0, 0), b'first')
+    assert_eq(list(pyramid._cache), [(1, 0, 0), (0, 0, 0)])
+    if cairo is None:
+        skip('cairo is not installed; tiles were not rendered')
+
+    # The least recently used tile is evicted
+    tile = pyramid.tile(1, 1, 0)
+    assert tile.startswith(b'\x89PNG'), \
+        'A PNG image was not returned'
+    assert_eq(list(pyramid._cache), [(0, 0, 0), (1, 1, 0)])
+    assert pyramid.tile(1, 1, 0) is tile, \
+        'The cached tile was not returned'
+
+
+@test
+def amaze_raster_line_width():
+    """Tests that raster.make_raster_png paints lines of the requested width
+    centred on the line"""
+    import io
+    from maze.quad import QuadWall
+    from amaze import make_maze
+    from amaze.image import make_coords
+    from amaze.raster import make_raster_png
+
+    try:
+        import numpy
+        use_numpys = (False, True)
+    except ImportError:
+        use_numpys = (False,)
+
+    maze, solution = make_maze(MAZE_CLASSES[4], (3, 1), 1)
+    assert_eq(solution, [(0, 0), (1, 0), (2, 0)])
+    m = QuadWall.MULTIPLICATOR
+
+    for use_numpy in use_numpys:
+        for line_width in (1, 2, 3):
+            f = io.BytesIO()
+            make_raster_png(maze, solution, f, (20, 20), (0, 0, 0, 1),
+                (1, 1, 1, 1), (1, 0, 0, 1), line_width, line_width,
+                use_numpy = use_numpy)
+            header, rows = _read_png(f.getvalue())
+            height = header[1]
+            coords = make_coords(maze, (20, 20), line_width, height)
+
+            # Check the column through the centre of the middle room, which
+            # crosses the top wall, the path and the bottom wall
+            x, y = (int(c) for c in coords(*maze.get_center((1, 0))))
+            expected = [0] * height
+            for value, center in (
+                    (1, int(coords(1.5 * m, 0)[1])),
+                    (1, int(coords(1.5 * m, m)[1])),
+                    (2, y)):
+                for i in range(center - line_width // 2,
+                        center - line_width // 2 + line_width):
+                    if 0 <= i < height:
+                        expected[i] = value
+            assert_eq([bytearray(row)[x] for row in rows], expected)
+
+
+@test
+def amaze_svg():
+    """Tests that svg.make_svg writes a valid SVG image of the walls and the
+    path"""
+    import io
+    import re
+    import xml.etree.ElementTree as ET
+    from maze.geometry import wall_lines
+    from amaze import make_maze
+    from amaze.image import image_size, make_coords
+    from amaze.svg import make_svg
+
+    ns = '{http://www.w3.org/2000/svg}'
+    for walls, path_smooth in ((4, False), (6, False), (3, True)):
+        maze, solution = make_maze(MAZE_CLASSES[walls], (6, 5), 4)
+        f = io.BytesIO()
+        make_svg(maze, solution, f, (20, 20), (0, 0, 0, 1), (1, 1, 1, 1),
+            (1, 0, 0, 0.5), 2, 4, path_smooth)
+        root = ET.fromstring(f.getvalue())
+
+        width, height = image_size(maze, (20, 20), 2)
+        assert_eq(root.tag, ns + 'svg')
+        assert_eq((root.get('width'), root.get('height'), root.get('viewBox')),
+            (str(width), str(height), '0 0 %d %d' % (width, height)))
+
+        paths = root.findall('.//%spath' % ns)
+        assert_eq(len(paths), 2)
+        wall_path, path_path = paths
+        assert_eq(path_path.get('stroke'), 'rgb(255,0,0)')
+        assert_eq(path_path.get('stroke-opacity'), '0.5')
+        assert_eq(path_path.get('stroke-width'), '4')
+
+        # Every wall line is a sub-path
+        assert_eq(wall_path.get('d').count('m'), len(list(wall_lines(maze))))
+
+        # The path passes through the centre of every room of the solution
+        coords = make_coords(maze, (20, 20), 2, height)
+        d = path_path.get('d')
+        if path_smooth:
+            assert_eq(d.count('c'), len(solution) - 2)
+        else:
+            x, y = 0.0, 0.0
+            points = []
+            for dx, dy in re.findall(r'(-?[\d.]+),(-?[\d.]+)', d):
+                x, y = x + float(dx), y + float(dy)
+                points.append((x, y))
+            assert_eq(len(points), len(solution))
+            for point, room_pos in zip(points, solution):
+                expected = coords(*maze.get_center(room_pos))
+                assert abs(point[0] - expected[0]) < 0.1 \
+                        and abs(point[1] - expected[1]) < 0.1, \
+                    '%s is not the centre of %s' % (point, room_pos)
+
+
+@test
+def amaze_print_maze():
+    """Tests that terminal.print_maze prints the walls, the path and the floor
+    using the characters and room size requested"""
+    import io
+    from amaze import make_maze
+    from amaze.terminal import print_maze
+
+    maze, solution = make_maze(MAZE_CLASSES[4], (3, 2), 1)
+    assert_eq(solution, [(0, 0), (1, 0), (2, 0), (2, 1)])
+
+    def printed(solution, **kwargs):
+        f = io.StringIO()
+        assert print_maze(maze, solution, f = f, **kwargs), \
+            'The maze was not printed'
+        return f.getvalue().splitlines()
+
+    assert_eq(printed(solution), [
+        '@@@@@@@@@@@@@@@',
+        '@        @@...@',
+        '@        @@...@',
+        '@   @@@@@@@...@',
+        '@   @@@@@@@...@',
+        '@.............@',
+        '@.............@',
+        '@@@@@@@@@@@@@@@'])
+
+    assert_eq(printed(solution, wall_char = '#', path_char = '*',
+            floor_char = '-', room_size = (4, 3)), [
+        '############',
+        '#------##**#',
+        '#--######**#',
+        '#--######**#',
+        '#**********#',
+        '############'])
+
+    assert_eq(printed([], room_size = (3, 3)), [
+        '@@@@@@@@@',
+        '@    @@ @',
+        '@ @@@@@ @',
+        '@ @@@@@ @',
+        '@       @',
+        '@@@@@@@@@'])
+
+
+@test
+def amaze_print_maze_viewport():
+    """Tests that terminal.print_maze prints only the rooms in a viewport
+    clipped to the maze"""
+    import io
+    from amaze import make_maze
+    from amaze.terminal import _clip, _row_renderer, print_maze
+
+    maze, solution = make_maze(MAZE_CLASSES[4], (3, 2), 1)
+
+    assert_eq(_clip(maze, None), (0, 0, 3, 2))
+    assert_eq(_clip(maze, (1, 0, 2, 1)), (1, 0, 2, 1))
+    assert_eq(_clip(maze, (-2, -1, 4, 2)), (0, 0, 2, 1))
+    assert_eq(_clip(maze, (2, 1, 5, 5)), (2, 1, 1, 1))
+    assert_eq(_clip(maze, (3, 0, 1, 1)), (3, 0, 0, 1))
+    assert_eq(_clip(maze, (5, 7, 2, 2)), (3, 2, 0, 0))
+    assert_eq(_clip(maze, (-5, -5, 2, 2)), (0, 0, 0, 0))
+
+    def printed(viewport):
+        f = io.StringIO()
+        print_maze(maze, solution, viewport = viewport, f = f)
+        return f.getvalue().splitlines()
+
+    # The rows are printed from the top, and every room is five characters
+    # wide and four lines high
+    full = printed(None)
+    for viewport in (
+            (1, 0, 2, 1),
+            (0, 1, 3, 1),
+            (2, 0, 1, 2),
+            (-1, -1, 2, 2),
+            (2, 1, 4, 4)):
+        left, bottom, width, height = _clip(maze, viewport)
+        assert_eq(printed(viewport), [
+            line[5 * left:5 * (left + width)]
+            for line in full[
+                4 * (maze.height - bottom - height):
+                4 * (maze.height - bottom)]])
+
+        render = _row_renderer(maze, solution, '@', '.', ' ', (5, 4),
+            left, width)
+        for y in range(bottom, bottom + height):
+            assert_eq(render(y), [
+                line[5 * left:5 * (left + width)]
+                for line in full[
+                    4 * (maze.height - y - 1):4 * (maze.height - y)]])
+
+    # Nothing is printed for viewports outside of the maze
+    for viewport in ((3, 0, 1, 1), (0, 2, 3, 1), (5, 7, 2, 2)):
+        assert_eq(printed(viewport), [])
+
+
+@test
+def amaze_count_output_names():
+    """Tests that amaze requires {index} in the image file name when
+    generating more than one maze"""
+    for args in (
+            ['--count', '2'],
+            ['--count', '2', '--image-output', 'maze.png'],
+            ['--count', '3', '--image-output', 'maze{{index}}.png']):
+        returncode, stdout, stderr = _run_amaze(args + ['--seed', '1'])
+        assert_eq(returncode, 2)
+        assert b'image file name' in stderr, \
+            'The error was not reported for %s' % ' '.join(args)
+
+
+@test
+def amaze_count_jobs():
+    """Tests that amaze --count writes distinct and reproducible images, and
+    that the images do not depend on the number of processes; PNG images of
+    square mazes are rendered without cairo"""
+    import shutil
+    import tempfile
+
+    directory = tempfile.mkdtemp()
+    try:
+        results = []
+        for name, jobs in (('a', 1), ('b', 1), ('c', 3)):
+            os.mkdir(os.path.join(directory, name))
+            returncode, stdout, stderr = _run_amaze([
+                    '--maze-size', '6', '5',
+                    '--count', '3',
+                    '--seed', '7',
+                    '--jobs', str(jobs),
+                    '--image-output', 'maze-{index}.png'],
+                cwd = os.path.join(directory, name),
+                without_cairo = True)
+            assert_eq((returncode, stderr), (0, b''))
+
+            images = []
+            for index in range(3):
+                with open(os.path.join(
+                        directory, name, 'maze-%d.png' % index), 'rb') as f:
+                    images.append(f.read())
+            results.append(images)
+
+        assert_eq(len(set(results[0])), 3)
+        assert_eq(results[1], results[0])
+        assert_eq(results[2], results[0])
+    finally:
+        shutil.rmtree(directory)
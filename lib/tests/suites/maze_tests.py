@@ -19,7 +19,12 @@ from maze.quad import *
 from maze.tri import *
 from maze.hex import *
 
+import maze.braid as braid
+import maze.geometry as geometry
+import maze.growing_tree as growing_tree
 import maze.randomized_prim as randomized_prim
+import maze.randomizer as randomizer
+import maze.recursive_division as recursive_division
 
 
 @test
@@ -584,6 +589,516 @@ def Maze_unpickle(maze):
             'Rooms at %s were different' % str(room_pos)
 
 
+@maze_test
+def Maze_pickle_buffer(maze):
+    """Tests that pickling a maze with protocol 5 uses a single out-of-band
+    buffer"""
+    import pickle
+    if not hasattr(pickle, 'PickleBuffer'):
+        return
+
+    randomized_prim.initialize(maze, randomizer.block_randomizer(1))
+
+    buffers = []
+    pickled = pickle.dumps(maze, protocol = 5,
+        buffer_callback = buffers.append)
+    assert_eq(len(buffers), 1)
+    assert_eq(bytes(buffers[0].raw()), bytes(maze.door_mask()))
+
+    reconstructed = pickle.loads(pickled, buffers = buffers)
+    for room_pos in maze.room_positions:
+        assert maze[room_pos] == reconstructed[room_pos], \
+            'Rooms at %s were different' % str(room_pos)
+
+    # The buffer is shared with the reconstructed maze
+    mask = reconstructed.door_mask()
+    reconstructed[(0, 0)].add_door(0)
+    assert_eq(bytes(buffers[0].raw())[0], mask[0])
+
+
+@maze_test
+def Maze_copy(maze):
+    """Tests that copying a maze creates an independent maze backed by a
+    buffer"""
+    import copy
+    from maze.mask import MaskRows
+    randomized_prim.initialize(maze, randomizer.block_randomizer(1))
+    maze.name = 'original'
+
+    for copied in (copy.copy(maze), copy.deepcopy(maze)):
+        assert isinstance(copied.rooms, MaskRows), \
+            'The copy was not backed by a buffer'
+        assert_eq(copied.name, 'original')
+        assert_eq(copied.door_mask(), maze.door_mask())
+
+        copied[(0, 0)].remove_door(next(iter(copied[(0, 0)].doors)))
+        assert copied.door_mask() != maze.door_mask(), \
+            'The copy shared the doors of the original maze'
+
+
+@maze_test
+def Maze_from_mask(maze):
+    """Tests that a maze backed by a door mask behaves like a normal maze"""
+    import copy
+
+    masked = maze.__class__.from_mask(maze.width, maze.height,
+        bytearray(maze.width * maze.height))
+    randomized_prim.initialize(maze, randomizer.block_randomizer(1))
+    randomized_prim.initialize(masked, randomizer.block_randomizer(1))
+
+    assert_eq(masked.door_mask(), maze.door_mask())
+    for room_pos in maze.room_positions:
+        assert maze[room_pos] == masked[room_pos], \
+            'Rooms at %s were different' % str(room_pos)
+        assert_eq(sorted(maze[room_pos].doors), sorted(masked[room_pos].doors))
+    assert_eq(
+        list(masked.walk_path((0, 0), (maze.width - 1, maze.height - 1))),
+        list(maze.walk_path((0, 0), (maze.width - 1, maze.height - 1))))
+
+    # Copies must not share the mask
+    copied = copy.copy(masked)
+    copied[(0, 0)].add_door(0)
+    copied[(0, 0)].remove_door(1)
+    assert_eq(masked.door_mask(), maze.door_mask())
+
+    with assert_exception(ValueError):
+        maze.__class__.from_mask(maze.width, maze.height, bytearray(10))
+
+
+@maze_test
+def Maze_to_bytes(maze):
+    """Tests that Maze.to_bytes and Maze.from_bytes restore the maze"""
+    randomized_prim.initialize(maze, randomizer.block_randomizer(1))
+
+    # Add doors on the edges as well
+    for wall in list(maze.edge_walls)[::3]:
+        maze.set_door(wall.room_pos, wall, True)
+
+    for compression in COMPRESSIONS:
+        try:
+            data = maze.to_bytes(compression)
+        except ImportError:
+            continue
+        reconstructed = maze.__class__.from_bytes(data)
+        assert_eq(reconstructed.__class__, maze.__class__)
+        assert_eq((reconstructed.width, reconstructed.height),
+            (maze.width, maze.height))
+        for room_pos in maze.room_positions:
+            assert maze[room_pos] == reconstructed[room_pos], \
+                'Rooms at %s were different' % str(room_pos)
+        if compression is None:
+            assert len(data) < len(maze.door_mask()), \
+                'The serialised maze was not smaller than the door mask'
+
+    assert_eq(BaseMaze.from_bytes(maze.to_bytes()).__class__, maze.__class__)
+
+    with assert_exception(ValueError):
+        maze.to_bytes('invalid')
+
+
+@test
+def Maze_from_bytes_invalid():
+    """Tests that Maze.from_bytes raises ValueError for invalid data"""
+    data = Maze(10, 20).to_bytes()
+
+    with assert_exception(ValueError):
+        Maze.from_bytes(b'EZAM' + data[4:])
+    with assert_exception(ValueError):
+        Maze.from_bytes(data[:4] + b'\xff' + data[5:])
+    with assert_exception(ValueError):
+        Maze.from_bytes(data[:10])
+    with assert_exception(ValueError):
+        Maze.from_bytes(data[:-1])
+    with assert_exception(ValueError):
+        Maze.from_bytes(data + b'\0')
+    with assert_exception(ValueError):
+        HexMaze.from_bytes(data)
+
+    # The size is validated before the maze is created
+    import struct
+    with assert_exception(ValueError):
+        Maze.from_bytes(data[:5] + b'\0' + struct.pack('>II', 1 << 30, 1 << 30)
+            + data[14:])
+
+
+@test
+def Maze_container():
+    """Tests that mazes written by container.MazeWriter are read back by index
+    and that mazes may be appended"""
+    import tempfile
+    from maze.container import MazeReader, MazeWriter
+
+    mazes = []
+    for i, maze_class in enumerate((Maze, TriMaze, HexMaze) * 3):
+        maze = maze_class(5 + i, 3 + 2 * i)
+        randomized_prim.initialize(maze, randomizer.block_randomizer(i))
+        mazes.append(maze)
+
+    fd, path = tempfile.mkstemp()
+    os.close(fd)
+    try:
+        with MazeWriter(path, 'zlib') as writer:
+            for i, maze in enumerate(mazes[:4]):
+                assert_eq(writer.append(maze), i)
+        with MazeWriter(path) as writer:
+            writer.extend(mazes[4:])
+            assert_eq(len(writer), len(mazes))
+
+        with MazeReader(path) as reader:
+            assert_eq(len(reader), len(mazes))
+            for i in (5, 0, -1, 3):
+                assert_eq(reader[i].__class__, mazes[i].__class__)
+                assert_eq(reader[i].door_mask(), mazes[i].door_mask())
+            assert_eq([maze.door_mask() for maze in reader],
+                [maze.door_mask() for maze in mazes])
+            with assert_exception(IndexError):
+                reader[len(mazes)]
+
+        with assert_exception(ValueError):
+            MazeReader(path, HexMaze)[0]
+
+        # The mazes already in a file remain readable while mazes are
+        # appended, and when the writer is abandoned without being closed
+        writer = MazeWriter(path)
+        writer.extend(mazes[:2])
+        writer._f.flush()
+        with MazeReader(path) as reader:
+            assert_eq([maze.door_mask() for maze in reader],
+                [maze.door_mask() for maze in mazes])
+        writer._f.close()
+        with MazeReader(path) as reader:
+            assert_eq([maze.door_mask() for maze in reader],
+                [maze.door_mask() for maze in mazes])
+        with MazeWriter(path) as writer:
+            writer.append(mazes[0])
+        with MazeReader(path) as reader:
+            assert_eq([maze.door_mask() for maze in reader],
+                [maze.door_mask() for maze in mazes + mazes[:1]])
+
+        # A new file is not valid until it has been closed
+        os.remove(path)
+        writer = MazeWriter(path)
+        writer.append(mazes[0])
+        with assert_exception(ValueError):
+            MazeReader(path)
+        writer.close()
+        assert_eq(len(MazeReader(path)), 1)
+
+        with open(path, 'wb') as f:
+            f.write(b'invalid data')
+        with assert_exception(ValueError):
+            MazeReader(path)
+        with assert_exception(ValueError):
+            MazeWriter(path)
+    finally:
+        os.remove(path)
+
+
+@maze_test(maze_size = (13, 21))
+def Maze_lazy(maze):
+    """Tests that lazy.load decodes rows on demand and restores the maze"""
+    import tempfile
+    from maze import lazy
+
+    randomized_prim.initialize(maze, randomizer.block_randomizer(1))
+
+    fd, path = tempfile.mkstemp()
+    os.close(fd)
+    try:
+        lazy.write(maze, path, rows = 4)
+        loaded = lazy.load(path, cache_size = 2)
+        assert_eq(loaded.__class__, maze.__class__)
+        assert_eq((loaded.width, loaded.height), (maze.width, maze.height))
+        assert_eq(len(loaded.rooms._cache), 0)
+
+        for room_pos in ((3, 20), (0, 0), (12, 9)):
+            assert_eq(loaded[room_pos], maze[room_pos])
+        assert len(loaded.rooms._cache) <= 2, \
+            'Too many chunks were decoded'
+
+        assert_eq(loaded.door_mask(), maze.door_mask())
+        assert_eq(list(loaded.walk_path((0, 0), (12, 20))),
+            list(maze.walk_path((0, 0), (12, 20))))
+        assert_eq(list(geometry.wall_polylines(loaded, (2, 3, 4, 5))),
+            list(geometry.wall_polylines(maze, (2, 3, 4, 5))))
+
+        with assert_exception(TypeError):
+            loaded[(0, 0)].add_door(0)
+
+        # Closing the rooms unmaps the file
+        with lazy.load(path).rooms as rooms:
+            assert_eq(rooms[0][0], maze.rooms[0][0])
+        with assert_exception(ValueError):
+            rooms[0]
+        loaded.rooms.close()
+        loaded.rooms.close()
+        with assert_exception(ValueError):
+            loaded[(0, 0)]
+        if os.path.exists('/proc/self/maps'):
+            with open('/proc/self/maps') as f:
+                assert not path in f.read(), \
+                    'The file was not unmapped'
+
+        with assert_exception(ValueError):
+            lazy.load(path, HexMaze if not isinstance(maze, HexMaze) else Maze)
+        with open(path, 'r+b') as f:
+            f.write(b'EZAM')
+        with assert_exception(ValueError):
+            lazy.load(path)
+
+        # The file is not left mapped when loading fails, even while the
+        # exception, and thus the frame of load, is referenced
+        if os.path.exists('/proc/self/maps'):
+            errors = []
+            try:
+                lazy.load(path)
+            except ValueError as e:
+                errors.append(e)
+            with open('/proc/self/maps') as f:
+                assert not path in f.read(), \
+                    'The file was left mapped'
+    finally:
+        os.remove(path)
+
+
+@maze_test
+def Maze_shared(maze):
+    """Tests that shared.SharedMaze shares the doors of a maze between
+    attached instances"""
+    try:
+        from multiprocessing import shared_memory
+    except ImportError:
+        return
+    import pickle
+    from maze.shared import SharedMaze
+
+    randomized_prim.initialize(maze, randomizer.block_randomizer(1))
+
+    with SharedMaze.create(maze) as shared:
+        try:
+            assert_eq(shared.maze.__class__, maze.__class__)
+            assert_eq(shared.maze.door_mask(), maze.door_mask())
+
+            with SharedMaze.attach(shared.name) as attached:
+                assert_eq(attached.maze.door_mask(), maze.door_mask())
+                end = (maze.width - 1, maze.height - 1)
+                assert_eq(list(attached.maze.walk_path((0, 0), end)),
+                    list(maze.walk_path((0, 0), end)))
+
+                # Changes are visible in all attached instances
+                shared.maze[(0, 0)].add_door(7)
+                assert 7 in attached.maze[(0, 0)], \
+                    'A change was not visible'
+
+                with assert_exception(TypeError):
+                    attached.maze[(0, 0)].remove_door(7)
+
+            with pickle.loads(pickle.dumps(shared)) as unpickled:
+                assert_eq(unpickled.name, shared.name)
+                assert 7 in unpickled.maze[(0, 0)], \
+                    'The unpickled maze was not shared'
+        finally:
+            shared.unlink()
+
+
+@test
+def Maze_shared_close():
+    """Tests that a shared.SharedMaze is not detached while views of it are
+    referenced, and that the block remains when an attached process exits"""
+    try:
+        from multiprocessing import shared_memory
+    except ImportError:
+        return
+    import subprocess
+    from maze.shared import SharedMaze
+
+    maze = Maze(5, 4)
+    randomized_prim.initialize(maze, randomizer.block_randomizer(1))
+
+    with SharedMaze.create(maze) as shared:
+        try:
+            attached = SharedMaze.attach(shared.name)
+            view = attached.maze.door_mask()[1:]
+            with assert_exception(BufferError):
+                attached.close()
+            del view
+            attached.close()
+            attached.close()
+
+            process = subprocess.Popen(
+                [sys.executable, '-c', '\n'.join((
+                    'from maze.shared import SharedMaze',
+                    'SharedMaze.attach(%r).close()' % shared.name))],
+                env = dict(os.environ, PYTHONPATH = os.pathsep.join(sys.path)),
+                stdout = subprocess.PIPE,
+                stderr = subprocess.PIPE)
+            stdout, stderr = process.communicate()
+            assert_eq(process.returncode, 0)
+            assert_eq(stderr, b'')
+
+            with SharedMaze.attach(shared.name) as attached:
+                assert_eq(attached.maze.door_mask(), maze.door_mask())
+        finally:
+            shared.unlink()
+
+
+@test
+def Maze_cache():
+    """Tests that cache.Cache stores files and mazes and evicts the least
+    recently used files"""
+    import shutil
+    import tempfile
+    from maze.cache import Cache, MAZE_SUFFIX, make_key
+    from maze.replay import Replay
+
+    replay = Replay(Maze, 10, 20, 'randomized_prim', 1)
+    assert_eq(make_key(replay, size = 1), make_key(replay, size = 1))
+    for other in (
+            make_key(replay),
+            make_key(replay, size = 2),
+            make_key(Replay(Maze, 10, 20, 'randomized_prim', 2), size = 1),
+            make_key(Replay(Maze, 10, 20, 'growing_tree', 1), size = 1)):
+        assert other != make_key(replay, size = 1), \
+            'Different parameters generated the same key'
+
+    directory = tempfile.mkdtemp()
+    try:
+        cache = Cache(os.path.join(directory, 'cache'), max_size = 250)
+        assert_eq(cache.get('a', '.txt'), None)
+        path = cache.put('a', '.txt', b'a' * 100)
+        assert_eq(cache.get('a', '.txt'), path)
+        with open(path, 'rb') as f:
+            assert_eq(f.read(), b'a' * 100)
+
+        # Make sure that a is more recently used than b
+        cache.put('b', '.txt', b'b' * 100)
+        os.utime(cache.path('b', '.txt'), (0, 0))
+        cache.get('a', '.txt')
+        cache.put('c', '.txt', b'c' * 100)
+        assert_eq(cache.get('b', '.txt'), None)
+        assert cache.get('a', '.txt') and cache.get('c', '.txt'), \
+            'A recently used file was evicted'
+
+        # Replacing a file does not count its old size
+        cache = Cache(os.path.join(directory, 'replaced'), max_size = 1000)
+        cache.put('a', '.txt', b'a' * 100)
+        cache.put('b', '.txt', b'b' * 100)
+        cache.put('a', '.txt', b'a' * 50)
+        assert_eq(cache._size, 150)
+
+        # The file being stored is never evicted
+        cache = Cache(os.path.join(directory, 'small'), max_size = 50)
+        cache.put('a', '.txt', b'a' * 10)
+        path = cache.put('b', '.txt', b'b' * 100)
+        assert_eq(cache.get('a', '.txt'), None)
+        assert_eq(cache.get('b', '.txt'), path)
+
+        cache = Cache(os.path.join(directory, 'cache'))
+        maze = cache.maze(replay)
+        assert_eq(maze.door_mask(), replay.generate().door_mask())
+        assert cache.get(make_key(replay), MAZE_SUFFIX), \
+            'The maze was not cached'
+        assert_eq(cache.maze(replay).door_mask(), maze.door_mask())
+    finally:
+        shutil.rmtree(directory)
+
+
+@maze_test
+def Maze_replay(maze):
+    """Tests that a replay descriptor regenerates the maze"""
+    from maze.replay import Replay
+
+    for generator, options in (
+            ('randomized_prim', None),
+            ('growing_tree', {'policy': growing_tree.RANDOM}),
+            ('recursive_division', {'processes': 1})):
+        if generator == 'recursive_division' and isinstance(maze, TriMaze):
+            continue
+        replay = Replay(maze.__class__, maze.width, maze.height, generator,
+            42, options)
+        data = replay.to_bytes()
+        assert len(data) < 64 + len(generator), \
+            'The descriptor was too large'
+
+        restored = Replay.from_bytes(data)
+        assert_eq(restored, replay)
+
+        expected = maze.__class__(maze.width, maze.height)
+        getattr(sys.modules['maze.' + generator], 'initialize')(
+            expected, randomizer.block_randomizer(42), **(options or {}))
+        actual = restored.generate()
+        assert_eq(actual.door_mask(), expected.door_mask())
+
+
+@test
+def Maze_replay_invalid():
+    """Tests that replay descriptors with invalid data or unsupported versions
+    are rejected"""
+    from maze.replay import Replay
+
+    data = Replay(Maze, 10, 20, 'randomized_prim', 1).to_bytes()
+
+    with assert_exception(ValueError):
+        Replay.from_bytes(b'PRZM' + data[4:])
+    with assert_exception(ValueError):
+        Replay.from_bytes(data[:4] + b'\xff' + data[5:])
+    with assert_exception(ValueError):
+        Replay.from_bytes(data[:10])
+    with assert_exception(ValueError):
+        Replay.from_bytes(data[:-1])
+    with assert_exception(ValueError):
+        Replay(Maze, 10, 20, 'invalid', 1)
+
+    # Only values that can be serialised are accepted
+    for seed in (0, (1 << 64) - 1):
+        replay = Replay(Maze, 10, 20, 'randomized_prim', seed)
+        assert_eq(Replay.from_bytes(replay.to_bytes()), replay)
+    for seed in (-1, 1 << 64):
+        with assert_exception(ValueError):
+            Replay(Maze, 10, 20, 'randomized_prim', seed)
+    with assert_exception(ValueError):
+        Replay(Maze, 1 << 32, 20, 'randomized_prim', 1)
+    replay = Replay(Maze, 10, 20, 'growing_tree', 1, {'policy': 'x' * 242})
+    assert_eq(Replay.from_bytes(replay.to_bytes()), replay)
+    with assert_exception(ValueError):
+        Replay(Maze, 10, 20, 'growing_tree', 1, {'policy': 'x' * 243})
+    for options in ({'policy': object()}, {'policy': {1, 2}}):
+        with assert_exception(ValueError):
+            Replay(Maze, 10, 20, 'growing_tree', 1, options)
+    with assert_exception(ValueError):
+        Replay(Maze, 10, 20, 'randomized_prim', 1,
+            generator_version = randomized_prim.VERSION + 1).generate()
+    with assert_exception(ValueError):
+        Replay(Maze, 10, 20, 'randomized_prim', 1,
+            prng_version = randomizer.PRNG_VERSION + 1).generate()
+
+
+@test
+def Maze_replay_stable():
+    """Tests that the random numbers and the mazes generated for a seed do not
+    change without a version change"""
+    import zlib
+    from maze.replay import Replay
+
+    # If any of these assertions fail, increment randomizer.PRNG_VERSION or
+    # the VERSION of the generator and update the expected values
+    rand = randomizer.block_randomizer(12345)
+    assert_eq(randomizer.PRNG_VERSION, 2)
+    assert_eq([rand(1000) for i in range(8)],
+        [416, 732, 10, 820, 825, 802, 298, 855])
+    assert_eq([rand(1 << 40) for i in range(2)],
+        [405072930798, 297137343120])
+
+    for generator, version, expected in (
+            ('randomized_prim', 1, 4135360259),
+            ('growing_tree', 1, 501049690),
+            ('recursive_division', 1, 1960090913)):
+        replay = Replay(Maze, 12, 8, generator, 12345)
+        assert_eq(replay.generator_version, version)
+        assert_eq(zlib.crc32(bytes(replay.generate().door_mask())) & 0xFFFFFFFF,
+            expected)
+
+
 @maze_test(
     Maze = ((5, 6), (5, 7)),
     TriMaze = ((2, 1), (2, 2)),
@@ -876,6 +1391,27 @@ def Maze_set_door(maze):
             'Maze.set_door did not close the door in the second room'
 
 
+@maze_test
+def Maze_set_doors(maze):
+    for room_pos in ((0, 0), (4, 4), (5, 4), (maze.width - 1, 3)):
+        for wall in maze.walls(room_pos):
+            other = maze.__class__(maze.width, maze.height)
+            maze.set_door(room_pos, wall, True)
+            other.set_doors([(room_pos, int(wall))])
+
+            for rp in maze.room_positions:
+                assert_eq(maze[rp], other[rp])
+
+            maze.set_door(room_pos, wall, False)
+            other.set_doors([(room_pos, int(wall))], False)
+
+            for rp in maze.room_positions:
+                assert_eq(maze[rp], other[rp])
+
+    with assert_exception(IndexError):
+        maze.set_doors([((-1, 0), 0)])
+
+
 @maze_test
 def Maze_get_center(maze):
     for room_pos in maze.room_positions:
@@ -912,6 +1448,89 @@ def Maze_get_center(maze):
                         str(other_corner_display))
 
 
+@maze_test
+def Maze_Wall_CORNERS(maze):
+    """Tests that Maze.Wall.CORNERS corresponds to the wall spans"""
+    for room_pos in maze.room_positions:
+        corners = maze.Wall.CORNERS[maze.Wall.parity(room_pos)]
+        for wall in maze.walls(room_pos):
+            start, end = wall.span
+            for expected, actual in (
+                    ((math.cos(start), math.sin(start)), corners[int(wall)]),
+                    ((math.cos(end), math.sin(end)),
+                        corners[(int(wall) + 1) % len(corners)])):
+                assert all(abs(e - a) < 0.001
+                        for e, a in zip(expected, actual)), \
+                    'The corner for %s was %s, not %s' % (
+                        str(wall), str(actual), str(expected))
+
+
+@maze_test
+def Maze_centers(maze):
+    """Tests that Maze.centers yields the same values as Maze.get_center"""
+    xs, ys = maze.centers()
+    assert_eq(len(xs), maze.width * maze.height)
+    assert_eq(len(ys), maze.width * maze.height)
+    for x, y in maze.room_positions:
+        i = y * maze.width + x
+        center = maze.get_center((x, y))
+        assert abs(xs[i] - center[0]) < 0.001 \
+                and abs(ys[i] - center[1]) < 0.001, \
+            'The centre of (%d, %d) was (%f, %f), not %s' % (
+                x, y, xs[i], ys[i], str(center))
+
+
+@maze_test
+def Maze_physical_bounds(maze):
+    """Tests that Maze.physical_bounds covers all corners of all rooms"""
+    for width, height in ((1, 1), (1, 4), (4, 1), (2, 2), (5, 6), (6, 5)):
+        maze = maze.__class__(width, height)
+        xs, ys = [], []
+        for room_pos in maze.room_positions:
+            center = maze.get_center(room_pos)
+            for wall in maze.walls(room_pos):
+                xs.append(center[0] + math.cos(wall.span[0]))
+                ys.append(center[1] + math.sin(wall.span[0]))
+
+        expected = (min(xs), min(ys), max(xs), max(ys))
+        actual = maze.physical_bounds()
+        assert all(abs(e - a) < 0.001 for e, a in zip(expected, actual)), \
+            'The bounds of a %dx%d maze were %s, not %s' % (
+                width, height, str(actual), str(expected))
+
+
+@maze_test
+def Maze_room_range(maze):
+    """Tests that Maze.room_range includes all rooms intersecting a
+    rectangle"""
+    min_x, min_y, max_x, max_y = maze.physical_bounds()
+    assert_eq(
+        maze.room_range((min_x, min_y, max_x, max_y)),
+        (0, 0, maze.width, maze.height))
+    assert_eq(
+        maze.room_range((max_x + 2, max_y + 2, max_x + 5, max_y + 5))[2:],
+        (0, 0))
+
+    for bounds in (
+            (2.0, 3.0, 2.5, 3.5),
+            (0.0, 0.0, 7.0, 4.0),
+            (5.5, 1.0, 11.0, 12.5),
+            (-5.0, -5.0, 1.0, 1.0)):
+        x, y, width, height = maze.room_range(bounds)
+        for room_pos in maze.room_positions:
+            center = maze.get_center(room_pos)
+            corners = [
+                (center[0] + math.cos(wall.span[0]),
+                    center[1] + math.sin(wall.span[0]))
+                for wall in maze.walls(room_pos)]
+            if any(bounds[0] <= cx <= bounds[2] and bounds[1] <= cy <= bounds[3]
+                    for cx, cy in corners):
+                assert x <= room_pos[0] < x + width \
+                        and y <= room_pos[1] < y + height, \
+                    'Room %s intersecting %s is not in %s' % (
+                        str(room_pos), str(bounds), str((x, y, width, height)))
+
+
 @maze_test
 def Maze_adjacent(maze):
     adjacent = set(tuple(p + d for (p, d) in zip(wall.room_pos, wall.direction))
@@ -1079,3 +1698,308 @@ def Maze_with_randomized_prim(maze):
         for y in range(0, maze.height):
             assert len(list(maze[(0, 0):(x, y)])) > 0, \
                 'Could not walk from (%d, %d) to (0, 0)' % (x, y)
+
+
+@maze_test
+def Maze_with_growing_tree(maze):
+    """Tests that growing_tree.initialize creates a valid maze for all
+    policies"""
+    def rand(m):
+        return random.randint(0, m - 1)
+
+    for policy in (
+            growing_tree.NEWEST,
+            growing_tree.OLDEST,
+            growing_tree.RANDOM,
+            growing_tree.mixed(newest = 1, oldest = 1, random = 2)):
+        maze = maze.__class__(maze.width, maze.height)
+        growing_tree.initialize(maze, rand, policy)
+
+        assert_eq(
+            sum(len(maze[room_pos].doors)
+                for room_pos in maze.room_positions),
+            2 * (maze.width * maze.height - 1))
+        for x in range(0, maze.width):
+            for y in range(0, maze.height):
+                assert len(list(maze[(0, 0):(x, y)])) > 0, \
+                    'Could not walk from (%d, %d) to (0, 0)' % (x, y)
+
+
+@test
+def growing_tree_mixed():
+    """Tests that growing_tree.mixed rejects invalid policies"""
+    with assert_exception(ValueError):
+        growing_tree.mixed(newest = 1, fastest = 1)
+    with assert_exception(ValueError):
+        growing_tree.mixed(newest = 0)
+
+
+@maze_test(except_for = TriMaze)
+def Maze_with_recursive_division(maze):
+    """Tests that recursive_division.initialize creates a valid maze"""
+    def rand(m):
+        return random.randint(0, m - 1)
+
+    recursive_division.initialize(maze, rand, threshold = 16, processes = 1)
+
+    assert_eq(
+        sum(len(maze[room_pos].doors) for room_pos in maze.room_positions),
+        2 * (maze.width * maze.height - 1))
+    for x in range(0, maze.width):
+        for y in range(0, maze.height):
+            assert len(list(maze[(0, 0):(x, y)])) > 0, \
+                'Could not walk from (%d, %d) to (0, 0)' % (x, y)
+
+
+@maze_test(except_for = TriMaze)
+def Maze_with_recursive_division(maze):
+    """Tests that recursive_division.initialize generates the same maze
+    regardless of the number of processes"""
+    other = maze.__class__(maze.width, maze.height)
+
+    rng = random.Random(1)
+    recursive_division.initialize(maze, lambda m: rng.randrange(m),
+        threshold = 16, processes = 1)
+    rng = random.Random(1)
+    recursive_division.initialize(other, lambda m: rng.randrange(m),
+        threshold = 16, processes = 2)
+
+    for room_pos in maze.room_positions:
+        assert_eq(maze[room_pos], other[room_pos])
+
+
+@test
+def TriMaze_with_recursive_division():
+    """Tests that recursive_division.initialize raises ValueError for
+    triangular mazes"""
+    with assert_exception(ValueError):
+        recursive_division.initialize(TriMaze(10, 20), lambda m: 0)
+
+
+@maze_test
+def Maze_braid(maze):
+    """Tests that braid.braid removes all dead ends with ratio 1.0"""
+    def rand(m):
+        return random.randint(0, m - 1)
+
+    randomized_prim.initialize(maze, rand)
+    assert len(braid.dead_ends(maze)) > 0, \
+        'The maze did not contain any dead ends'
+
+    braid.braid(maze, rand, 0.0)
+    before = len(braid.dead_ends(maze))
+    assert before > 0, \
+        'Braiding with ratio 0.0 removed dead ends'
+
+    assert braid.braid(maze, rand, 1.0) > 0, \
+        'Braiding did not open any doors'
+    for room_pos in braid.dead_ends(maze):
+        assert_eq(
+            len([wall for wall in maze.walls(room_pos)
+                if not maze.edge(wall)]),
+            1)
+    for x in range(0, maze.width):
+        for y in range(0, maze.height):
+            assert len(list(maze[(0, 0):(x, y)])) > 0, \
+                'Could not walk from (%d, %d) to (0, 0)' % (x, y)
+
+    with assert_exception(ValueError):
+        braid.braid(maze, rand, 1.5)
+
+
+@test
+def Maze_import():
+    """Tests that importing maze is fast and does not import optional
+    dependencies"""
+    import subprocess
+
+    # The maximum time that importing maze may take, relative to importing
+    # logging from the standard library in a new interpreter; this leaves
+    # generous headroom, but catches heavy imports at module level
+    budget = 1.0
+
+    process = subprocess.Popen(
+        [sys.executable, '-c',
+            'import sys, maze; print(" ".join(sys.modules))'],
+        env = dict(os.environ, PYTHONPATH = os.pathsep.join(sys.path)),
+        stdout = subprocess.PIPE,
+        stderr = subprocess.PIPE)
+    stdout, stderr = process.communicate()
+    assert_eq(process.returncode, 0)
+
+    modules = stdout.decode('ascii').split()
+    for module in ('cairo', 'cairocffi', 'multiprocessing', 'numpy', 'PIL',
+            'pickle'):
+        assert not module in modules, \
+            'Importing maze imported %s' % module
+
+    reference = import_time('logging')
+    if reference is None:
+        skip('-X importtime requires Python 3.7')
+    cumulative = import_time('maze')
+    assert cumulative < budget * reference, \
+        'Importing maze took %d us, and importing logging %d us' % (
+            cumulative, reference)
+
+
+@test
+def randomizer_block_randomizer():
+    """Tests that randomizer.block_randomizer returns numbers in range and that
+    the sequence does not depend on the block size"""
+    rand1 = randomizer.block_randomizer(1, block_size = 3)
+    rand2 = randomizer.block_randomizer(1, block_size = 1000)
+
+    for m in (1, 2, 7, 1000, 1 << 31, 1 << 32, 1 << 40, 3 ** 100):
+        for i in range(100):
+            value = rand1(m)
+            assert_eq(value, rand2(m))
+            assert 0 <= value < m, \
+                '%d is not in the range [0, %d)' % (value, m)
+
+    for m in (0, -1):
+        with assert_exception(ValueError):
+            rand1(m)
+
+
+@maze_test
+def Maze_with_block_randomizer(maze):
+    """Tests that the same seed generates the same maze"""
+    other = maze.__class__(maze.width, maze.height)
+
+    randomized_prim.initialize(maze, randomizer.block_randomizer(42))
+    randomized_prim.initialize(other, randomizer.block_randomizer(42))
+
+    for room_pos in maze.room_positions:
+        assert_eq(maze[room_pos], other[room_pos])
+
+
+@maze_test
+def Maze_initialize_steps(maze):
+    """Tests that the generators yield progress and may be cancelled"""
+    for initialize_steps in (
+            randomized_prim.initialize_steps,
+            growing_tree.initialize_steps):
+        maze = maze.__class__(maze.width, maze.height)
+        progress = list(initialize_steps(maze,
+            randomizer.block_randomizer(1), steps = 10))
+        assert len(progress) > 1, \
+            'Progress was not reported'
+        assert_eq(progress[-1], (maze.width * maze.height,) * 2)
+
+        maze = maze.__class__(maze.width, maze.height)
+        generator = initialize_steps(maze, randomizer.block_randomizer(1),
+            steps = 10)
+        next(generator)
+        generator.close()
+        assert any(not maze[room_pos] for room_pos in maze.room_positions), \
+            'Cancelling did not stop the initialisation'
+
+
+@maze_test
+def Maze_initialize_asynchronous(maze):
+    """Tests that maze.asynchronous.initialize initialises a maze"""
+    if sys.version_info < (3, 5):
+        return
+    import asyncio
+    from maze import asynchronous
+
+    progress = []
+    loop = asyncio.new_event_loop()
+    try:
+        result = loop.run_until_complete(asynchronous.initialize(
+            growing_tree.initialize_steps, maze,
+            randomizer.block_randomizer(1), growing_tree.RANDOM,
+            steps = 10,
+            progress = lambda *args: progress.append(args)))
+    finally:
+        loop.close()
+
+    assert result is maze, \
+        'The maze was not returned'
+    assert_eq(progress[-1], (maze.width * maze.height,) * 2)
+
+
+@maze_test
+def Maze_wall_polylines(maze):
+    """Tests that geometry.wall_polylines traces every wall exactly once"""
+    randomized_prim.initialize(maze, randomizer.block_randomizer(1))
+
+    def point(x, y):
+        return (round(x, 3) + 0.0, round(y, 3) + 0.0)
+
+    def segment(p1, p2):
+        return tuple(sorted((point(*p1), point(*p2))))
+
+    for region in (None, (2, 3, 4, 5), (-1, -1, 3, 3)):
+        expected = set()
+        for room_pos in maze.room_positions:
+            if not region is None and not (
+                    region[0] <= room_pos[0] < region[0] + region[2] and
+                    region[1] <= room_pos[1] < region[1] + region[3]):
+                continue
+            center = maze.get_center(room_pos)
+            for wall in maze.walls(room_pos):
+                if not wall in maze[room_pos]:
+                    expected.add(segment(*[(
+                            center[0] + math.cos(angle),
+                            center[1] + math.sin(angle))
+                        for angle in wall.span]))
+
+        actual = []
+        for polyline in geometry.wall_polylines(maze, region):
+            assert len(polyline) > 1, \
+                'A polyline did not contain any segments'
+            actual.extend(segment(p1, p2)
+                for p1, p2 in zip(polyline, polyline[1:]))
+
+        assert_eq(len(actual), len(set(actual)))
+        assert_eq(set(actual), expected)
+
+
+@test
+def Maze_wall_runs():
+    """Tests that geometry.wall_runs yields maximal runs covering every wall
+    exactly once"""
+    maze = Maze(10, 20)
+    randomized_prim.initialize(maze, randomizer.block_randomizer(1))
+    m = Maze.Wall.MULTIPLICATOR
+
+    def point(x, y):
+        return (int(round(x / m)), int(round(y / m)))
+
+    for region in (None, (2, 3, 4, 5), (-1, -1, 3, 3)):
+        expected = set()
+        for room_pos in maze.room_positions:
+            if not region is None and not (
+                    region[0] <= room_pos[0] < region[0] + region[2] and
+                    region[1] <= room_pos[1] < region[1] + region[3]):
+                continue
+            center = maze.get_center(room_pos)
+            for wall in maze.walls(room_pos):
+                if not wall in maze[room_pos]:
+                    expected.add(tuple(sorted(point(
+                            center[0] + math.cos(angle),
+                            center[1] + math.sin(angle))
+                        for angle in wall.span)))
+
+        actual = []
+        endpoints = set()
+        for start, end in geometry.wall_runs(maze, region):
+            (x0, y0), (x1, y1) = point(*start), point(*end)
+            horizontal = y0 == y1
+            assert horizontal or x0 == x1, \
+                'The run %s was not straight' % str((start, end))
+            for key in ((horizontal, x0, y0), (horizontal, x1, y1)):
+                assert not key in endpoints, \
+                    'The run %s was not maximal' % str((start, end))
+                endpoints.add(key)
+            if horizontal:
+                actual.extend(((x, y0), (x + 1, y0)) for x in range(x0, x1))
+            else:
+                actual.extend(((x0, y), (x0, y + 1)) for y in range(y0, y1))
+
+        assert_eq(len(actual), len(set(actual)))
+        assert_eq(set(actual), expected)
+
+    with assert_exception(ValueError):
+        list(geometry.wall_runs(HexMaze(5, 5)))